@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class AddressesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'addresses'
+
+    def ready(self):
+        from core.cache import reference_cache
+        from . import signals  # noqa: F401
+
+        reference_cache.register(self.get_model('Locality'))
@@ -4,6 +4,7 @@ from graphene_django.filter import DjangoFilterConnectionField
 from django.db import IntegrityError
 from django.core.exceptions import ValidationError
 from graphql_jwt.decorators import login_required, permission_required
+from core.cache import get_reference
 from core.utils import normalize_name
 from .types import (
     LocalityType,
@@ -96,7 +97,7 @@ class CreateNeighborhoodMutation(graphene.Mutation):
     def mutate(self, info, name, locality_id):
         try:
             name = normalize_name(name)
-            locality = Locality.objects.get(pk=locality_id)
+            locality = get_reference(Locality, locality_id)
             neighborhood = Neighborhood(name=name, locality=locality)
             neighborhood.save()
             return CreateNeighborhoodMutation(neighborhood=neighborhood)
@@ -150,7 +151,7 @@ class UpdateNeighborhoodMutation(graphene.Mutation):
                 name = normalize_name(name)
                 neighborhood.name = name
             if locality_id is not None:
-                locality_obj = Locality.objects.get(pk=locality_id)
+                locality_obj = get_reference(Locality, locality_id)
                 neighborhood.locality = locality_obj
             neighborhood.save()
             return UpdateNeighborhoodMutation(neighborhood=neighborhood)
@@ -264,7 +265,7 @@ class Query(graphene.ObjectType):
     @login_required
     @permission_required("addresses.view_locality")
     def resolve_locality(self, info, id):
-        return Locality.objects.get(pk=id)
+        return get_reference(Locality, id)
 
     @login_required
     @permission_required("addresses.view_neighborhood")
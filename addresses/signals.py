@@ -0,0 +1,17 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from core.autocomplete import invalidate_autocomplete
+from .models import Locality, Neighborhood
+
+
+@receiver(post_save, sender=Locality)
+@receiver(post_delete, sender=Locality)
+def invalidate_locality_autocomplete(sender, **kwargs):
+    transaction.on_commit(lambda: invalidate_autocomplete('locality'))
+
+
+@receiver(post_save, sender=Neighborhood)
+@receiver(post_delete, sender=Neighborhood)
+def invalidate_neighborhood_autocomplete(sender, **kwargs):
+    transaction.on_commit(lambda: invalidate_autocomplete('neighborhood'))
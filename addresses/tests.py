@@ -1,5 +1,11 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.db.models import F
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, TestCase
 from graphene.test import Client
+from core.autocomplete import autocomplete
+from core.cache import clear_local_versions, get_reference
+from core.models import CacheVersion
 from core.schema import schema
 from core.utils import decode_relay_id
 from .models import (
@@ -104,3 +110,86 @@ class AddressSchemaTests(TestCase):
 
         db_locality = Locality.objects.get(id=locality_id)
         self.assertEqual(db_locality.name, variables['name'])
+
+
+class AddressAutocompleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_versions()
+        self.locality = Locality.objects.create(name="Ciudad Bolívar")
+        Locality.objects.create(name="Kennedy")
+        Locality.objects.create(name="Bosa")
+
+    def test_autocomplete_folds_accents(self):
+        results = autocomplete('locality', 'bolivar')
+        self.assertEqual([result['name'] for result in results],
+                         ["Ciudad Bolívar"])
+
+    def test_autocomplete_matches_any_word_start(self):
+        results = autocomplete('locality', 'ciu')
+        self.assertEqual([result['name'] for result in results],
+                         ["Ciudad Bolívar"])
+        _, locality_id = decode_relay_id(results[0]['id'])
+        self.assertEqual(locality_id, str(self.locality.id))
+
+    def test_keystrokes_are_served_from_memory(self):
+        autocomplete('locality', 'b')
+        with self.assertNumQueries(0):
+            self.assertEqual([result['name'] for result in autocomplete('locality', 'bos')],
+                             ["Bosa"])
+
+    def test_autocomplete_refreshes_after_changes(self):
+        self.assertEqual(autocomplete('locality', 'usme'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Locality.objects.create(name="Usme")
+        self.assertEqual([result['name'] for result in autocomplete('locality', 'us')],
+                         ["Usme"])
+
+    def test_autocomplete_requires_view_permission(self):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        response = Client(schema).execute(
+            '{ autocomplete(kind: LOCALITY, prefix: "bo") { name } }',
+            context_value=request)
+        self.assertIsNotNone(response.get('errors'))
+        self.assertIsNone(response['data']['autocomplete'])
+
+    def test_autocomplete_respects_limit(self):
+        results = autocomplete('locality', 'b', limit=1)
+        self.assertEqual(len(results), 1)
+
+
+class LocalityReferenceCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_versions()
+        self.locality = Locality.objects.create(name="Suba")
+
+    def test_get_reference_serves_from_memory(self):
+        self.assertEqual(get_reference(Locality, self.locality.id).name, "Suba")
+        # The version was read moments ago, so the lookup is a dictionary hit.
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                get_reference(Locality, str(self.locality.id)), self.locality)
+
+    def test_get_reference_finds_rows_created_elsewhere(self):
+        get_reference(Locality, self.locality.id)
+        # Another worker adds a row and bumps the version, while this one
+        # still trusts the version it read a moment ago.
+        kennedy = Locality.objects.create(name="Kennedy")
+        CacheVersion.objects.update(version=F('version') + 1)
+        self.assertEqual(get_reference(Locality, kennedy.id), kennedy)
+
+    def test_get_reference_reloads_after_save(self):
+        get_reference(Locality, self.locality.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.locality.name = "Engativá"
+            self.locality.save()
+        self.assertEqual(
+            get_reference(Locality, self.locality.id).name, "Engativá")
+
+    def test_get_reference_raises_does_not_exist(self):
+        with self.assertRaises(Locality.DoesNotExist):
+            get_reference(Locality, self.locality.id + 1)
+        with self.assertRaises(Locality.DoesNotExist):
+            get_reference(Locality, "not-an-id")
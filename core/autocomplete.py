@@ -0,0 +1,113 @@
+import bisect
+import threading
+from django.apps import apps
+from graphql_relay import to_global_id
+from .cache import get_version, bump_version
+from .utils import fold_accents
+
+AUTOCOMPLETE_SOURCES = {
+    'car_make': {
+        'model': 'products.CarMake',
+        'type_name': 'CarMakeType',
+        'related': (),
+        'permission': None,
+    },
+    'car_model': {
+        'model': 'products.CarModel',
+        'type_name': 'CarModelType',
+        'related': ('make',),
+        'permission': None,
+    },
+    'neighborhood': {
+        'model': 'addresses.Neighborhood',
+        'type_name': 'NeighborhoodType',
+        'related': (),
+        'permission': 'addresses.view_neighborhood',
+    },
+    'locality': {
+        'model': 'addresses.Locality',
+        'type_name': 'LocalityType',
+        'related': (),
+        'permission': 'addresses.view_locality',
+    },
+}
+
+
+def can_autocomplete(user, kind):
+    # Same permission as the list query of the underlying model.
+    permission = AUTOCOMPLETE_SOURCES[kind]['permission']
+    return permission is None or user.has_perm(permission)
+
+
+def _autocomplete_version_key(kind):
+    return f'autocomplete:{kind}'
+
+
+def invalidate_autocomplete(kind):
+    bump_version(_autocomplete_version_key(kind))
+
+
+# Sorted array of folded keys searched with bisect. Every word start of a
+# name gets its own key, so "kenn" finds "Ciudad Kennedy" as well.
+class PrefixIndex:
+    def __init__(self, kind):
+        self.kind = kind
+        self._lock = threading.Lock()
+        self._version = None
+        self._keys = []
+        self._entries = []
+
+    def search(self, prefix, limit):
+        prefix = fold_accents(' '.join(prefix.split()))
+        if not prefix:
+            return []
+
+        with self._lock:
+            self._ensure_current()
+            keys, entries = self._keys, self._entries
+
+        results = []
+        seen = set()
+        position = bisect.bisect_left(keys, prefix)
+        while position < len(keys) and keys[position].startswith(prefix):
+            entry = entries[position]
+            if entry['id'] not in seen:
+                seen.add(entry['id'])
+                results.append(entry)
+                if len(results) >= limit:
+                    break
+            position += 1
+        return results
+
+    def _ensure_current(self):
+        # get_version trusts a version read within CACHE_VERSION_CHECK_INTERVAL,
+        # so a burst of keystrokes does not query the database.
+        version = get_version(_autocomplete_version_key(self.kind))
+        if self._version != version:
+            self._keys, self._entries = self._build()
+            self._version = version
+
+    def _build(self):
+        source = AUTOCOMPLETE_SOURCES[self.kind]
+        model = apps.get_model(source['model'])
+        pairs = []
+        for obj in model.objects.select_related(*source['related']):
+            name = str(obj)
+            entry = {
+                'id': to_global_id(source['type_name'], obj.pk),
+                'name': name,
+            }
+            words = fold_accents(name).split()
+            for start in range(len(words)):
+                pairs.append((' '.join(words[start:]), entry))
+        pairs.sort(key=lambda pair: pair[0])
+        return [key for key, _ in pairs], [entry for _, entry in pairs]
+
+
+autocomplete_indexes = {
+    kind: PrefixIndex(kind) for kind in AUTOCOMPLETE_SOURCES
+}
+
+
+def autocomplete(kind, prefix, limit=10):
+    return autocomplete_indexes[kind].search(prefix, limit)
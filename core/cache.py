@@ -0,0 +1,125 @@
+import threading
+import time
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete
+from .models import CacheVersion
+
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+BUMP_VERSION_SQL = f'''
+    INSERT INTO {CacheVersion._meta.db_table} AS cache_version (key, version)
+    VALUES (%s, %s)
+    ON CONFLICT (key) DO UPDATE SET version = cache_version.version + 1
+    RETURNING version
+'''
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES['default']['BACKEND']
+    if backend in PROCESS_LOCAL_CACHE_BACKENDS:
+        return [Error(
+            f'{backend} is local to one process, so results cached by one '
+            'worker or management command are never shared with the others.',
+            hint='Use Redis, Memcached or DatabaseCache '
+                 '(python manage.py createcachetable).',
+            id='core.E001',
+        )]
+    return []
+
+
+def _initial_version():
+    # A row recreated after a flush starts past every version handed out
+    # before, so it can never match a copy built from the old rows.
+    return time.time_ns()
+
+
+# Versions this worker has read or bumped, with the time they were seen.
+_versions_lock = threading.Lock()
+_versions = {}
+
+
+def _remember_version(key, version):
+    with _versions_lock:
+        _versions[key] = (version, time.monotonic())
+    return version
+
+
+def get_version(key, fresh=False):
+    if not fresh:
+        with _versions_lock:
+            seen = _versions.get(key)
+        if seen is not None and \
+                time.monotonic() - seen[1] < settings.CACHE_VERSION_CHECK_INTERVAL:
+            return seen[0]
+    row, _ = CacheVersion.objects.get_or_create(
+        key=key, defaults={'version': _initial_version()})
+    return _remember_version(key, row.version)
+
+
+def bump_version(key):
+    with connection.cursor() as cursor:
+        cursor.execute(BUMP_VERSION_SQL, [key, _initial_version()])
+        version, = cursor.fetchone()
+    return _remember_version(key, version)
+
+
+def clear_local_versions():
+    with _versions_lock:
+        _versions.clear()
+
+
+# Small lookup tables kept whole in each worker. Reads are dictionary hits;
+# saves and deletes bump a shared version so every worker reloads the table.
+class ReferenceCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tables = {}
+
+    def register(self, model):
+        post_save.connect(self._invalidate, sender=model,
+                          dispatch_uid=f'reference_cache_save_{model._meta.label_lower}')
+        post_delete.connect(self._invalidate, sender=model,
+                            dispatch_uid=f'reference_cache_delete_{model._meta.label_lower}')
+
+    def rows(self, model, fresh=False):
+        version_key = self._version_key(model)
+        version = get_version(version_key, fresh=fresh)
+        with self._lock:
+            cached = self._tables.get(version_key)
+            if cached is None or cached[0] != version:
+                cached = (version, model.objects.in_bulk())
+                self._tables[version_key] = cached
+            return cached[1]
+
+    def get(self, model, pk):
+        try:
+            pk = int(pk)
+            rows = self.rows(model)
+            if pk not in rows:
+                # A row created by another worker may be newer than the
+                # locally trusted version, so misses check the database.
+                rows = self.rows(model, fresh=True)
+            return rows[pk]
+        except (KeyError, TypeError, ValueError):
+            raise model.DoesNotExist(
+                f'{model._meta.object_name} matching query does not exist.')
+
+    def _invalidate(self, sender, **kwargs):
+        version_key = self._version_key(sender)
+        transaction.on_commit(lambda: bump_version(version_key))
+
+    def _version_key(self, model):
+        return f'reference:{model._meta.label_lower}'
+
+
+reference_cache = ReferenceCache()
+
+
+def get_reference(model, pk):
+    return reference_cache.get(model, pk)
@@ -0,0 +1,11 @@
+from django.db import models
+
+
+# Shared cache versions. Bumps are a single UPDATE ... version + 1, so two
+# workers bumping the same key always end with two distinct versions.
+class CacheVersion(models.Model):
+    key = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f'{self.key}: {self.version}'
@@ -1,5 +1,7 @@
 import graphene
 import graphql_jwt
+from graphql import GraphQLError
+from graphql_jwt.exceptions import PermissionDenied
 from users.schema import (
     Query as UserQuery,
     Mutation as UserMutation
@@ -28,10 +30,27 @@ from sales.schema import (
     Query as SalesQuery,
     Mutation as SalesMutation
 )
+from .autocomplete import autocomplete, can_autocomplete
+from .types import AutocompleteKind, AutocompleteResultType
+
+AUTOCOMPLETE_MAX_LIMIT = 50
 
 
 class Query(UserQuery, AddressQuery, InventoryQuery, ProductQuery, SupplyChainQuery, ShoppingCartQuery, SalesQuery, graphene.ObjectType):
-    pass
+    autocomplete = graphene.List(
+        AutocompleteResultType,
+        kind=AutocompleteKind(required=True),
+        prefix=graphene.String(required=True),
+        limit=graphene.Int(default_value=10),
+    )
+
+    def resolve_autocomplete(self, info, kind, prefix, limit=10):
+        if limit < 1 or limit > AUTOCOMPLETE_MAX_LIMIT:
+            raise GraphQLError(
+                f'Limit must be between 1 and {AUTOCOMPLETE_MAX_LIMIT}')
+        if not can_autocomplete(info.context.user, kind.value):
+            raise PermissionDenied()
+        return autocomplete(kind.value, prefix, limit)
 
 
 class Mutation(UserMutation, AddressMutation, InventoryMutation, ProductMutation, SupplyChainMutation, ShoppingCartMutation, SalesMutation, graphene.ObjectType):
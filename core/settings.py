@@ -39,9 +39,11 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     "graphene_django",
     'graphene_django_filter',
     "corsheaders",
+    'core',
     'addresses',
     'users',
     'inventories',
@@ -104,6 +106,19 @@ else:
         }
     }
 
+# Cached results are shared by every worker and management command, so the
+# backend must live outside the process (see core.cache.check_shared_cache).
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': config('CACHE_LOCATION', default='cache_table'),
+    }
+}
+
+# Seconds a worker trusts the cache versions it has read before asking the
+# database again. Its own bumps are seen immediately.
+CACHE_VERSION_CHECK_INTERVAL = config('CACHE_VERSION_CHECK_INTERVAL', default=1.0, cast=float)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -0,0 +1,13 @@
+import graphene
+
+
+class AutocompleteKind(graphene.Enum):
+    CAR_MAKE = 'car_make'
+    CAR_MODEL = 'car_model'
+    NEIGHBORHOOD = 'neighborhood'
+    LOCALITY = 'locality'
+
+
+class AutocompleteResultType(graphene.ObjectType):
+    id = graphene.ID(description='Global ID of the matched record')
+    name = graphene.String()
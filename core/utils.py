@@ -1,6 +1,10 @@
 import base64
 import re
+import unicodedata
 from django.core.exceptions import ValidationError
+from django.db.models import IntegerField, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from graphene.utils.str_converters import to_snake_case
 
 
 def normalize_name(name, min_length=2, max_length=50, numbers=False):
@@ -51,3 +55,51 @@ def decode_relay_id(global_id):
     decoded_str = decoded_bytes.decode('utf-8')
     type_name, id_str = decoded_str.split(':')
     return type_name, id_str
+
+
+def fold_accents(value):
+    decomposed = unicodedata.normalize('NFKD', value)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def is_field_selected(info, name):
+    # Searches the whole selection below the current field (connection edges,
+    # nodes and fragments included) for a field with the given GraphQL name.
+    def search(selection_set):
+        if selection_set is None:
+            return False
+        for selection in selection_set.selections:
+            if selection.kind == 'fragment_spread':
+                selection_set = info.fragments[selection.name.value].selection_set
+            elif selection.kind == 'field' and selection.name.value == name:
+                return True
+            else:
+                selection_set = selection.selection_set
+            if search(selection_set):
+                return True
+        return False
+
+    return any(search(field_node.selection_set) for field_node in info.field_nodes)
+
+
+def needs_computed_field(info, kwargs, field_name, filter_name):
+    # True when a list resolver has to annotate a computed value: the field is
+    # selected, filtered on (filter_name__gte, ...) or used for ordering.
+    if is_field_selected(info, field_name):
+        return True
+    if any(key.startswith(f'{filter_name}__') and value is not None for key, value in kwargs.items()):
+        return True
+    # order_by arrives as sent by the client ("-totalPrice,date"); it is only
+    # snake-cased later by the filterset.
+    order_by = kwargs.get('order_by') or ''
+    return filter_name in {
+        to_snake_case(value.strip().lstrip('-')) for value in order_by.split(',')
+    }
+
+
+def sum_subquery(queryset, group_by, expression):
+    # Correlated SUM over related rows, 0 when there are none.
+    return Coalesce(Subquery(
+        queryset.order_by().values(group_by).annotate(
+            total=Sum(expression)).values('total'),
+        output_field=IntegerField()), Value(0))
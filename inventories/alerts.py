@@ -0,0 +1,52 @@
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from .models import (
+    STOCK_STATUS_AVAILABLE,
+    InventoryItem,
+    StockAlert,
+    ScanWatermark,
+)
+
+STOCK_ALERTS_WATERMARK = 'stock_alerts'
+# Rows committed by transactions that started before the last scan can carry
+# an updated_at slightly behind the watermark, so each scan re-reads a short
+# window. Re-read rows only produce an alert if their status really changed.
+STOCK_ALERTS_OVERLAP = timedelta(seconds=30)
+
+
+def scan_stock_alerts():
+    with transaction.atomic():
+        watermark, _ = ScanWatermark.objects.select_for_update().get_or_create(
+            name=STOCK_ALERTS_WATERMARK)
+
+        last_alert = StockAlert.objects.filter(
+            inventory_item=OuterRef('pk'),
+        ).order_by('-created_at', '-pk').values('status')[:1]
+        items = InventoryItem.objects.annotate(
+            last_alert_status=Coalesce(
+                Subquery(last_alert), Value(STOCK_STATUS_AVAILABLE)),
+        )
+        if watermark.value is not None:
+            items = items.filter(
+                updated_at__gt=watermark.value - STOCK_ALERTS_OVERLAP)
+
+        alerts = []
+        latest_change = watermark.value
+        for item_id, status, stock, updated_at, last_alert_status in items.values_list(
+                'id', 'status', 'stock', 'updated_at', 'last_alert_status').iterator():
+            if status != last_alert_status:
+                alerts.append(StockAlert(
+                    inventory_item_id=item_id,
+                    previous_status=last_alert_status,
+                    status=status,
+                    stock=stock,
+                ))
+            if latest_change is None or updated_at > latest_change:
+                latest_change = updated_at
+
+        StockAlert.objects.bulk_create(alerts)
+        watermark.value = latest_change
+        watermark.save(update_fields=['value'])
+    return alerts
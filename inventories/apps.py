@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class InventoriesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventories'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .ledger import seed_opening_snapshots
+        from .triggers import install_stock_status_trigger
+
+        post_migrate.connect(install_stock_status_trigger, sender=self,
+                             dispatch_uid='inventories_stock_status_trigger')
+        post_migrate.connect(seed_opening_snapshots, sender=self,
+                             dispatch_uid='inventories_opening_snapshots')
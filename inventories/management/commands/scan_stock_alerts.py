@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from inventories.alerts import scan_stock_alerts
+
+
+class Command(BaseCommand):
+    help = 'Record stock status transitions of inventory items changed since the last scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep scanning instead of running once')
+        parser.add_argument('--interval', type=int, default=60,
+                            help='Seconds between scans when looping')
+
+    def handle(self, *args, **options):
+        while True:
+            alerts = scan_stock_alerts()
+            self.stdout.write(self.style.SUCCESS(
+                f'Recorded {len(alerts)} stock alerts'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from inventories.ledger import take_stock_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Store the current stock of every inventory item as a snapshot for stock-as-of queries'
+
+    def handle(self, *args, **options):
+        created = take_stock_snapshots()
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored stock snapshots for {created} inventory items'))
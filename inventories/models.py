@@ -1,5 +1,29 @@
 from django.db import models
 from django.core.validators import MinValueValidator
+from django.utils import timezone
+
+
+STOCK_STATUS_AVAILABLE = 'Available'
+STOCK_STATUS_LOW = 'Low stock'
+STOCK_STATUS_OUT = 'Out of stock'
+
+# Low stock threshold used when an item does not set its own.
+DEFAULT_LOW_STOCK_THRESHOLDS = {
+    'MAT': 10,
+    'RAW': 40,
+}
+
+
+def compute_stock_status(stock, type, low_stock_threshold=None, out_of_stock_threshold=0):
+    if low_stock_threshold is None:
+        low_stock_threshold = DEFAULT_LOW_STOCK_THRESHOLDS.get(type)
+
+    if stock <= out_of_stock_threshold:
+        return STOCK_STATUS_OUT
+    elif low_stock_threshold is not None and stock <= low_stock_threshold:
+        return STOCK_STATUS_LOW
+    else:
+        return STOCK_STATUS_AVAILABLE
 
 
 class InventoryItem(models.Model):
@@ -8,30 +32,118 @@ class InventoryItem(models.Model):
         ('RAW', 'Materia Prima'),
     ]
 
+    STATUS_CHOICES = [
+        (STOCK_STATUS_AVAILABLE, STOCK_STATUS_AVAILABLE),
+        (STOCK_STATUS_LOW, STOCK_STATUS_LOW),
+        (STOCK_STATUS_OUT, STOCK_STATUS_OUT),
+    ]
+
     name = models.CharField(max_length=100, unique=True, null=False)
     description = models.TextField(default='', null=True, blank=True)
     stock = models.IntegerField(
         null=False, validators=[MinValueValidator(0)])
     type = models.CharField(max_length=3, choices=TYPE_CHOICES, null=False)
+    low_stock_threshold = models.IntegerField(
+        null=True, blank=True, validators=[MinValueValidator(0)])
+    out_of_stock_threshold = models.IntegerField(
+        default=0, validators=[MinValueValidator(0)])
+    # Kept in sync by save() and, for set-based updates, by a database trigger.
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=STOCK_STATUS_AVAILABLE, db_index=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    @property
-    def status(self):
-        thresholds = {
-            'MAT': {'low_stock_threshold': 10, 'out_of_stock_threshold': 0},
-            'RAW': {'low_stock_threshold': 40, 'out_of_stock_threshold': 0},
-        }
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_name = instance.__dict__.get('name')
+        return instance
 
-        current_thresholds = thresholds.get(self.type)
+    def name_changed(self, update_fields=None):
+        # Instances that were not loaded from the database count as changed.
+        if update_fields is not None and 'name' not in update_fields:
+            return False
+        return self.name != getattr(self, '_loaded_name', None)
 
-        if self.stock <= current_thresholds['out_of_stock_threshold']:
-            return 'Out of stock'
+    def refresh_status(self):
+        self.status = compute_stock_status(
+            self.stock, self.type, self.low_stock_threshold, self.out_of_stock_threshold)
+        return self.status
 
-        elif current_thresholds['low_stock_threshold'] is not None and self.stock <= current_thresholds['low_stock_threshold']:
-            return 'Low stock'
-        else:
-            return 'Available'
+    def save(self, *args, **kwargs):
+        self.refresh_status()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'status' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'status']
+        super().save(*args, **kwargs)
+        self._loaded_name = self.name
 
     def __str__(self):
         return self.name
+
+
+class InventoryMovement(models.Model):
+    KIND_CHOICES = [
+        ('SAL', 'Venta'),
+        ('PUR', 'Compra'),
+        ('ADJ', 'Ajuste'),
+        ('PRO', 'Producción'),
+    ]
+
+    inventory_item = models.ForeignKey(
+        InventoryItem, on_delete=models.CASCADE, related_name='movements')
+    kind = models.CharField(max_length=3, choices=KIND_CHOICES, null=False)
+    quantity = models.IntegerField(null=False)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['inventory_item', 'created_at'],
+                         name='movement_item_created_idx'),
+            models.Index(fields=['created_at'],
+                         name='movement_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.inventory_item} {self.quantity:+d} ({self.kind})'
+
+
+class StockSnapshot(models.Model):
+    inventory_item = models.ForeignKey(
+        InventoryItem, on_delete=models.CASCADE, related_name='snapshots')
+    stock = models.IntegerField(null=False)
+    taken_at = models.DateTimeField(null=False)
+
+    class Meta:
+        unique_together = ['inventory_item', 'taken_at']
+
+    def __str__(self):
+        return f'{self.inventory_item} {self.stock} @ {self.taken_at}'
+
+
+class StockAlert(models.Model):
+    inventory_item = models.ForeignKey(
+        InventoryItem, on_delete=models.CASCADE, related_name='stock_alerts')
+    previous_status = models.CharField(
+        max_length=20, choices=InventoryItem.STATUS_CHOICES, null=False)
+    status = models.CharField(
+        max_length=20, choices=InventoryItem.STATUS_CHOICES, null=False)
+    stock = models.IntegerField(null=False)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['inventory_item', '-created_at'],
+                         name='stock_alert_item_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.inventory_item}: {self.previous_status} -> {self.status}'
+
+
+class ScanWatermark(models.Model):
+    name = models.CharField(max_length=50, unique=True, null=False)
+    value = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.name} @ {self.value}'
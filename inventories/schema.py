@@ -1,12 +1,26 @@
 import graphene
 from graphql import GraphQLError
 from graphene_django.filter import DjangoFilterConnectionField
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.core.exceptions import ValidationError
+from psycopg2 import errorcodes
 from graphql_jwt.decorators import login_required, permission_required
-from core.utils import normalize_name
-from .types import InventoryItemType
-from .models import InventoryItem
+from core.utils import is_field_selected, normalize_name
+from .types import (
+    InventoryItemType,
+    InventoryMovementType,
+    StockAlertType,
+    StockItemInput,
+    StockFailureType,
+    StockAsOfType,
+    StockAdjustmentInput,
+    StockAdjustmentResultType,
+)
+from .models import InventoryItem, InventoryMovement, StockAlert
+from .ledger import record_movements, stock_as_of
+from .utils import bulk_adjust_stock, reserve_stock, release_stock
+
+BULK_ADJUST_STOCK_MAX_ROWS = 1000
 
 
 class CreateInventoryItemMutation(graphene.Mutation):
@@ -15,20 +29,27 @@ class CreateInventoryItemMutation(graphene.Mutation):
         description = graphene.String()
         stock = graphene.Int(required=True)
         type = graphene.String(required=True)
+        low_stock_threshold = graphene.Int()
+        out_of_stock_threshold = graphene.Int()
 
     inventory_item = graphene.Field(InventoryItemType)
 
     @login_required
     @permission_required("inventories.add_inventoryitem")
-    def mutate(self, info, name, stock, type, description=None):
+    def mutate(self, info, name, stock, type, description=None, low_stock_threshold=None, out_of_stock_threshold=0):
+
+        if (low_stock_threshold is not None and low_stock_threshold < 0) or out_of_stock_threshold < 0:
+            raise GraphQLError("Stock thresholds must be positive integers")
 
         try:
             name = normalize_name(name)
             if description:
                 description = description.strip()
-            inventory_item = InventoryItem(
-                name=name, description=description, stock=stock, type=type)
-            inventory_item.save()
+            with transaction.atomic():
+                inventory_item = InventoryItem(
+                    name=name, description=description, stock=stock, type=type,
+                    low_stock_threshold=low_stock_threshold, out_of_stock_threshold=out_of_stock_threshold)
+                inventory_item.save()
             return CreateInventoryItemMutation(inventory_item=inventory_item)
         except ValidationError as e:
             raise GraphQLError(e)
@@ -64,37 +85,63 @@ class UpdateInventoryItemMutation(graphene.Mutation):
         description = graphene.String()
         stock = graphene.Int()
         type = graphene.String()
+        low_stock_threshold = graphene.Int()
+        out_of_stock_threshold = graphene.Int()
 
     inventory_item = graphene.Field(InventoryItemType)
 
     @login_required
     @permission_required("inventories.change_inventoryitem")
-    def mutate(self, info, id, name=None, description=None, stock=None, type=None):
+    def mutate(self, info, id, name=None, description=None, stock=None, type=None, low_stock_threshold=None, out_of_stock_threshold=None):
 
-        if not name and not description and stock is None and not type:
+        if not name and not description and stock is None and not type and low_stock_threshold is None and out_of_stock_threshold is None:
             raise GraphQLError("At least one field is required")
 
         try:
-            inventory_item = InventoryItem.objects.get(pk=id)
-            if name:
-                name = normalize_name(name)
-                inventory_item.name = name
-            if description:
-                description = description.strip()
-                inventory_item.description = description
-            if stock is not None:
-                if stock >= 0:
-                    inventory_item.stock = stock
-                else:
-                    raise GraphQLError("Stock must be a positive integer")
-            if type:
-                inventory_item.type = type
-
-            inventory_item.save()
+            with transaction.atomic():
+                inventory_item = InventoryItem.objects.select_for_update().get(pk=id)
+                update_fields = ['updated_at']
+                if name:
+                    name = normalize_name(name)
+                    inventory_item.name = name
+                    update_fields.append('name')
+                if description:
+                    description = description.strip()
+                    inventory_item.description = description
+                    update_fields.append('description')
+                if stock is not None:
+                    if stock >= 0:
+                        record_movements(
+                            [(inventory_item.pk, stock - inventory_item.stock)], 'ADJ')
+                        inventory_item.stock = stock
+                        update_fields.append('stock')
+                    else:
+                        raise GraphQLError("Stock must be a positive integer")
+                if type:
+                    inventory_item.type = type
+                    update_fields.append('type')
+                if low_stock_threshold is not None:
+                    if low_stock_threshold < 0:
+                        raise GraphQLError(
+                            "Low stock threshold must be a positive integer")
+                    inventory_item.low_stock_threshold = low_stock_threshold
+                    update_fields.append('low_stock_threshold')
+                if out_of_stock_threshold is not None:
+                    if out_of_stock_threshold < 0:
+                        raise GraphQLError(
+                            "Out of stock threshold must be a positive integer")
+                    inventory_item.out_of_stock_threshold = out_of_stock_threshold
+                    update_fields.append('out_of_stock_threshold')
+
+                inventory_item.save(update_fields=update_fields)
             return UpdateInventoryItemMutation(inventory_item=inventory_item)
         except InventoryItem.DoesNotExist:
             raise GraphQLError("Item not found")
-        except IntegrityError:
+        except IntegrityError as e:
+            # Raised by the products material type trigger.
+            if getattr(e.__cause__, 'pgcode', None) == errorcodes.CHECK_VIOLATION:
+                raise GraphQLError(
+                    "Item is used as material by carpets, so its type must stay RAW")
             raise GraphQLError("Inventory item already exists")
         except ValidationError as e:
             raise GraphQLError(e)
@@ -102,23 +149,121 @@ class UpdateInventoryItemMutation(graphene.Mutation):
             raise GraphQLError(f"Unknown Error: {str(e)}")
 
 
+class ReserveStockMutation(graphene.Mutation):
+    class Arguments:
+        items = graphene.List(graphene.NonNull(StockItemInput), required=True)
+
+    success = graphene.Boolean()
+    failed_items = graphene.List(StockFailureType)
+
+    @login_required
+    @permission_required("inventories.change_inventoryitem")
+    def mutate(self, info, items):
+        try:
+            failed_items = reserve_stock(
+                (item.item_id, item.quantity) for item in items)
+            return ReserveStockMutation(success=not failed_items, failed_items=failed_items)
+        except ValueError as e:
+            raise GraphQLError(str(e))
+        except Exception as e:
+            raise GraphQLError(f"Unknown Error: {str(e)}")
+
+
+class ReleaseStockMutation(graphene.Mutation):
+    class Arguments:
+        items = graphene.List(graphene.NonNull(StockItemInput), required=True)
+
+    success = graphene.Boolean()
+    failed_items = graphene.List(StockFailureType)
+
+    @login_required
+    @permission_required("inventories.change_inventoryitem")
+    def mutate(self, info, items):
+        try:
+            failed_items = release_stock(
+                (item.item_id, item.quantity) for item in items)
+            return ReleaseStockMutation(success=not failed_items, failed_items=failed_items)
+        except ValueError as e:
+            raise GraphQLError(str(e))
+        except Exception as e:
+            raise GraphQLError(f"Unknown Error: {str(e)}")
+
+
+class BulkAdjustStockMutation(graphene.Mutation):
+    class Arguments:
+        adjustments = graphene.List(
+            graphene.NonNull(StockAdjustmentInput), required=True)
+        partial = graphene.Boolean(
+            default_value=False, description='Apply the valid adjustments even if some fail')
+
+    success = graphene.Boolean()
+    results = graphene.List(StockAdjustmentResultType)
+
+    @login_required
+    @permission_required("inventories.change_inventoryitem")
+    def mutate(self, info, adjustments, partial=False):
+        if len(adjustments) > BULK_ADJUST_STOCK_MAX_ROWS:
+            raise GraphQLError(
+                f"At most {BULK_ADJUST_STOCK_MAX_ROWS} items can be adjusted at once")
+
+        try:
+            results = bulk_adjust_stock(adjustments, partial=partial)
+            return BulkAdjustStockMutation(
+                success=not any(result['error'] for result in results), results=results)
+        except ValueError as e:
+            raise GraphQLError(str(e))
+        except Exception as e:
+            raise GraphQLError(f"Unknown Error: {str(e)}")
+
+
 class Query(graphene.ObjectType):
     inventory_items = DjangoFilterConnectionField(InventoryItemType)
     inventory_item = graphene.Field(
         InventoryItemType, id=graphene.ID())
+    inventory_movements = DjangoFilterConnectionField(InventoryMovementType)
+    stock_alerts = DjangoFilterConnectionField(StockAlertType)
+    stock_as_of = graphene.List(
+        StockAsOfType, date=graphene.DateTime(required=True), ids=graphene.List(graphene.NonNull(graphene.ID)))
 
     @login_required
     @permission_required("inventories.view_inventoryitem")
     def resolve_inventory_items(self, info, **kwargs):
-        return InventoryItem.objects.all()
+        inventory_items = InventoryItem.objects.all()
+        if is_field_selected(info, 'cheapestOffer') and \
+                info.context.user.has_perm('supply_chains.view_materialbysupplier'):
+            # supply_chains depends on inventories, so it is imported lazily.
+            from supply_chains.offers import prefetch_cheapest_offer
+            inventory_items = inventory_items.prefetch_related(
+                prefetch_cheapest_offer())
+        return inventory_items
 
     @login_required
     @permission_required("inventories.view_inventoryitem")
     def resolve_inventory_item(self, info, id):
         return InventoryItem.objects.get(pk=id)
 
+    @login_required
+    @permission_required("inventories.view_inventoryitem")
+    def resolve_inventory_movements(self, info, **kwargs):
+        return InventoryMovement.objects.order_by('-created_at')
+
+    @login_required
+    @permission_required("inventories.view_inventoryitem")
+    def resolve_stock_alerts(self, info, **kwargs):
+        return StockAlert.objects.order_by('-created_at')
+
+    @login_required
+    @permission_required("inventories.view_inventoryitem")
+    def resolve_stock_as_of(self, info, date, ids=None):
+        stock = stock_as_of(date, item_ids=ids)
+        return [{'inventory_item_id': item_id, 'stock': value}
+                for item_id, value in sorted(stock.items())]
+
 
 class Mutation(graphene.ObjectType):
     create_inventory_item = CreateInventoryItemMutation.Field()
     delete_inventory_item = DeleteInventoryItemMutation.Field()
     update_inventory_item = UpdateInventoryItemMutation.Field()
+    reserve_stock = ReserveStockMutation.Field()
+    release_stock = ReleaseStockMutation.Field()
+    bulk_adjust_stock = BulkAdjustStockMutation.Field()
@@ -0,0 +1,26 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+from core.cache import bump_version
+from .ledger import record_movements
+from .models import InventoryItem
+
+STOCK_VERSION_KEY = 'inventories:stock'
+
+# Sent with item_ids after set-based stock updates, which skip post_save.
+stock_changed = Signal()
+
+
+# Every way of creating an item (mutation, admin, objects.create) gets its
+# opening stock in the ledger. bulk_create skips this and records it itself.
+@receiver(post_save, sender=InventoryItem)
+def record_opening_movement(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_movements([(instance.pk, instance.stock)], 'ADJ')
+
+
+@receiver(post_save, sender=InventoryItem)
+@receiver(post_delete, sender=InventoryItem)
+@receiver(stock_changed, sender=InventoryItem)
+def bump_stock_version(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version(STOCK_VERSION_KEY))
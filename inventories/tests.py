@@ -1,8 +1,12 @@
 from django.test import TestCase
+from django.utils import timezone
 from graphene.test import Client
 from core.schema import schema
 from core.utils import decode_relay_id
-from .models import InventoryItem
+from .models import InventoryItem, compute_stock_status
+from .alerts import scan_stock_alerts
+from .ledger import seed_opening_snapshots, stock_as_of, take_stock_snapshots
+from .utils import bulk_adjust_stock, create_inventory_item, reserve_stock, release_stock
 
 
 class InventorySchemaTests(TestCase):
@@ -50,3 +54,144 @@ class InventorySchemaTests(TestCase):
         self.assertEqual(db_item.stock, variables['stock'])
         self.assertEqual(db_item.type, variables['type'])
         self.assertEqual(db_item.description, variables['description'])
+
+
+class StockReservationTests(TestCase):
+    def setUp(self):
+        self.first = InventoryItem.objects.create(
+            name='Tapete A', stock=5, type='MAT')
+        self.second = InventoryItem.objects.create(
+            name='Tapete B', stock=1, type='MAT')
+
+    def test_reserve_stock_is_all_or_nothing(self):
+        failed_items = reserve_stock(
+            [(self.first.pk, 3), (self.second.pk, 2)])
+
+        self.assertEqual(failed_items, [
+            {'item_id': self.second.pk, 'requested': 2, 'available': 1}])
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.stock, 5)
+
+    def test_reserve_and_release_stock(self):
+        self.assertEqual(reserve_stock(
+            [(self.first.pk, 2), (self.first.pk, 3), (self.second.pk, 1)]), [])
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.stock, 0)
+
+        self.assertEqual(release_stock([(self.first.pk, 4)]), [])
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.stock, 4)
+
+
+class InventoryLedgerTests(TestCase):
+    def test_stock_as_of_uses_snapshot_and_later_movements(self):
+        item = create_inventory_item(name='Caucho', stock=10, type='RAW')
+        reserve_stock([(item.pk, 4)])
+        take_stock_snapshots()
+
+        before_release = timezone.now()
+        release_stock([(item.pk, 3)], kind='ADJ')
+
+        self.assertEqual(item.movements.count(), 3)
+        self.assertEqual(stock_as_of(before_release, [item.pk]), {item.pk: 6})
+        self.assertEqual(stock_as_of(timezone.now(), [item.pk]), {item.pk: 9})
+
+    def test_items_created_directly_get_an_opening_movement(self):
+        item = InventoryItem.objects.create(name='Caucho', stock=25, type='RAW')
+
+        self.assertEqual(list(item.movements.values_list('kind', 'quantity')), [('ADJ', 25)])
+        self.assertEqual(stock_as_of(timezone.now(), [item.pk]), {item.pk: 25})
+
+    def test_snapshots_are_not_double_counted_with_movements(self):
+        item = create_inventory_item(name='Caucho', stock=10, type='RAW')
+        self.assertEqual(take_stock_snapshots(), 1)
+        reserve_stock([(item.pk, 4)])
+
+        self.assertEqual(stock_as_of(timezone.now(), [item.pk]), {item.pk: 6})
+
+    def test_opening_snapshot_covers_items_without_ledger_rows(self):
+        # bulk_create skips the opening movement, like rows from before the ledger.
+        legacy, = InventoryItem.objects.bulk_create(
+            [InventoryItem(name='Caucho', stock=25, type='RAW')])
+        tracked = create_inventory_item(name='Hilo', stock=5, type='RAW')
+
+        self.assertEqual(seed_opening_snapshots(), 1)
+        self.assertEqual(seed_opening_snapshots(), 0)
+        self.assertEqual(stock_as_of(timezone.now(), [legacy.pk, tracked.pk]),
+                         {legacy.pk: 25, tracked.pk: 5})
+
+
+class StockStatusTests(TestCase):
+    def test_status_is_stored_with_item_thresholds(self):
+        item = InventoryItem.objects.create(
+            name='Caucho', stock=30, type='RAW')
+        self.assertEqual(item.status, 'Low stock')
+
+        item.low_stock_threshold = 20
+        item.save(update_fields=['low_stock_threshold'])
+
+        self.assertEqual(
+            InventoryItem.objects.filter(status='Available').get().pk, item.pk)
+
+    def test_compute_stock_status_uses_type_defaults(self):
+        self.assertEqual(compute_stock_status(10, 'MAT'), 'Low stock')
+        self.assertEqual(compute_stock_status(11, 'MAT'), 'Available')
+        self.assertEqual(compute_stock_status(3, 'MAT', None, 3), 'Out of stock')
+
+
+class StockAlertScanTests(TestCase):
+    def test_scan_records_only_status_transitions(self):
+        item = InventoryItem.objects.create(name='Caucho', stock=100, type='RAW')
+        self.assertEqual(scan_stock_alerts(), [])
+
+        item.stock = 20
+        item.save()
+        alerts = scan_stock_alerts()
+        self.assertEqual([(alert.previous_status, alert.status) for alert in alerts],
+                         [('Available', 'Low stock')])
+
+        # The overlap window re-reads the row, but the status did not change.
+        self.assertEqual(scan_stock_alerts(), [])
+
+
+class BulkAdjustStockTests(TestCase):
+    def test_adjustments_are_validated_before_writing(self):
+        with self.assertRaisesMessage(ValueError, 'give either a stock or a delta'):
+            bulk_adjust_stock([{'id': 1, 'stock': 4, 'delta': 2}])
+        with self.assertRaisesMessage(ValueError, 'adjusted more than once'):
+            bulk_adjust_stock([{'id': 1, 'stock': 4}, {'id': '1', 'delta': -1}])
+
+    def test_counts_and_deltas_are_applied_in_one_statement(self):
+        counted = create_inventory_item(name='Caucho', stock=10, type='RAW')
+        received = create_inventory_item(name='Hilo', stock=3, type='RAW')
+
+        results = bulk_adjust_stock(
+            [{'id': counted.pk, 'stock': 4}, {'id': received.pk, 'delta': 5}])
+
+        self.assertEqual([(result['previous_stock'], result['stock'], result['error'])
+                          for result in results], [(10, 4, None), (3, 8, None)])
+        counted.refresh_from_db()
+        self.assertEqual((counted.stock, counted.status), (4, 'Low stock'))
+        self.assertEqual(counted.movements.order_by('-pk').values_list(
+            'kind', 'quantity').first(), ('ADJ', -6))
+
+    def test_failed_rows_roll_back_the_batch_unless_partial(self):
+        item = create_inventory_item(name='Caucho', stock=10, type='RAW')
+        other = create_inventory_item(name='Hilo', stock=3, type='RAW')
+        adjustments = [{'id': item.pk, 'delta': -20},
+                       {'id': other.pk, 'delta': 1},
+                       {'id': other.pk + 100, 'stock': 1}]
+
+        results = bulk_adjust_stock(adjustments)
+        self.assertEqual([result['error'] for result in results], [
+            'Stock must be a positive integer',
+            'Not applied because other adjustments failed',
+            'Item not found',
+        ])
+        other.refresh_from_db()
+        self.assertEqual(other.stock, 3)
+
+        results = bulk_adjust_stock(adjustments, partial=True)
+        self.assertEqual(results[1]['stock'], 4)
+        item.refresh_from_db()
+        self.assertEqual(item.stock, 10)
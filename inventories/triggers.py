@@ -0,0 +1,54 @@
+from django.db import connections
+from .models import (
+    DEFAULT_LOW_STOCK_THRESHOLDS,
+    STOCK_STATUS_AVAILABLE,
+    STOCK_STATUS_LOW,
+    STOCK_STATUS_OUT,
+    InventoryItem,
+)
+
+# Mirrors compute_stock_status so set-based updates (F expressions, bulk
+# adjustments) keep the stored status current without a Python round trip.
+STOCK_STATUS_TRIGGER_SQL = '''
+CREATE OR REPLACE FUNCTION inventories_stock_status(
+    stock integer, item_type varchar, low_threshold integer, out_threshold integer
+) RETURNS varchar AS $$
+    SELECT CASE
+        WHEN stock <= out_threshold THEN '{out}'
+        WHEN stock <= COALESCE(low_threshold, CASE item_type {defaults} END) THEN '{low}'
+        ELSE '{available}'
+    END
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION inventories_set_stock_status() RETURNS trigger AS $$
+BEGIN
+    NEW.status := inventories_stock_status(
+        NEW.stock, NEW.type, NEW.low_stock_threshold, NEW.out_of_stock_threshold);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS inventoryitem_stock_status ON {table};
+CREATE TRIGGER inventoryitem_stock_status
+    BEFORE INSERT OR UPDATE OF stock, type, low_stock_threshold, out_of_stock_threshold ON {table}
+    FOR EACH ROW EXECUTE FUNCTION inventories_set_stock_status();
+
+UPDATE {table}
+SET status = inventories_stock_status(stock, type, low_stock_threshold, out_of_stock_threshold)
+WHERE status IS DISTINCT FROM inventories_stock_status(stock, type, low_stock_threshold, out_of_stock_threshold);
+'''
+
+
+def install_stock_status_trigger(using='default', **kwargs):
+    connection = connections[using]
+    defaults = ' '.join(
+        f"WHEN '{item_type}' THEN {threshold}"
+        for item_type, threshold in DEFAULT_LOW_STOCK_THRESHOLDS.items())
+    with connection.cursor() as cursor:
+        cursor.execute(STOCK_STATUS_TRIGGER_SQL.format(
+            table=InventoryItem._meta.db_table,
+            defaults=defaults,
+            out=STOCK_STATUS_OUT,
+            low=STOCK_STATUS_LOW,
+            available=STOCK_STATUS_AVAILABLE,
+        ))
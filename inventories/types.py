@@ -1,13 +1,13 @@
 import graphene
 from graphene import relay
-from django.db.models import Case, When, Value, CharField
 from django_filters import FilterSet, DateFromToRangeFilter, NumberFilter, CharFilter
 from graphene_django import DjangoObjectType
-from .models import InventoryItem
+from graphql_jwt.decorators import permission_required
+from .models import InventoryItem, InventoryMovement, StockAlert
 
 
 class InventoryItemFilter(FilterSet):
-    status = CharFilter(method="filter_by_status")
+    status = CharFilter(field_name="status")
     created_at = DateFromToRangeFilter()
     updated_at = DateFromToRangeFilter()
     stock_min = NumberFilter(field_name='stock', lookup_expr='gte')
@@ -24,50 +24,19 @@ class InventoryItemFilter(FilterSet):
             'updated_at': ['exact', 'icontains'],
         }
 
-    def filter_by_status(self, queryset, name, value):
-        thresholds = {
-            'MAT': {'low_stock_threshold': 10, 'out_of_stock_threshold': 0},
-            'RAW': {'low_stock_threshold': 40, 'out_of_stock_threshold': 0},
-        }
-
-        queryset = queryset.annotate(
-            status=Case(
-                When(
-                    type='MAT',
-                    stock__lte=thresholds['MAT']['out_of_stock_threshold'],
-                    then=Value('Out of stock')
-                ),
-                When(
-                    type='MAT',
-                    stock__lte=thresholds['MAT']['low_stock_threshold'],
-                    then=Value('Low stock')
-                ),
-                When(
-                    type='RAW',
-                    stock__lte=thresholds['RAW']['out_of_stock_threshold'],
-                    then=Value('Out of stock')
-                ),
-                When(
-                    type='RAW',
-                    stock__lte=thresholds['RAW']['low_stock_threshold'],
-                    then=Value('Low stock')
-                ),
-                default=Value('Available'),
-                output_field=CharField(),
-            )
-        )
-        return queryset.filter(status=value)
-
 
 class InventoryItemType(DjangoObjectType):
     status = graphene.String(description='Status of the inventory item')
     type = graphene.String(description='Type of the inventory item')
+    cheapest_offer = graphene.Field(
+        'supply_chains.types.MaterialBySupplierType', description='Lowest supplier price for a RAW item')
 
     class Meta:
         model = InventoryItem
         interfaces = (relay.Node,)
-        fields = ('id', 'name', 'description', 'stock',
-                  'type', 'created_at', 'updated_at', 'status')
+        fields = ('id', 'name', 'description', 'stock', 'type',
+                  'low_stock_threshold', 'out_of_stock_threshold',
+                  'created_at', 'updated_at', 'status')
         filterset_class = InventoryItemFilter
 
     def resolve_status(self, info):
@@ -75,3 +44,90 @@ class InventoryItemType(DjangoObjectType):
 
     def resolve_type(self, info):
         return self.get_type_display()
+
+    @permission_required('supply_chains.view_materialbysupplier')
+    def resolve_cheapest_offer(self, info):
+        # inventoryItems prefetches the offers for the whole page when this
+        # field is selected; single items fall back to one query.
+        offers = getattr(self, 'cheapest_offers', None)
+        if offers is None:
+            return self.materialbysupplier_set.order_by('price', 'pk').first()
+        return offers[0] if offers else None
+
+
+class StockItemInput(graphene.InputObjectType):
+    item_id = graphene.ID(required=True)
+    quantity = graphene.Int(required=True)
+
+
+class StockFailureType(graphene.ObjectType):
+    item_id = graphene.ID()
+    requested = graphene.Int()
+    available = graphene.Int(description='Current stock, null if the item does not exist')
+
+
+class InventoryMovementFilter(FilterSet):
+    created_at = DateFromToRangeFilter()
+
+    class Meta:
+        model = InventoryMovement
+        fields = {
+            'inventory_item': ['exact'],
+            'kind': ['exact'],
+        }
+
+
+class InventoryMovementType(DjangoObjectType):
+    class Meta:
+        model = InventoryMovement
+        interfaces = (relay.Node,)
+        fields = ('id', 'inventory_item', 'kind', 'quantity', 'created_at')
+        filterset_class = InventoryMovementFilter
+
+
+class StockAlertFilter(FilterSet):
+    created_at = DateFromToRangeFilter()
+
+    class Meta:
+        model = StockAlert
+        fields = {
+            'inventory_item': ['exact'],
+            'status': ['exact'],
+            'previous_status': ['exact'],
+        }
+
+
+class StockAlertType(DjangoObjectType):
+    status = graphene.String()
+    previous_status = graphene.String()
+
+    class Meta:
+        model = StockAlert
+        interfaces = (relay.Node,)
+        fields = ('id', 'inventory_item', 'previous_status',
+                  'status', 'stock', 'created_at')
+        filterset_class = StockAlertFilter
+
+    def resolve_status(self, info):
+        return self.status
+
+    def resolve_previous_status(self, info):
+        return self.previous_status
+
+
+class StockAsOfType(graphene.ObjectType):
+    inventory_item_id = graphene.ID()
+    stock = graphene.Int()
+
+
+class StockAdjustmentInput(graphene.InputObjectType):
+    id = graphene.ID(required=True)
+    stock = graphene.Int(description='Counted stock')
+    delta = graphene.Int(description='Signed change applied to the current stock')
+
+
+class StockAdjustmentResultType(graphene.ObjectType):
+    id = graphene.ID()
+    previous_stock = graphene.Int()
+    stock = graphene.Int()
+    error = graphene.String()
@@ -1,7 +1,19 @@
+from collections import defaultdict
 from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import F
 from django.db.utils import IntegrityError
+from django.utils import timezone
 from core.utils import normalize_name
+from .ledger import record_movements
 from .models import InventoryItem
+from .signals import stock_changed
+
+
+class InsufficientStockError(Exception):
+    def __init__(self, failed_items):
+        self.failed_items = failed_items
+        super().__init__("Not enough stock")
 
 
 def create_inventory_item(name, stock, type, description=None):
@@ -9,9 +21,10 @@ def create_inventory_item(name, stock, type, description=None):
         name = normalize_name(name)
         if description:
             description = description.strip()
-        inventory_item = InventoryItem(
-            name=name, description=description, stock=stock, type=type)
-        inventory_item.save()
+        with transaction.atomic():
+            inventory_item = InventoryItem(
+                name=name, description=description, stock=stock, type=type)
+            inventory_item.save()
         return inventory_item
     except ValidationError as e:
         raise ValueError(e)
@@ -37,22 +50,34 @@ def update_inventory_item(id, name=None, description=None, stock=None, type=None
         raise ValueError("At least one field is required")
 
     try:
-        inventory_item = InventoryItem.objects.get(pk=id)
-        if name:
-            name = normalize_name(name)
-            inventory_item.name = name
-        if description:
-            description = description.strip()
-            inventory_item.description = description
-        if stock is not None:
-            if stock >= 0:
-                inventory_item.stock = stock
-            else:
-                raise ValueError("Stock must be a positive integer")
-        if type:
-            inventory_item.type = type
+        with transaction.atomic():
+            inventory_item = InventoryItem.objects.select_for_update().get(pk=id)
+            update_fields = ['updated_at']
+            if name:
+                name = normalize_name(name)
+                inventory_item.name = name
+                update_fields.append('name')
+            if description:
+                description = description.strip()
+                inventory_item.description = description
+                update_fields.append('description')
+            if stock is not None:
+                if stock >= 0:
+                    # The row is locked, so the adjustment recorded in the
+                    # ledger is exactly the difference written here.
+                    record_movements(
+                        [(inventory_item.pk, stock - inventory_item.stock)], 'ADJ')
+                    inventory_item.stock = stock
+                    update_fields.append('stock')
+                else:
+                    raise ValueError("Stock must be a positive integer")
+            if type:
+                inventory_item.type = type
+                update_fields.append('type')
 
-        inventory_item.save()
+            # Only the given columns are written, so concurrent reservations
+            # are not overwritten by a stale stock value.
+            inventory_item.save(update_fields=update_fields)
         return inventory_item
     except InventoryItem.DoesNotExist:
         raise ValueError("Item not found")
@@ -62,3 +87,165 @@ def update_inventory_item(id, name=None, description=None, stock=None, type=None
         raise ValueError(e)
     except Exception as e:
         raise ValueError(f"Unknown Error: {str(e)}")
+
+
+def _group_quantities(items):
+    quantities = defaultdict(int)
+    for item_id, quantity in items:
+        if quantity < 1:
+            raise ValueError("Quantity must be a positive integer")
+        try:
+            quantities[int(item_id)] += quantity
+        except (TypeError, ValueError):
+            raise ValueError("Item not found")
+    return quantities
+
+
+def _stock_failures(quantities, failed_ids):
+    available = dict(InventoryItem.objects.filter(
+        pk__in=failed_ids).values_list('id', 'stock'))
+    return [{'item_id': item_id, 'requested': quantities[item_id], 'available': available.get(item_id)}
+            for item_id in failed_ids]
+
+
+# Decrements every (item_id, quantity) pair or none of them and returns the
+# items that could not be reserved.
+def reserve_stock(items, kind='SAL'):
+    quantities = _group_quantities(items)
+    failed_ids = []
+    with transaction.atomic():
+        # Rows are locked in id order so concurrent sales cannot deadlock.
+        for item_id in sorted(quantities):
+            updated = InventoryItem.objects.filter(
+                pk=item_id, stock__gte=quantities[item_id],
+            ).update(stock=F('stock') - quantities[item_id], updated_at=timezone.now())
+            if not updated:
+                failed_ids.append(item_id)
+
+        if failed_ids:
+            failed_items = _stock_failures(quantities, failed_ids)
+            transaction.set_rollback(True)
+            return failed_items
+
+        record_movements(
+            [(item_id, -quantity) for item_id, quantity in quantities.items()], kind)
+        stock_changed.send(sender=InventoryItem, item_ids=sorted(quantities))
+    return []
+
+
+# Gives stock back for every (item_id, quantity) pair and returns the items
+# that do not exist.
+def release_stock(items, kind='SAL'):
+    quantities = _group_quantities(items)
+    failed_ids = []
+    with transaction.atomic():
+        for item_id in sorted(quantities):
+            updated = InventoryItem.objects.filter(pk=item_id).update(
+                stock=F('stock') + quantities[item_id], updated_at=timezone.now())
+            if not updated:
+                failed_ids.append(item_id)
+
+        if failed_ids:
+            failed_items = _stock_failures(quantities, failed_ids)
+            transaction.set_rollback(True)
+            return failed_items
+
+        record_movements(quantities.items(), kind)
+        stock_changed.send(sender=InventoryItem, item_ids=sorted(quantities))
+    return []
+
+
+BULK_ADJUST_STOCK_SQL = '''
+WITH adjustment(id, stock, delta) AS (
+    VALUES {values}
+),
+locked AS (
+    SELECT item.id, item.stock
+    FROM {table} item
+    JOIN adjustment ON adjustment.id = item.id
+    ORDER BY item.id
+    FOR UPDATE OF item
+),
+computed AS (
+    SELECT locked.id, locked.stock AS previous_stock,
+           COALESCE(adjustment.stock, locked.stock + adjustment.delta) AS stock
+    FROM locked
+    JOIN adjustment ON adjustment.id = locked.id
+),
+updated AS (
+    UPDATE {table} item
+    SET stock = computed.stock, updated_at = %s
+    FROM computed
+    WHERE item.id = computed.id AND computed.stock >= 0
+    RETURNING item.id
+)
+SELECT computed.id, computed.previous_stock, computed.stock, updated.id IS NOT NULL
+FROM computed
+LEFT JOIN updated ON updated.id = computed.id
+'''
+
+
+def _clean_adjustments(adjustments):
+    cleaned = {}
+    for adjustment in adjustments:
+        try:
+            item_id = int(adjustment['id'])
+        except (TypeError, ValueError):
+            raise ValueError(f"Item not found: {adjustment['id']}")
+        stock, delta = adjustment.get('stock'), adjustment.get('delta')
+        if (stock is None) == (delta is None):
+            raise ValueError(
+                f"Item {item_id}: give either a stock or a delta")
+        if item_id in cleaned:
+            raise ValueError(f"Item {item_id} is adjusted more than once")
+        cleaned[item_id] = (stock, delta)
+    return cleaned
+
+
+# Applies a physical count in one statement: rows are locked in id order, new
+# values are computed and checked for negativity in SQL, and the differences
+# go to the movement ledger in one insert.
+def bulk_adjust_stock(adjustments, partial=False, kind='ADJ'):
+    cleaned = _clean_adjustments(adjustments)
+    if not cleaned:
+        return []
+
+    values = ', '.join(['(%s::bigint, %s::integer, %s::integer)'] * len(cleaned))
+    params = [value for item_id, (stock, delta) in cleaned.items()
+              for value in (item_id, stock, delta)]
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(BULK_ADJUST_STOCK_SQL.format(
+                values=values, table=InventoryItem._meta.db_table), [*params, timezone.now()])
+            rows = {row[0]: row[1:] for row in cursor.fetchall()}
+
+        results = []
+        for item_id in cleaned:
+            result = {'id': item_id, 'previous_stock': None, 'stock': None, 'error': None}
+            if item_id not in rows:
+                result['error'] = "Item not found"
+            else:
+                previous_stock, stock, applied = rows[item_id]
+                result['previous_stock'] = previous_stock
+                if applied:
+                    result['stock'] = stock
+                else:
+                    result['error'] = "Stock must be a positive integer"
+            results.append(result)
+
+        failed = any(result['error'] for result in results)
+        if failed and not partial:
+            transaction.set_rollback(True)
+            for result in results:
+                if not result['error']:
+                    result['stock'] = None
+                    result['error'] = "Not applied because other adjustments failed"
+            return results
+
+        applied = [result for result in results if not result['error']]
+        record_movements(
+            [(result['id'], result['stock'] - result['previous_stock']) for result in applied], kind)
+        stock_changed.send(sender=InventoryItem, item_ids=sorted(
+            result['id'] for result in applied))
+    return results
@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
+
+    def ready(self):
+        from core.cache import reference_cache
+        from . import signals  # noqa: F401
+        from .triggers import install_material_triggers
+
+        for model_name in ('CarType', 'CarMake', 'ProductCategory', 'CustomOption'):
+            reference_cache.register(self.get_model(model_name))
+
+        # Migrations are generated per deployment, so the triggers are
+        # (re)installed after every migrate instead of from a migration file.
+        post_migrate.connect(install_material_triggers, sender=self,
+                             dispatch_uid='products_material_triggers')
@@ -0,0 +1,173 @@
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.db import transaction
+from core.cache import reference_cache
+from core.utils import normalize_name
+from inventories.ledger import record_movements
+from inventories.models import InventoryItem
+from .catalog import refresh_catalog_entries
+from .facets import invalidate_carpet_facets
+from .fitment import fitment_index
+from .models import (
+    CarModel,
+    ProductCategory,
+    CustomOption,
+    Carpet,
+)
+from .search import refresh_search_documents
+from .utils import compute_effective_price
+from .validators import get_material_errors
+
+BULK_BATCH_SIZE = 500
+
+CARPET_REQUIRED_FIELDS = (
+    'image_link',
+    'price',
+    'category_id',
+    'car_model_id',
+    'material_id',
+    'item_name',
+    'item_stock',
+)
+
+
+def _to_int(value, field):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValidationError(f'{field} must be an integer')
+
+
+def _to_id_list(value):
+    if value in (None, ''):
+        return []
+    if isinstance(value, str):
+        value = [part for part in value.replace('|', ';').split(';') if part.strip()]
+    return [_to_int(part, 'custom_options_ids') for part in value]
+
+
+def _clean_carpet_row(row):
+    missing = [field for field in CARPET_REQUIRED_FIELDS
+               if row.get(field) in (None, '')]
+    if missing:
+        raise ValidationError(f'Missing fields: {", ".join(missing)}')
+
+    image_link = str(row['image_link']).strip()
+    URLValidator()(image_link)
+
+    price = _to_int(row['price'], 'price')
+    stock = _to_int(row['item_stock'], 'item_stock')
+    if price < 0 or stock < 0:
+        raise ValidationError('Price and stock must be positive integers')
+
+    item_type = row.get('item_type') or 'MAT'
+    if item_type not in dict(InventoryItem.TYPE_CHOICES):
+        raise ValidationError(f'Unknown inventory item type: {item_type}')
+
+    description = row.get('item_description')
+    return {
+        'image_link': image_link,
+        'price': price,
+        'category_id': _to_int(row['category_id'], 'category_id'),
+        'car_model_id': _to_int(row['car_model_id'], 'car_model_id'),
+        'material_id': _to_int(row['material_id'], 'material_id'),
+        'custom_options_ids': _to_id_list(row.get('custom_options_ids')),
+        'item_name': normalize_name(str(row['item_name']), numbers=True),
+        'item_description': description.strip() if description else description,
+        'item_stock': stock,
+        'item_type': item_type,
+    }
+
+
+def _validation_message(error):
+    return '; '.join(error.messages)
+
+
+def bulk_create_carpets(rows, partial=False):
+    errors = {}
+    cleaned = {}
+    for index, row in enumerate(rows):
+        try:
+            cleaned[index] = _clean_carpet_row(row)
+        except ValidationError as e:
+            errors[index] = _validation_message(e)
+
+    # Every reference is resolved once for the whole batch.
+    categories = reference_cache.rows(ProductCategory)
+    custom_options = reference_cache.rows(CustomOption)
+    car_models = CarModel.objects.in_bulk(
+        {row['car_model_id'] for row in cleaned.values()})
+    material_errors = get_material_errors(
+        {row['material_id'] for row in cleaned.values()})
+    existing_names = set(InventoryItem.objects.filter(
+        name__in=[row['item_name'] for row in cleaned.values()]
+    ).values_list('name', flat=True))
+
+    batch_names = set()
+    for index, row in list(cleaned.items()):
+        if row['category_id'] not in categories:
+            errors[index] = 'Product category not found'
+        elif row['car_model_id'] not in car_models:
+            errors[index] = 'Car model not found'
+        elif row['material_id'] in material_errors:
+            errors[index] = material_errors[row['material_id']]
+        elif any(option_id not in custom_options for option_id in row['custom_options_ids']):
+            errors[index] = 'Custom option not found'
+        elif row['item_name'] in existing_names or row['item_name'] in batch_names:
+            errors[index] = 'Inventory item already exists'
+        batch_names.add(row['item_name'])
+        if index in errors:
+            del cleaned[index]
+
+    row_errors = [{'index': index, 'message': message}
+                  for index, message in sorted(errors.items())]
+    if not cleaned or (row_errors and not partial):
+        return [], row_errors
+
+    with transaction.atomic():
+        valid_rows = list(cleaned.values())
+        inventory_items = [
+            InventoryItem(
+                name=row['item_name'],
+                description=row['item_description'],
+                stock=row['item_stock'],
+                type=row['item_type'],
+            )
+            for row in valid_rows
+        ]
+        # bulk_create skips save(), so the stored status is set here.
+        for inventory_item in inventory_items:
+            inventory_item.refresh_status()
+        inventory_items = InventoryItem.objects.bulk_create(
+            inventory_items, batch_size=BULK_BATCH_SIZE)
+        record_movements(
+            [(item.pk, item.stock) for item in inventory_items], 'ADJ')
+
+        carpets = Carpet.objects.bulk_create([
+            Carpet(
+                image_link=row['image_link'],
+                price=row['price'],
+                effective_price=compute_effective_price(
+                    row['price'], categories[row['category_id']].discount),
+                category_id=row['category_id'],
+                car_model_id=row['car_model_id'],
+                inventory_item=inventory_item,
+                material_id=row['material_id'],
+            )
+            for row, inventory_item in zip(valid_rows, inventory_items)
+        ], batch_size=BULK_BATCH_SIZE)
+
+        CarpetCustomOption = Carpet.custom_options.through
+        CarpetCustomOption.objects.bulk_create([
+            CarpetCustomOption(carpet_id=carpet.pk, customoption_id=option_id)
+            for row, carpet in zip(valid_rows, carpets)
+            for option_id in set(row['custom_options_ids'])
+        ], batch_size=BULK_BATCH_SIZE)
+
+        created = Carpet.objects.filter(pk__in=[carpet.pk for carpet in carpets])
+        refresh_search_documents(created)
+        refresh_catalog_entries(created)
+        transaction.on_commit(fitment_index.invalidate)
+        transaction.on_commit(invalidate_carpet_facets)
+
+    return carpets, row_errors
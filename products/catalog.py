@@ -0,0 +1,65 @@
+from collections import defaultdict
+from .models import Carpet, CatalogEntry
+
+CATALOG_BATCH_SIZE = 500
+
+CATALOG_UPDATE_FIELDS = [
+    field.name for field in CatalogEntry._meta.concrete_fields
+    if not field.primary_key
+]
+
+
+def build_catalog_entry(carpet, custom_option_ids):
+    car_model = carpet.car_model
+    return CatalogEntry(
+        carpet_id=carpet.pk,
+        image_link=carpet.image_link,
+        price=carpet.price,
+        effective_price=carpet.effective_price,
+        category_id=carpet.category_id,
+        category_name=carpet.category.name,
+        discount=carpet.category.discount,
+        car_model_id=car_model.pk,
+        car_model_name=car_model.name,
+        year=car_model.year,
+        make_id=car_model.make_id,
+        make_name=car_model.make.name,
+        car_type_id=car_model.type_id,
+        car_type_name=car_model.type.name,
+        material_id=carpet.material_id,
+        material_name=carpet.material.name,
+        stock=carpet.inventory_item.stock,
+        stock_status=carpet.inventory_item.status,
+        custom_option_ids=sorted(custom_option_ids),
+    )
+
+
+def refresh_catalog_entries(carpets_qs):
+    # One joined read for the affected carpets, one read of their option links
+    # and one upsert per batch.
+    carpets = list(carpets_qs.order_by().select_related(
+        'category',
+        'car_model__make',
+        'car_model__type',
+        'inventory_item',
+        'material',
+    ))
+    if not carpets:
+        return 0
+
+    option_ids = defaultdict(list)
+    links = Carpet.custom_options.through.objects.filter(
+        carpet_id__in=[carpet.pk for carpet in carpets])
+    for carpet_id, option_id in links.values_list('carpet_id', 'customoption_id'):
+        option_ids[carpet_id].append(option_id)
+
+    entries = [build_catalog_entry(carpet, option_ids[carpet.pk])
+               for carpet in carpets]
+    CatalogEntry.objects.bulk_create(
+        entries,
+        batch_size=CATALOG_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['carpet'],
+        update_fields=CATALOG_UPDATE_FIELDS,
+    )
+    return len(entries)
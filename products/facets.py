@@ -0,0 +1,121 @@
+import hashlib
+import json
+from django.core.cache import cache
+from django.db import connection
+from graphql_relay import to_global_id
+from core.cache import get_version, bump_version
+from inventories.models import InventoryItem
+from .models import (
+    CarType,
+    CarMake,
+    CarModel,
+    ProductCategory,
+    Carpet,
+)
+
+FACETS_VERSION_KEY = 'products:facets'
+FACETS_CACHE_TIMEOUT = 60 * 10
+
+# Facet name -> (id column, name column, GraphQL type used for the global id).
+FACET_COLUMNS = {
+    'makes': ('make.id', 'make.name', 'CarMakeType'),
+    'car_types': ('car_type.id', 'car_type.name', 'CarTypeType'),
+    'categories': ('category.id', 'category.name', 'ProductCategoryType'),
+    'materials': ('material.id', 'material.name', 'InventoryItemType'),
+}
+
+
+def invalidate_carpet_facets():
+    bump_version(FACETS_VERSION_KEY)
+
+
+def _facets_cache_key(filters, price_bucket_size):
+    payload = json.dumps([filters, price_bucket_size],
+                         sort_keys=True, default=str)
+    digest = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    return f'{FACETS_VERSION_KEY}:{get_version(FACETS_VERSION_KEY)}:{digest}'
+
+
+def _facets_sql(carpet_ids_sql):
+    grouping_columns = ', '.join(
+        f'GROUPING({id_column})' for id_column, _, _ in FACET_COLUMNS.values())
+    selected_columns = ', '.join(
+        f'{id_column}, {name_column}' for id_column, name_column, _ in FACET_COLUMNS.values())
+    grouping_sets = ', '.join(
+        f'({id_column}, {name_column})' for id_column, name_column, _ in FACET_COLUMNS.values())
+
+    return f'''
+        SELECT {grouping_columns}, GROUPING(price_bucket.start),
+               {selected_columns}, price_bucket.start, COUNT(*)
+        FROM {Carpet._meta.db_table} carpet
+        JOIN {CarModel._meta.db_table} car_model ON car_model.id = carpet.car_model_id
+        JOIN {CarMake._meta.db_table} make ON make.id = car_model.make_id
+        JOIN {CarType._meta.db_table} car_type ON car_type.id = car_model.type_id
+        JOIN {ProductCategory._meta.db_table} category ON category.id = carpet.category_id
+        JOIN {InventoryItem._meta.db_table} material ON material.id = carpet.material_id
+        CROSS JOIN LATERAL (
+            SELECT (carpet.effective_price / %s) * %s AS start
+        ) price_bucket
+        WHERE carpet.id IN ({carpet_ids_sql})
+        GROUP BY GROUPING SETS ({grouping_sets}, (price_bucket.start), ())
+    '''
+
+
+def parse_facet_rows(rows, price_bucket_size):
+    # Row layout: one GROUPING() flag per facet plus one for the price
+    # bucket, then (id, name) per facet, the bucket start and the count.
+    facet_names = list(FACET_COLUMNS)
+    result = {name: [] for name in facet_names}
+    result['price_buckets'] = []
+    result['total_count'] = 0
+
+    facet_count = len(facet_names)
+    for row in rows:
+        grouped_away = row[:facet_count + 1]
+        values = row[facet_count + 1:-1]
+        count = row[-1]
+
+        if all(grouped_away):
+            result['total_count'] = count
+            continue
+        if not grouped_away[facet_count]:
+            start = values[-1]
+            result['price_buckets'].append({
+                'min_price': start,
+                'max_price': start + price_bucket_size - 1,
+                'count': count,
+            })
+            continue
+        for position, name in enumerate(facet_names):
+            if not grouped_away[position]:
+                value_id, value_name = values[position * 2:position * 2 + 2]
+                result[name].append({
+                    'id': to_global_id(FACET_COLUMNS[name][2], value_id),
+                    'name': value_name,
+                    'count': count,
+                })
+                break
+
+    for name in facet_names:
+        result[name].sort(key=lambda value: (-value['count'], value['name']))
+    result['price_buckets'].sort(key=lambda bucket: bucket['min_price'])
+    return result
+
+
+def compute_carpet_facets(queryset, price_bucket_size):
+    carpet_ids_sql, params = queryset.order_by().values('pk').query.sql_with_params()
+
+    # One grouped pass: each grouping set yields the counts of one facet.
+    with connection.cursor() as cursor:
+        cursor.execute(_facets_sql(carpet_ids_sql),
+                       [price_bucket_size, price_bucket_size, *params])
+        return parse_facet_rows(cursor.fetchall(), price_bucket_size)
+
+
+def get_carpet_facets(filterset, price_bucket_size):
+    cache_key = _facets_cache_key(filterset.data, price_bucket_size)
+    facets = cache.get(cache_key)
+    if facets is None:
+        facets = compute_carpet_facets(filterset.qs, price_bucket_size)
+        cache.set(cache_key, facets, FACETS_CACHE_TIMEOUT)
+    return facets
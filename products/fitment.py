@@ -0,0 +1,155 @@
+import threading
+from core.cache import get_version, bump_version
+from .models import CarModel, Carpet
+
+
+# Per-worker map of make -> year -> car model -> carpet ids. Only ids are
+# kept, so stock, prices and related rows are always read fresh by primary
+# key. Local changes are applied incrementally; changes made by other workers
+# are picked up through the shared version key, which forces a rebuild on
+# the next lookup.
+class FitmentIndex:
+    version_key = 'products:fitment'
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None
+        self._makes = {}
+        self._car_models = {}
+        self._carpets = {}
+
+    def lookup(self, make_id, year):
+        with self._lock:
+            self._ensure_current()
+            matches = [
+                (car_model_id, sorted(carpet_ids))
+                for car_model_id, carpet_ids in sorted(
+                    self._makes.get(make_id, {}).get(year, {}).items())
+            ]
+        if not matches:
+            return []
+
+        car_models = CarModel.objects.select_related('make', 'type').in_bulk(
+            [car_model_id for car_model_id, _ in matches])
+        carpets = Carpet.objects.defer('search_document', 'search_vector').in_bulk(
+            [carpet_id for _, carpet_ids in matches for carpet_id in carpet_ids])
+        return [
+            {
+                'car_model': car_models[car_model_id],
+                'carpets': [
+                    self._carpet_entry(carpets[carpet_id])
+                    for carpet_id in carpet_ids if carpet_id in carpets
+                ],
+            }
+            for car_model_id, carpet_ids in matches if car_model_id in car_models
+        ]
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+            bump_version(self.version_key)
+
+    def car_model_saved(self, car_model):
+        with self._lock:
+            if self._begin_change():
+                self._remove_car_model(car_model.pk)
+                self._add_car_model(car_model.pk, car_model.make_id, car_model.year)
+                for carpet_id, car_model_id in self._carpets.items():
+                    if car_model_id == car_model.pk:
+                        self._add_carpet(carpet_id, car_model_id)
+            self._end_change()
+
+    def car_model_deleted(self, car_model):
+        with self._lock:
+            if self._begin_change():
+                self._remove_car_model(car_model.pk)
+            self._end_change()
+
+    def carpet_saved(self, carpet):
+        with self._lock:
+            if self._begin_change():
+                self._remove_carpet(carpet.pk)
+                self._carpets[carpet.pk] = carpet.car_model_id
+                self._add_carpet(carpet.pk, carpet.car_model_id)
+            self._end_change()
+
+    def carpet_deleted(self, carpet):
+        with self._lock:
+            if self._begin_change():
+                self._remove_carpet(carpet.pk)
+            self._end_change()
+
+    def _ensure_current(self):
+        version = get_version(self.version_key)
+        if self._version != version:
+            self._rebuild()
+            self._version = version
+
+    def _rebuild(self):
+        self._makes = {}
+        self._car_models = {}
+        self._carpets = {}
+        for car_model_id, make_id, year in CarModel.objects.values_list(
+                'pk', 'make_id', 'year'):
+            self._add_car_model(car_model_id, make_id, year)
+        for carpet_id, car_model_id in Carpet.objects.values_list('pk', 'car_model_id'):
+            self._carpets[carpet_id] = car_model_id
+            self._add_carpet(carpet_id, car_model_id)
+
+    def _begin_change(self):
+        # Only patch an index that is still in sync with the shared version,
+        # otherwise the next lookup rebuilds it anyway.
+        return self._version is not None and self._version == get_version(self.version_key)
+
+    def _end_change(self):
+        # bump_version is a single atomic increment, so getting exactly the
+        # next version proves no other writer bumped since the patched index
+        # was current. Any other result means a change this worker has not
+        # seen, and the next lookup rebuilds.
+        previous_version = self._version
+        version = bump_version(self.version_key)
+        if previous_version is not None and version == previous_version + 1:
+            self._version = version
+        else:
+            self._version = None
+
+    def _add_car_model(self, car_model_id, make_id, year):
+        self._car_models[car_model_id] = (make_id, year)
+        self._makes.setdefault(make_id, {}).setdefault(
+            year, {}).setdefault(car_model_id, set())
+
+    def _remove_car_model(self, car_model_id):
+        location = self._car_models.pop(car_model_id, None)
+        if location is None:
+            return
+        make_id, year = location
+        years = self._makes.get(make_id, {})
+        years.get(year, {}).pop(car_model_id, None)
+        if not years.get(year):
+            years.pop(year, None)
+        if not years:
+            self._makes.pop(make_id, None)
+
+    def _add_carpet(self, carpet_id, car_model_id):
+        location = self._car_models.get(car_model_id)
+        if location is None:
+            return
+        make_id, year = location
+        self._makes[make_id][year][car_model_id].add(carpet_id)
+
+    def _remove_carpet(self, carpet_id):
+        car_model_id = self._carpets.pop(carpet_id, None)
+        location = self._car_models.get(car_model_id)
+        if location is None:
+            return
+        make_id, year = location
+        self._makes[make_id][year][car_model_id].discard(carpet_id)
+
+    def _carpet_entry(self, carpet):
+        return {
+            'carpet': carpet,
+            'effective_price': carpet.effective_price,
+        }
+
+
+fitment_index = FitmentIndex()
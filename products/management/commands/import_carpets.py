@@ -0,0 +1,45 @@
+import csv
+import json
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from products.bulk import bulk_create_carpets
+
+
+class Command(BaseCommand):
+    help = 'Import carpets (with their inventory items) from a CSV or JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='.csv or .jsonl file to import')
+        parser.add_argument(
+            '--partial', action='store_true',
+            help='Import the valid rows even if some rows have errors')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'File "{path}" does not exist')
+
+        with path.open(encoding='utf-8', newline='') as file:
+            if path.suffix.lower() == '.csv':
+                rows = list(csv.DictReader(file))
+            elif path.suffix.lower() in ('.jsonl', '.ndjson'):
+                try:
+                    rows = [json.loads(line) for line in file if line.strip()]
+                except json.JSONDecodeError as e:
+                    raise CommandError(f'Invalid JSON line: {e}')
+            else:
+                raise CommandError('Only .csv and .jsonl files are supported')
+
+        carpets, errors = bulk_create_carpets(
+            rows, partial=options['partial'])
+
+        for error in errors:
+            self.stdout.write(self.style.WARNING(
+                f'Row {error["index"] + 1}: {error["message"]}'))
+
+        if errors and not options['partial']:
+            raise CommandError(
+                f'{len(errors)} rows have errors, nothing was imported. Use --partial to import the valid rows.')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {len(carpets)} carpets ({len(errors)} rows skipped)'))
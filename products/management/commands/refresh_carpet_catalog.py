@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from products.models import Carpet
+from products.catalog import refresh_catalog_entries
+from products.search import refresh_search_documents
+
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized carpet data (effective prices, search documents and catalog entries)'
+
+    def handle(self, *args, **options):
+        carpets = Carpet.objects.all()
+
+        updated = carpets.refresh_effective_prices()
+        self.stdout.write(self.style.SUCCESS(
+            f'Refreshed effective prices for {updated} carpets'))
+
+        refreshed = refresh_search_documents(carpets)
+        self.stdout.write(self.style.SUCCESS(
+            f'Refreshed search documents for {refreshed} carpets'))
+
+        refreshed = refresh_catalog_entries(carpets)
+        self.stdout.write(self.style.SUCCESS(
+            f'Refreshed catalog entries for {refreshed} carpets'))
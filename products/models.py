@@ -1,7 +1,11 @@
 import datetime
 from django.db import models
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from inventories.models import InventoryItem
+from .utils import compute_effective_price
 from .validators import validate_material_is_raw
 
 
@@ -68,6 +72,13 @@ class CustomOptionDetail(models.Model):
         blank=False, null=False, validators=[MinValueValidator(0)])
 
 
+class CarpetQuerySet(models.QuerySet):
+    def refresh_effective_prices(self):
+        discount = models.Subquery(ProductCategory.objects.filter(
+            pk=models.OuterRef('category_id')).values('discount')[:1])
+        return self.update(effective_price=models.F('price') * (100 - discount) / 100)
+
+
 class Carpet(models.Model):
     image_link = models.URLField(blank=False, null=False)
     price = models.IntegerField(
@@ -82,3 +93,65 @@ class Carpet(models.Model):
         InventoryItem, on_delete=models.PROTECT, related_name='material', null=False, blank=False, validators=[validate_material_is_raw])
     custom_options = models.ManyToManyField(
         CustomOption, blank=True)
+    effective_price = models.IntegerField(
+        default=0, db_index=True, editable=False)
+    search_document = models.TextField(
+        default='', blank=True, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'],
+                     name='carpet_search_vector_idx'),
+        ]
+
+    objects = CarpetQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        self.effective_price = compute_effective_price(
+            self.price, self.category.discount)
+        super().save(*args, **kwargs)
+
+
+class CatalogEntry(models.Model):
+    carpet = models.OneToOneField(
+        Carpet, on_delete=models.CASCADE, primary_key=True, related_name='catalog_entry')
+    image_link = models.URLField()
+    price = models.IntegerField()
+    effective_price = models.IntegerField()
+    category_id = models.BigIntegerField()
+    category_name = models.CharField(max_length=50)
+    discount = models.IntegerField()
+    car_model_id = models.BigIntegerField()
+    car_model_name = models.CharField(max_length=50)
+    year = models.IntegerField()
+    make_id = models.BigIntegerField()
+    make_name = models.CharField(max_length=50)
+    car_type_id = models.BigIntegerField()
+    car_type_name = models.CharField(max_length=50)
+    material_id = models.BigIntegerField()
+    material_name = models.CharField(max_length=100)
+    stock = models.IntegerField()
+    stock_status = models.CharField(max_length=20)
+    custom_option_ids = ArrayField(
+        models.BigIntegerField(), default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['make_id', 'year'],
+                         name='catalog_make_year_idx'),
+            models.Index(fields=['car_model_id'],
+                         name='catalog_car_model_idx'),
+            models.Index(fields=['category_id', 'effective_price'],
+                         name='catalog_category_price_idx'),
+            models.Index(fields=['effective_price'],
+                         name='catalog_effective_price_idx'),
+            models.Index(fields=['stock_status'],
+                         name='catalog_stock_status_idx'),
+            GinIndex(fields=['custom_option_ids'],
+                     name='catalog_custom_options_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.make_name} {self.car_model_name} {self.year} ({self.category_name})'
@@ -0,0 +1,55 @@
+from django.db import transaction
+from core.cache import reference_cache
+from .catalog import refresh_catalog_entries
+from .models import CustomOption, Carpet
+
+OPTIONS_BATCH_SIZE = 500
+
+
+def _parse_ids(model, ids):
+    try:
+        return {int(pk) for pk in ids or []}
+    except (TypeError, ValueError):
+        raise model.DoesNotExist(
+            f'{model._meta.object_name} matching query does not exist.')
+
+
+# Replaces (custom_option_ids) or patches (add_ids / remove_ids) the options
+# of many carpets with one delete and one insert on the through table.
+def set_custom_options(carpet_ids, custom_option_ids=None, add_ids=None, remove_ids=None):
+    carpet_ids = _parse_ids(Carpet, carpet_ids)
+    replace_ids = None if custom_option_ids is None else _parse_ids(
+        CustomOption, custom_option_ids)
+    add_ids = _parse_ids(CustomOption, add_ids)
+    remove_ids = _parse_ids(CustomOption, remove_ids)
+
+    custom_options = reference_cache.rows(CustomOption)
+    if any(pk not in custom_options for pk in (replace_ids or set()) | add_ids | remove_ids):
+        raise CustomOption.DoesNotExist('CustomOption matching query does not exist.')
+
+    carpets = Carpet.objects.filter(pk__in=carpet_ids)
+    if len(carpets.values_list('pk', flat=True)) != len(carpet_ids):
+        raise Carpet.DoesNotExist('Carpet matching query does not exist.')
+
+    if replace_ids is not None:
+        add_ids = replace_ids
+    remove_ids -= add_ids
+
+    CarpetCustomOption = Carpet.custom_options.through
+    with transaction.atomic():
+        links = CarpetCustomOption.objects.filter(carpet_id__in=carpet_ids)
+        if replace_ids is not None:
+            links.exclude(customoption_id__in=replace_ids).delete()
+        elif remove_ids:
+            links.filter(customoption_id__in=remove_ids).delete()
+
+        CarpetCustomOption.objects.bulk_create([
+            CarpetCustomOption(carpet_id=carpet_id, customoption_id=option_id)
+            for carpet_id in carpet_ids
+            for option_id in add_ids
+        ], batch_size=OPTIONS_BATCH_SIZE, ignore_conflicts=True)
+
+        # Through-table writes skip m2m_changed, so the catalog is refreshed here.
+        refresh_catalog_entries(carpets)
+
+    return carpets
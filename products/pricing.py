@@ -0,0 +1,86 @@
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db.models import Q
+from .models import Carpet, CustomOptionDetail
+
+QUOTE_MAX_CONFIGURATIONS = 500
+
+
+def _parse_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def quote_configurations(configurations):
+    if len(configurations) > QUOTE_MAX_CONFIGURATIONS:
+        raise ValueError(
+            f'A quote accepts at most {QUOTE_MAX_CONFIGURATIONS} configurations')
+
+    parsed = []
+    for configuration in configurations:
+        # A repeated option detail is charged once.
+        detail_ids = list(dict.fromkeys(
+            _parse_id(detail_id) for detail_id in configuration.get('option_detail_ids') or []))
+        # An explicit null quantity means the default of one carpet.
+        quantity = configuration.get('quantity')
+        parsed.append((_parse_id(configuration.get('carpet_id')),
+                      1 if quantity is None else quantity, detail_ids))
+
+    carpet_ids = {carpet_id for carpet_id, _, _ in parsed if carpet_id}
+    detail_ids = {detail_id for _, _, ids in parsed for detail_id in ids if detail_id}
+
+    # Two reads in total: carpets with their allowed/required option ids
+    # aggregated in SQL, and every selected option detail.
+    carpets = Carpet.objects.filter(pk__in=carpet_ids).annotate(
+        option_ids=ArrayAgg(
+            'custom_options', filter=Q(custom_options__isnull=False),
+            distinct=True, default=[]),
+        required_option_ids=ArrayAgg(
+            'custom_options', filter=Q(custom_options__required=True),
+            distinct=True, default=[]),
+    ).only('id', 'effective_price').in_bulk()
+    details = CustomOptionDetail.objects.filter(pk__in=detail_ids).only(
+        'id', 'price', 'custom_option_id').in_bulk()
+
+    lines = []
+    for (carpet_id, quantity, line_detail_ids), configuration in zip(parsed, configurations):
+        line = {
+            'carpet_id': configuration.get('carpet_id'),
+            'quantity': quantity,
+            'unit_price': None,
+            'options_price': None,
+            'total_price': None,
+            'error': None,
+        }
+        lines.append(line)
+
+        carpet = carpets.get(carpet_id)
+        if carpet is None:
+            line['error'] = 'Carpet not found'
+            continue
+        if quantity < 1:
+            line['error'] = 'Quantity must be at least 1'
+            continue
+        if any(detail_id not in details for detail_id in line_detail_ids):
+            line['error'] = 'Custom option detail not found'
+            continue
+
+        selected = [details[detail_id] for detail_id in line_detail_ids]
+        selected_options = {detail.custom_option_id for detail in selected}
+        if not selected_options <= set(carpet.option_ids):
+            line['error'] = 'Custom option not available for this carpet'
+            continue
+        if not set(carpet.required_option_ids) <= selected_options:
+            line['error'] = 'Required custom options are missing'
+            continue
+
+        line['unit_price'] = carpet.effective_price
+        line['options_price'] = sum(detail.price for detail in selected)
+        line['total_price'] = quantity * carpet.effective_price + \
+            line['options_price']
+
+    return {
+        'lines': lines,
+        'total_price': sum(line['total_price'] for line in lines if line['error'] is None),
+    }
@@ -1,9 +1,15 @@
 import graphene
 from graphql import GraphQLError
+from graphene_django import DjangoConnectionField
 from graphene_django.filter import DjangoFilterConnectionField
+from graphene_django.filter.utils import (
+    get_filtering_args_from_filterset,
+    get_filterset_class,
+)
 from django.db import IntegrityError, transaction
 from django.core.exceptions import ValidationError
 from graphql_jwt.decorators import login_required, permission_required
+from core.cache import get_reference
 from core.utils import normalize_name
 from inventories.models import InventoryItem
 from inventories.utils import (
@@ -19,6 +25,7 @@ from .models import (
     CustomOption,
     CustomOptionDetail,
     Carpet,
+    CatalogEntry,
 )
 from .types import (
     CarTypeType,
@@ -28,7 +35,31 @@ from .types import (
     CustomOptionType,
     CustomOptionDetailType,
     CarpetType,
+    CatalogEntryType,
+    FitmentModelType,
+    QuoteConfigurationInput,
+    QuoteType,
+    CarpetInput,
+    BulkRowErrorType,
+    CarpetFilter,
+    CarpetFacetsType,
 )
+from .bulk import bulk_create_carpets
+from .facets import get_carpet_facets
+from .fitment import fitment_index
+from .options import set_custom_options
+from .pricing import quote_configurations
+from .search import search_carpets
+from .validators import validate_material_is_raw
+
+BULK_CARPETS_MAX_ROWS = 1000
+
+CARPET_FACETS_FILTERSET = get_filterset_class(CarpetFilter)
+CARPET_FACETS_FILTER_ARGS = {
+    name: argument
+    for name, argument in get_filtering_args_from_filterset(CARPET_FACETS_FILTERSET, CarpetType).items()
+    if name != 'order_by'
+}
 
 
 class CreateCarTypeMutation(graphene.Mutation):
@@ -179,9 +210,9 @@ class CreateCarModelMutation(graphene.Mutation):
     def mutate(self, info, name, year, type_id, make_id):
 
         try:
-            car_type = CarType.objects.get(pk=type_id)
+            car_type = get_reference(CarType, type_id)
 
-            car_make = CarMake.objects.get(pk=make_id)
+            car_make = get_reference(CarMake, make_id)
 
             name = normalize_name(name, numbers=True)
 
@@ -248,10 +279,10 @@ class UpdateCarModelMutation(graphene.Mutation):
             if year:
                 car_model.year = year
             if type_id:
-                car_type = CarType.objects.get(pk=type_id)
+                car_type = get_reference(CarType, type_id)
                 car_model.type = car_type
             if make_id:
-                car_make = CarMake.objects.get(pk=make_id)
+                car_make = get_reference(CarMake, make_id)
                 car_model.make = car_make
 
             car_model.save()
@@ -452,7 +483,7 @@ class CreateCustomOptionDetailMutation(graphene.Mutation):
     def mutate(self, info, name, image_url, price, custom_option_id):
         try:
             name = normalize_name(name, numbers=True)
-            custom_option = CustomOption.objects.get(pk=custom_option_id)
+            custom_option = get_reference(CustomOption, custom_option_id)
             custom_option_detail = CustomOptionDetail(
                 name=name, image_url=image_url, price=price, custom_option=custom_option)
             custom_option_detail.save()
@@ -516,7 +547,7 @@ class UpdateCustomOptionDetailMutation(graphene.Mutation):
             if price:
                 custom_option_detail.price = price
             if custom_option_id:
-                custom_option = CustomOption.objects.get(pk=custom_option_id)
+                custom_option = get_reference(CustomOption, custom_option_id)
                 custom_option_detail.custom_option = custom_option
 
             custom_option_detail.save()
@@ -556,9 +587,10 @@ class CreateCarpetMutation(graphene.Mutation):
 
         try:
             with transaction.atomic():
-                category = ProductCategory.objects.get(pk=category_id)
+                category = get_reference(ProductCategory, category_id)
                 car_model = CarModel.objects.get(pk=car_model_id)
                 material = InventoryItem.objects.get(pk=material_id)
+                validate_material_is_raw(material)
 
                 item_name = normalize_name(item_name, numbers=True)
 
@@ -576,10 +608,8 @@ class CreateCarpetMutation(graphene.Mutation):
                 carpet.save()
 
                 if custom_options_ids:
-                    for custom_option_id in custom_options_ids:
-                        custom_option = CustomOption.objects.get(
-                            pk=custom_option_id)
-                        carpet.custom_options.add(custom_option)
+                    set_custom_options(
+                        [carpet.pk], add_ids=custom_options_ids)
 
                 return CreateCarpetMutation(carpet=carpet)
         except ProductCategory.DoesNotExist:
@@ -658,27 +688,21 @@ class UpdateCarpetMutation(graphene.Mutation):
                 if price:
                     carpet.price = price
                 if category_id:
-                    category = ProductCategory.objects.get(pk=category_id)
+                    category = get_reference(ProductCategory, category_id)
                     carpet.category = category
                 if car_model_id:
                     car_model = CarModel.objects.get(pk=car_model_id)
                     carpet.car_model = car_model
                 if material_id:
                     material = InventoryItem.objects.get(pk=material_id)
+                    validate_material_is_raw(material)
                     carpet.material = material
                 if item_name or item_description or item_stock or item_type:
                     update_inventory_item(
                         id=carpet.inventory_item.id, name=item_name, description=item_description, stock=item_stock, type=item_type)
-                if add_custom_options_ids:
-                    for custom_option_id in add_custom_options_ids:
-                        custom_option = CustomOption.objects.get(
-                            pk=custom_option_id)
-                        carpet.custom_options.add(custom_option)
-                if remove_custom_options_ids:
-                    for custom_option_id in remove_custom_options_ids:
-                        custom_option = CustomOption.objects.get(
-                            pk=custom_option_id)
-                        carpet.custom_options.remove(custom_option)
+                if add_custom_options_ids or remove_custom_options_ids:
+                    set_custom_options(
+                        [carpet.pk], add_ids=add_custom_options_ids, remove_ids=remove_custom_options_ids)
 
                 carpet.save()
                 return UpdateCarpetMutation(carpet=carpet)
@@ -700,6 +724,71 @@ class UpdateCarpetMutation(graphene.Mutation):
             raise GraphQLError(f"Unknown error: {str(e)}")
 
 
+class SetCustomOptionsMutation(graphene.Mutation):
+    class Arguments:
+        carpet_ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+        custom_options_ids = graphene.List(
+            graphene.NonNull(graphene.ID), description='Replace the options of every carpet with this list')
+        add_custom_options_ids = graphene.List(graphene.NonNull(graphene.ID))
+        remove_custom_options_ids = graphene.List(graphene.NonNull(graphene.ID))
+
+    carpets = graphene.List(CarpetType)
+
+    @login_required
+    @permission_required('products.change_carpet')
+    def mutate(self, info, carpet_ids, custom_options_ids=None, add_custom_options_ids=None, remove_custom_options_ids=None):
+
+        if not carpet_ids:
+            raise GraphQLError("At least one carpet should be given")
+        if custom_options_ids is None and not add_custom_options_ids and not remove_custom_options_ids:
+            raise GraphQLError("At least one field should be filled")
+        if custom_options_ids is not None and (add_custom_options_ids or remove_custom_options_ids):
+            raise GraphQLError(
+                "customOptionsIds can not be combined with add or remove lists")
+
+        try:
+            carpets = set_custom_options(
+                carpet_ids,
+                custom_option_ids=custom_options_ids,
+                add_ids=add_custom_options_ids,
+                remove_ids=remove_custom_options_ids,
+            )
+            return SetCustomOptionsMutation(carpets=carpets)
+        except Carpet.DoesNotExist:
+            raise GraphQLError('Carpet not found')
+        except CustomOption.DoesNotExist:
+            raise GraphQLError('Custom option not found')
+        except IntegrityError as e:
+            raise GraphQLError(f"Unknown Integrity error: {str(e)}")
+        except Exception as e:
+            raise GraphQLError(f"Unknown error: {str(e)}")
+
+
+class BulkCreateCarpetsMutation(graphene.Mutation):
+    class Arguments:
+        carpets = graphene.List(graphene.NonNull(CarpetInput), required=True)
+        partial = graphene.Boolean(
+            default_value=False, description='Create the valid rows even if some rows have errors')
+
+    carpets = graphene.List(CarpetType)
+    errors = graphene.List(BulkRowErrorType)
+
+    @login_required
+    @permission_required('products.add_carpet')
+    def mutate(self, info, carpets, partial=False):
+        if len(carpets) > BULK_CARPETS_MAX_ROWS:
+            raise GraphQLError(
+                f"At most {BULK_CARPETS_MAX_ROWS} carpets can be created at once")
+
+        try:
+            created, errors = bulk_create_carpets(carpets, partial=partial)
+            return BulkCreateCarpetsMutation(carpets=created, errors=errors)
+        except IntegrityError as e:
+            raise GraphQLError(f"Unknown Integrity error: {str(e)}")
+        except Exception as e:
+            raise GraphQLError(f"Unknown error: {str(e)}")
+
+
 class Query(graphene.ObjectType):
     car_types = DjangoFilterConnectionField(CarTypeType)
     car_type = graphene.Field(CarTypeType, id=graphene.ID(required=True))
@@ -712,18 +801,27 @@ class Query(graphene.ObjectType):
         ProductCategoryType, id=graphene.ID(required=True))
     carpets = DjangoFilterConnectionField(CarpetType)
     carpet = graphene.Field(CarpetType, id=graphene.ID(required=True))
+    catalog = DjangoFilterConnectionField(CatalogEntryType)
+    search_carpets = DjangoConnectionField(
+        CarpetType, query=graphene.String(required=True))
+    fitment = graphene.List(FitmentModelType, make_id=graphene.ID(
+        required=True), year=graphene.Int(required=True))
+    quote = graphene.Field(QuoteType, configurations=graphene.List(
+        graphene.NonNull(QuoteConfigurationInput), required=True))
+    carpet_facets = graphene.Field(
+        CarpetFacetsType, price_bucket_size=graphene.Int(default_value=50000), **CARPET_FACETS_FILTER_ARGS)
 
     def resolve_car_types(self, info, **kwargs):
         return CarType.objects.all()
 
     def resolve_car_type(self, info, id):
-        return CarType.objects.get(pk=id)
+        return get_reference(CarType, id)
 
     def resolve_car_makes(self, info, **kwargs):
         return CarMake.objects.all()
 
     def resolve_car_make(self, info, id):
-        return CarMake.objects.get(pk=id)
+        return get_reference(CarMake, id)
 
     def resolve_car_models(self, info, **kwargs):
         return CarModel.objects.all()
@@ -735,7 +833,7 @@ class Query(graphene.ObjectType):
         return ProductCategory.objects.all()
 
     def resolve_product_category(self, info, id):
-        return ProductCategory.objects.get(pk=id)
+        return get_reference(ProductCategory, id)
 
     def resolve_carpets(self, info, **kwargs):
         return Carpet.objects.all()
@@ -743,6 +841,35 @@ class Query(graphene.ObjectType):
     def resolve_carpet(self, info, id):
         return Carpet.objects.get(pk=id)
 
+    def resolve_catalog(self, info, **kwargs):
+        return CatalogEntry.objects.all()
+
+    def resolve_search_carpets(self, info, query, **kwargs):
+        return search_carpets(query)
+
+    def resolve_fitment(self, info, make_id, year):
+        try:
+            make_id = int(make_id)
+        except ValueError:
+            raise GraphQLError('Car make not found')
+        return fitment_index.lookup(make_id, year)
+
+    def resolve_quote(self, info, configurations):
+        try:
+            return quote_configurations(configurations)
+        except ValueError as e:
+            raise GraphQLError(str(e))
+
+    def resolve_carpet_facets(self, info, price_bucket_size=50000, **kwargs):
+        if price_bucket_size < 1:
+            raise GraphQLError("Price bucket size must be a positive integer")
+
+        filterset = CARPET_FACETS_FILTERSET(
+            data=kwargs, queryset=Carpet.objects.all(), request=info.context)
+        if not filterset.is_valid():
+            raise GraphQLError(filterset.form.errors.as_json())
+        return get_carpet_facets(filterset, price_bucket_size)
+
 
 class Mutation(graphene.ObjectType):
     create_car_type = CreateCarTypeMutation.Field()
@@ -766,3 +893,5 @@ class Mutation(graphene.ObjectType):
     create_carpet = CreateCarpetMutation.Field()
     delete_carpet = DeleteCarpetMutation.Field()
     update_carpet = UpdateCarpetMutation.Field()
+    set_custom_options = SetCustomOptionsMutation.Field()
+    bulk_create_carpets = BulkCreateCarpetsMutation.Field()
@@ -0,0 +1,71 @@
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import F
+from core.utils import fold_accents
+from .models import Carpet
+
+SEARCH_CONFIG = 'simple'
+SEARCH_TOKEN_PATTERN = re.compile(r'[^\W_]+')
+SEARCH_REFRESH_BATCH_SIZE = 500
+
+SEARCH_DOCUMENT_FIELDS = (
+    'pk',
+    'car_model__make__name',
+    'car_model__name',
+    'car_model__year',
+    'car_model__type__name',
+    'category__name',
+    'material__name',
+)
+
+
+def build_search_document(*values):
+    return fold_accents(' '.join(str(value) for value in values if value is not None))
+
+
+def refresh_search_documents(carpets):
+    # Names live on related tables, so the document is denormalized onto the
+    # carpet row and the tsvector is rebuilt from it in a single UPDATE.
+    refreshed_ids = []
+    batch = []
+    for pk, *values in carpets.values_list(*SEARCH_DOCUMENT_FIELDS).iterator():
+        batch.append(Carpet(pk=pk, search_document=build_search_document(*values)))
+        if len(batch) >= SEARCH_REFRESH_BATCH_SIZE:
+            Carpet.objects.bulk_update(batch, ['search_document'])
+            refreshed_ids.extend(carpet.pk for carpet in batch)
+            batch = []
+    if batch:
+        Carpet.objects.bulk_update(batch, ['search_document'])
+        refreshed_ids.extend(carpet.pk for carpet in batch)
+
+    if refreshed_ids:
+        Carpet.objects.filter(pk__in=refreshed_ids).update(
+            search_vector=SearchVector('search_document', config=SEARCH_CONFIG))
+    return len(refreshed_ids)
+
+
+def build_raw_search_query(text):
+    tokens = SEARCH_TOKEN_PATTERN.findall(fold_accents(text))
+    # Every term must match; the last one may still be half typed, so all
+    # terms use prefix matching.
+    return ' & '.join(f'{token}:*' for token in tokens)
+
+
+def build_search_query(text):
+    raw_query = build_raw_search_query(text)
+    if not raw_query:
+        return None
+    return SearchQuery(raw_query, search_type='raw', config=SEARCH_CONFIG)
+
+
+def search_carpets(text, queryset=None):
+    if queryset is None:
+        queryset = Carpet.objects.all()
+
+    search_query = build_search_query(text)
+    if search_query is None:
+        return queryset.none()
+
+    return queryset.filter(search_vector=search_query).annotate(
+        rank=SearchRank(F('search_vector'), search_query)
+    ).order_by('-rank', 'pk')
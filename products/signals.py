@@ -0,0 +1,186 @@
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from core.autocomplete import invalidate_autocomplete
+from inventories.models import InventoryItem
+from inventories.signals import stock_changed
+from .models import (
+    CarType,
+    CarMake,
+    CarModel,
+    ProductCategory,
+    CustomOption,
+    Carpet,
+    CatalogEntry,
+)
+from .catalog import refresh_catalog_entries
+from .facets import invalidate_carpet_facets
+from .fitment import fitment_index
+from .search import refresh_search_documents
+
+
+@receiver(post_save, sender=Carpet)
+def refresh_carpet_search(sender, instance, **kwargs):
+    refresh_search_documents(Carpet.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=CarModel)
+def refresh_car_model_search(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_documents(Carpet.objects.filter(car_model=instance))
+
+
+@receiver(post_save, sender=CarMake)
+def refresh_car_make_search(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_documents(
+            Carpet.objects.filter(car_model__make=instance))
+
+
+@receiver(post_save, sender=CarType)
+def refresh_car_type_search(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_documents(
+            Carpet.objects.filter(car_model__type=instance))
+
+
+@receiver(post_save, sender=ProductCategory)
+def refresh_category_search(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_documents(Carpet.objects.filter(category=instance))
+
+
+@receiver(post_save, sender=ProductCategory)
+def refresh_category_effective_prices(sender, instance, created, **kwargs):
+    if not created:
+        Carpet.objects.filter(category=instance).refresh_effective_prices()
+
+
+@receiver(post_save, sender=InventoryItem)
+def refresh_material_search(sender, instance, created, update_fields, **kwargs):
+    # Only the material name feeds the search documents.
+    if not created and instance.type == 'RAW' and instance.name_changed(update_fields):
+        refresh_search_documents(Carpet.objects.filter(material=instance))
+
+
+@receiver(post_save, sender=CarModel)
+def update_car_model_fitment(sender, instance, **kwargs):
+    transaction.on_commit(lambda: fitment_index.car_model_saved(instance))
+
+
+@receiver(post_delete, sender=CarModel)
+def remove_car_model_fitment(sender, instance, **kwargs):
+    transaction.on_commit(
+        lambda: fitment_index.car_model_deleted(instance))
+
+
+@receiver(post_save, sender=Carpet)
+def update_carpet_fitment(sender, instance, **kwargs):
+    transaction.on_commit(lambda: fitment_index.carpet_saved(instance))
+
+
+@receiver(post_delete, sender=Carpet)
+def remove_carpet_fitment(sender, instance, **kwargs):
+    transaction.on_commit(lambda: fitment_index.carpet_deleted(instance))
+
+
+@receiver(post_save, sender=CarMake)
+@receiver(post_save, sender=CarType)
+@receiver(post_save, sender=ProductCategory)
+def invalidate_fitment(sender, instance, created, **kwargs):
+    if not created:
+        transaction.on_commit(fitment_index.invalidate)
+
+
+@receiver(post_save, sender=CarMake)
+@receiver(post_delete, sender=CarMake)
+def invalidate_car_make_autocomplete(sender, **kwargs):
+    transaction.on_commit(lambda: invalidate_autocomplete('car_make'))
+
+
+@receiver(post_save, sender=CarModel)
+@receiver(post_delete, sender=CarModel)
+@receiver(post_save, sender=CarMake)
+def invalidate_car_model_autocomplete(sender, **kwargs):
+    transaction.on_commit(lambda: invalidate_autocomplete('car_model'))
+
+
+@receiver(post_save, sender=Carpet)
+@receiver(post_delete, sender=Carpet)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+@receiver(post_save, sender=CarModel)
+@receiver(post_save, sender=CarMake)
+@receiver(post_save, sender=CarType)
+def invalidate_facets(sender, **kwargs):
+    transaction.on_commit(invalidate_carpet_facets)
+
+
+# Catalog receivers are connected after the effective price refresh above,
+# so category discount changes are already applied when rows are rebuilt.
+@receiver(post_save, sender=Carpet)
+def refresh_carpet_catalog(sender, instance, **kwargs):
+    refresh_catalog_entries(Carpet.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=CarModel)
+def refresh_car_model_catalog(sender, instance, created, **kwargs):
+    if not created:
+        refresh_catalog_entries(Carpet.objects.filter(car_model=instance))
+
+
+@receiver(post_save, sender=CarMake)
+def refresh_car_make_catalog(sender, instance, created, **kwargs):
+    if not created:
+        refresh_catalog_entries(
+            Carpet.objects.filter(car_model__make=instance))
+
+
+@receiver(post_save, sender=CarType)
+def refresh_car_type_catalog(sender, instance, created, **kwargs):
+    if not created:
+        refresh_catalog_entries(
+            Carpet.objects.filter(car_model__type=instance))
+
+
+@receiver(post_save, sender=ProductCategory)
+def refresh_category_catalog(sender, instance, created, **kwargs):
+    if not created:
+        refresh_catalog_entries(Carpet.objects.filter(category=instance))
+
+
+@receiver(post_save, sender=InventoryItem)
+def refresh_inventory_item_catalog(sender, instance, created, update_fields, **kwargs):
+    if created:
+        return
+    # Catalog rows copy the stock of their own item but only the name of
+    # their material, so material stock changes leave them alone.
+    carpets = Q(inventory_item=instance)
+    if instance.type == 'RAW' and instance.name_changed(update_fields):
+        carpets |= Q(material=instance)
+    refresh_catalog_entries(Carpet.objects.filter(carpets))
+
+
+@receiver(stock_changed, sender=InventoryItem)
+def refresh_stock_catalog(sender, item_ids, **kwargs):
+    refresh_catalog_entries(Carpet.objects.filter(inventory_item__in=item_ids))
+
+
+@receiver(m2m_changed, sender=Carpet.custom_options.through)
+def refresh_custom_options_catalog(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        refresh_catalog_entries(Carpet.objects.filter(pk=instance.pk))
+    elif pk_set:
+        refresh_catalog_entries(Carpet.objects.filter(pk__in=pk_set))
+    else:
+        refresh_custom_option_catalog(CustomOption, instance)
+
+
+@receiver(post_delete, sender=CustomOption)
+def refresh_custom_option_catalog(sender, instance, **kwargs):
+    carpet_ids = CatalogEntry.objects.filter(
+        custom_option_ids__contains=[instance.pk]).values('carpet_id')
+    refresh_catalog_entries(Carpet.objects.filter(pk__in=carpet_ids))
@@ -0,0 +1,23 @@
+from inventories.models import InventoryItem
+from .models import CarType, CarMake, CarModel, ProductCategory, Carpet
+
+
+# Shared test fixture: carpets go through save() so the search, catalog and
+# fitment signals run as they do in production.
+def create_carpet(name='Tapete', stock=5, price=1000, material=None,
+                  car_model=None, category=None):
+    if car_model is None:
+        car_model, _ = CarModel.objects.get_or_create(
+            name='Corolla', year=2018,
+            make=CarMake.objects.get_or_create(name='Toyota')[0],
+            type=CarType.objects.get_or_create(name='Sedan')[0])
+    if category is None:
+        category, _ = ProductCategory.objects.get_or_create(
+            name='Premium', defaults={'discount': 0})
+    if material is None:
+        material, _ = InventoryItem.objects.get_or_create(
+            name='Caucho', defaults={'stock': 50, 'type': 'RAW'})
+    return Carpet.objects.create(
+        image_link='https://example.com/carpet.png', price=price,
+        category=category, car_model=car_model, material=material,
+        inventory_item=InventoryItem.objects.create(name=name, stock=stock, type='MAT'))
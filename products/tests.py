@@ -1,3 +1,384 @@
-from django.test import TestCase
+from django.core.cache import cache
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from graphene.test import Client
+from core.cache import clear_local_versions, get_version
+from core.schema import schema
+from inventories.models import InventoryItem
+from inventories.signals import stock_changed
+from .bulk import bulk_create_carpets
+from .catalog import build_catalog_entry
+from .facets import parse_facet_rows
+from .fitment import FitmentIndex
+from .models import (
+    CarType,
+    CarMake,
+    CarModel,
+    ProductCategory,
+    CustomOption,
+    CustomOptionDetail,
+    Carpet,
+    CatalogEntry,
+)
+from .options import set_custom_options
+from .pricing import QUOTE_MAX_CONFIGURATIONS, quote_configurations
+from .search import build_search_document, build_raw_search_query
+from .testing import create_carpet
+from .utils import compute_effective_price
+from .validators import (
+    MATERIAL_NOT_FOUND,
+    MATERIAL_NOT_RAW,
+    get_material_errors,
+    validate_material_is_raw,
+)
 
-# Create your tests here.
+
+class CarpetSearchTests(SimpleTestCase):
+    def test_build_search_document_folds_accents(self):
+        document = build_search_document(
+            'Toyota', 'Corolla', 2018, 'Sedán', 'Premium', 'Caucho Térmico')
+        self.assertEqual(
+            document, 'toyota corolla 2018 sedan premium caucho termico')
+
+    def test_build_search_query_uses_prefix_terms(self):
+        raw_query = build_raw_search_query("Toyota  corolla 2018 rub'")
+        self.assertEqual(raw_query, 'toyota:* & corolla:* & 2018:* & rub:*')
+
+    def test_build_search_query_ignores_empty_text(self):
+        self.assertEqual(build_raw_search_query('  ¿? '), '')
+
+
+class CarpetSearchRefreshTests(TestCase):
+    def setUp(self):
+        self.carpet = create_carpet()
+
+    def test_material_renames_refresh_search_documents(self):
+        material = InventoryItem.objects.get(pk=self.carpet.material_id)
+        material.name = 'Vinilo'
+        material.save()
+
+        self.carpet.refresh_from_db()
+        self.assertIn('vinilo', self.carpet.search_document)
+
+    def test_material_stock_saves_skip_search_documents(self):
+        material = InventoryItem.objects.get(pk=self.carpet.material_id)
+        with mock.patch('products.signals.refresh_search_documents') as refresh:
+            material.stock = 3
+            material.save()
+            material.low_stock_threshold = 5
+            material.save(update_fields=['low_stock_threshold'])
+        refresh.assert_not_called()
+
+
+class EffectivePriceTests(SimpleTestCase):
+    def test_compute_effective_price_applies_discount(self):
+        self.assertEqual(compute_effective_price(150000, 15), 127500)
+
+    def test_compute_effective_price_truncates_like_sql(self):
+        self.assertEqual(compute_effective_price(999, 33), 669)
+        self.assertEqual(compute_effective_price(999, 0), 999)
+        self.assertEqual(compute_effective_price(999, 100), 0)
+
+
+class CatalogEntryTests(SimpleTestCase):
+    def test_build_catalog_entry_flattens_relations(self):
+        car_model = CarModel(pk=3, name='Corolla', year=2018,
+                             make=CarMake(pk=1, name='Toyota'),
+                             type=CarType(pk=2, name='Sedan'))
+        carpet = Carpet(
+            pk=7,
+            image_link='https://example.com/carpet.png',
+            price=200000,
+            effective_price=180000,
+            category=ProductCategory(pk=4, name='Premium', discount=10),
+            car_model=car_model,
+            inventory_item=InventoryItem(pk=5, name='Tapete Corolla',
+                                         stock=8, type='MAT', status='Low stock'),
+            material=InventoryItem(pk=6, name='Caucho', stock=100, type='RAW'),
+        )
+
+        entry = build_catalog_entry(carpet, [9, 2])
+
+        self.assertEqual(entry.carpet_id, 7)
+        self.assertEqual((entry.make_id, entry.make_name), (1, 'Toyota'))
+        self.assertEqual((entry.car_type_id, entry.car_type_name), (2, 'Sedan'))
+        self.assertEqual((entry.category_name, entry.discount), ('Premium', 10))
+        self.assertEqual(entry.material_name, 'Caucho')
+        self.assertEqual(entry.stock_status, 'Low stock')
+        self.assertEqual(entry.custom_option_ids, [2, 9])
+
+
+class CatalogRefreshTests(TestCase):
+    def setUp(self):
+        self.carpet = create_carpet()
+        self.material = InventoryItem.objects.get(pk=self.carpet.material_id)
+
+    def assertCatalogUntouched(self, queries):
+        self.assertFalse(any(CatalogEntry._meta.db_table in query['sql']
+                             for query in queries.captured_queries))
+
+    def test_carpet_stock_changes_refresh_its_row(self):
+        InventoryItem.objects.filter(pk=self.carpet.inventory_item_id).update(stock=0)
+        stock_changed.send(sender=InventoryItem, item_ids=[self.carpet.inventory_item_id])
+
+        self.assertEqual(CatalogEntry.objects.get(carpet=self.carpet).stock, 0)
+
+    def test_material_stock_changes_leave_catalog_rows_alone(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.material.stock = 3
+            self.material.save()
+            stock_changed.send(sender=InventoryItem, item_ids=[self.material.pk])
+        self.assertCatalogUntouched(queries)
+
+    def test_material_renames_refresh_catalog_rows(self):
+        self.material.name = 'Vinilo'
+        self.material.save(update_fields=['name'])
+
+        self.assertEqual(CatalogEntry.objects.get(carpet=self.carpet).material_name, 'Vinilo')
+
+
+class FacetRowParsingTests(SimpleTestCase):
+    def test_each_grouping_set_fills_one_facet(self):
+        # GROUPING flags for makes, car_types, categories, materials and the
+        # price bucket, then the (id, name) pairs, the bucket start and the count.
+        rows = [
+            (0, 1, 1, 1, 1, 1, 'Toyota', None, None, None, None, None, None, None, 3),
+            (0, 1, 1, 1, 1, 2, 'Mazda', None, None, None, None, None, None, None, 3),
+            (1, 0, 1, 1, 1, None, None, 4, 'Sedan', None, None, None, None, None, 6),
+            (1, 1, 0, 1, 1, None, None, None, None, 5, 'Premium', None, None, None, 6),
+            (1, 1, 1, 0, 1, None, None, None, None, None, None, 6, 'Caucho', None, 6),
+            (1, 1, 1, 1, 0, None, None, None, None, None, None, None, None, 100, 2),
+            (1, 1, 1, 1, 0, None, None, None, None, None, None, None, None, 0, 4),
+            (1, 1, 1, 1, 1, None, None, None, None, None, None, None, None, None, 6),
+        ]
+
+        facets = parse_facet_rows(rows, 100)
+
+        self.assertEqual(facets['total_count'], 6)
+        self.assertEqual([make['name'] for make in facets['makes']],
+                         ['Mazda', 'Toyota'])
+        self.assertEqual(facets['car_types'][0]['count'], 6)
+        self.assertEqual(facets['categories'][0]['name'], 'Premium')
+        self.assertEqual(facets['materials'][0]['name'], 'Caucho')
+        self.assertEqual(facets['price_buckets'], [
+            {'min_price': 0, 'max_price': 99, 'count': 4},
+            {'min_price': 100, 'max_price': 199, 'count': 2},
+        ])
+
+
+class BulkCreateCarpetsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_versions()
+        self.row = {
+            "image_link": "https://example.com/carpet.png",
+            "price": 120000,
+            "category_id": 999,
+            "car_model_id": 999,
+            "material_id": 999,
+            "item_name": "Tapete Corolla",
+            "item_stock": 5,
+        }
+
+    def test_rows_are_validated_before_writing(self):
+        rows = [self.row, {**self.row, "price": "abc"}, {"image_link": "x"}]
+        carpets, errors = bulk_create_carpets(rows)
+
+        self.assertEqual(carpets, [])
+        self.assertEqual([error["index"] for error in errors], [0, 1, 2])
+        self.assertEqual(errors[0]["message"], "Product category not found")
+        self.assertEqual(errors[1]["message"], "price must be an integer")
+        self.assertTrue(errors[2]["message"].startswith("Missing fields"))
+        self.assertFalse(Carpet.objects.exists())
+
+
+class SetCustomOptionsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_versions()
+
+    def test_unknown_option_is_rejected_before_writing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            option = CustomOption.objects.create(name='Logo')
+        with self.assertRaises(CustomOption.DoesNotExist):
+            set_custom_options([1], add_ids=[option.pk, option.pk + 1])
+
+    def test_unknown_carpet_is_rejected(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            option = CustomOption.objects.create(name='Logo')
+        with self.assertRaises(Carpet.DoesNotExist):
+            set_custom_options([1, 2], custom_option_ids=[option.pk])
+
+
+class MaterialValidationTests(TestCase):
+    def test_material_errors_are_checked_in_one_query(self):
+        raw = InventoryItem.objects.create(name='Caucho', stock=50, type='RAW')
+        mat = InventoryItem.objects.create(name='Tapete', stock=5, type='MAT')
+
+        with self.assertNumQueries(1):
+            errors = get_material_errors([raw.pk, mat.pk, mat.pk + 1])
+
+        self.assertEqual(errors, {
+            mat.pk: MATERIAL_NOT_RAW,
+            mat.pk + 1: MATERIAL_NOT_FOUND,
+        })
+
+    def test_validate_material_is_raw_accepts_id_or_instance(self):
+        raw = InventoryItem.objects.create(name='Caucho', stock=50, type='RAW')
+        validate_material_is_raw(raw.pk)
+        with self.assertNumQueries(0):
+            validate_material_is_raw(raw)
+        with self.assertRaises(ValidationError):
+            validate_material_is_raw(InventoryItem(type='MAT'))
+
+    def test_materials_in_use_keep_their_type(self):
+        carpet = create_carpet()
+        user = get_user_model().objects.create_user(
+            'admin@example.com', 'Ana', 'Rojas', '3001112233', 'secret')
+        user.user_permissions.add(Permission.objects.get(codename='change_inventoryitem'))
+        request = RequestFactory().get('/')
+        request.user = get_user_model().objects.get(pk=user.pk)
+
+        response = Client(schema).execute(
+            'mutation Update($id: ID!) { updateInventoryItem(id: $id, type: "MAT") '
+            '{ inventoryItem { id } } }',
+            variables={'id': str(carpet.material_id)}, context_value=request)
+
+        self.assertEqual(response['errors'][0]['message'],
+                         'Item is used as material by carpets, so its type must stay RAW')
+        self.assertEqual(InventoryItem.objects.get(pk=carpet.material_id).type, 'RAW')
+
+
+class FitmentIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_versions()
+        self.make = CarMake.objects.create(name='Toyota')
+        car_type = CarType.objects.create(name='Sedan')
+        self.corolla = CarModel.objects.create(
+            name='Corolla', year=2018, make=self.make, type=car_type)
+        self.yaris = CarModel.objects.create(
+            name='Yaris', year=2018, make=self.make, type=car_type)
+        self.carpet = create_carpet(car_model=self.corolla)
+        self.item = self.carpet.inventory_item
+        self.index = FitmentIndex()
+
+    def test_lookup_groups_carpets_by_car_model(self):
+        fitment = self.index.lookup(self.make.pk, 2018)
+
+        self.assertEqual([entry['car_model'] for entry in fitment],
+                         [self.corolla, self.yaris])
+        self.assertEqual([line['carpet'] for line in fitment[0]['carpets']],
+                         [self.carpet])
+        self.assertEqual(fitment[1]['carpets'], [])
+        self.assertEqual(self.index.lookup(self.make.pk, 2019), [])
+
+    def test_lookup_reads_current_rows(self):
+        self.index.lookup(self.make.pk, 2018)
+        Carpet.objects.filter(pk=self.carpet.pk).update(effective_price=800)
+        InventoryItem.objects.filter(pk=self.item.pk).update(stock=0)
+
+        line = self.index.lookup(self.make.pk, 2018)[0]['carpets'][0]
+
+        self.assertEqual(line['effective_price'], 800)
+        self.assertEqual(line['carpet'].inventory_item.stock, 0)
+
+    def test_local_changes_are_applied_incrementally(self):
+        self.index.lookup(self.make.pk, 2018)
+        self.carpet.car_model = self.yaris
+        self.index.carpet_saved(self.carpet)
+
+        # The patched index stays current, so the lookup does not rebuild it.
+        self.assertEqual(self.index._version, get_version(FitmentIndex.version_key))
+        fitment = self.index.lookup(self.make.pk, 2018)
+        self.assertEqual(fitment[0]['carpets'], [])
+        self.assertEqual(len(fitment[1]['carpets']), 1)
+
+        self.index.car_model_deleted(self.yaris)
+        self.assertEqual([entry['car_model'] for entry in self.index.lookup(self.make.pk, 2018)],
+                         [self.corolla])
+
+    def test_concurrent_patches_force_a_rebuild(self):
+        other = FitmentIndex()
+        self.index.lookup(self.make.pk, 2018)
+        other.lookup(self.make.pk, 2018)
+
+        # Each index applies its own change from the same starting version.
+        # The second one cannot prove it saw the first change, so it drops
+        # its copy, and the first one sees the newer version on its next
+        # lookup; both end up rebuilt from the database.
+        self.carpet.car_model = self.yaris
+        self.index.carpet_saved(self.carpet)
+        Carpet.objects.filter(pk=self.carpet.pk).update(car_model=self.yaris)
+        CarModel.objects.filter(pk=self.corolla.pk).update(year=2017)
+        other.car_model_saved(CarModel.objects.get(pk=self.corolla.pk))
+
+        self.assertIsNone(other._version)
+        for index in (self.index, other):
+            self.assertEqual([entry['car_model'] for entry in index.lookup(self.make.pk, 2018)],
+                             [self.yaris])
+
+    def test_other_workers_force_a_rebuild(self):
+        self.index.lookup(self.make.pk, 2018)
+        FitmentIndex().invalidate()
+        CarModel.objects.filter(pk=self.yaris.pk).update(year=2017)
+
+        self.assertEqual([entry['car_model'] for entry in self.index.lookup(self.make.pk, 2018)],
+                         [self.corolla])
+
+
+class QuoteConfigurationsTests(TestCase):
+    def setUp(self):
+        self.carpet = create_carpet(
+            price=1250, category=ProductCategory.objects.create(name='Oferta', discount=20))
+
+        color = CustomOption.objects.create(name='Color', required=True)
+        logo = CustomOption.objects.create(name='Logo')
+        trim = CustomOption.objects.create(name='Borde')
+        self.carpet.custom_options.add(color, logo)
+        self.red, self.logo, self.trim = [
+            CustomOptionDetail.objects.create(
+                custom_option=option, name=name,
+                image_url='https://example.com/option.png', price=price)
+            for option, name, price in ((color, 'Rojo', 10), (logo, 'Logo A', 50), (trim, 'Borde A', 5))
+        ]
+
+    def configuration(self, detail_ids, carpet_id=None, quantity=1):
+        return {'carpet_id': str(carpet_id or self.carpet.pk), 'quantity': quantity,
+                'option_detail_ids': [str(detail_id) for detail_id in detail_ids]}
+
+    def test_each_line_is_priced_or_rejected(self):
+        quote = quote_configurations([
+            self.configuration([self.red.pk, self.logo.pk], quantity=2),
+            self.configuration([self.logo.pk]),
+            self.configuration([self.red.pk, self.trim.pk]),
+            self.configuration([self.red.pk], carpet_id=self.carpet.pk + 1),
+            self.configuration([self.red.pk], quantity=0),
+            self.configuration([self.red.pk, self.trim.pk + 1]),
+            self.configuration([self.red.pk, self.red.pk, self.logo.pk], quantity=None),
+        ])
+
+        self.assertEqual((quote['lines'][0]['unit_price'], quote['lines'][0]['options_price'],
+                          quote['lines'][0]['total_price']), (1000, 60, 2060))
+        self.assertEqual([line['error'] for line in quote['lines']], [
+            None,
+            'Required custom options are missing',
+            'Custom option not available for this carpet',
+            'Carpet not found',
+            'Quantity must be at least 1',
+            'Custom option detail not found',
+            None,
+        ])
+        self.assertEqual((quote['lines'][-1]['quantity'], quote['lines'][-1]['total_price']),
+                         (1, 1060))
+        self.assertEqual(quote['total_price'], 2060 + 1060)
+
+    def test_quote_size_is_limited(self):
+        with self.assertRaises(ValueError):
+            quote_configurations(
+                [self.configuration([])] * (QUOTE_MAX_CONFIGURATIONS + 1))
@@ -0,0 +1,62 @@
+from django.db import connections
+from inventories.models import InventoryItem
+from .models import Carpet
+
+# Carpet writes are checked by statement-level triggers against their
+# transition table, so bulk writes stay set-based. Inventory items are checked
+# per row and only when their type actually changes, so stock updates never
+# reach the trigger. Violations raise SQLSTATE 23514 (check_violation),
+# surfaced by Django as IntegrityError.
+MATERIAL_TRIGGERS_SQL = '''
+CREATE OR REPLACE FUNCTION products_carpet_material_is_raw() RETURNS trigger AS $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM new_rows carpet
+        JOIN {item_table} material ON material.id = carpet.material_id
+        WHERE material.type <> 'RAW'
+    ) THEN
+        RAISE EXCEPTION 'El material asociado debe tener el tipo RAW.'
+            USING ERRCODE = 'check_violation';
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS carpet_material_is_raw_insert ON {carpet_table};
+CREATE TRIGGER carpet_material_is_raw_insert
+    AFTER INSERT ON {carpet_table}
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION products_carpet_material_is_raw();
+
+DROP TRIGGER IF EXISTS carpet_material_is_raw_update ON {carpet_table};
+CREATE TRIGGER carpet_material_is_raw_update
+    AFTER UPDATE ON {carpet_table}
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION products_carpet_material_is_raw();
+
+CREATE OR REPLACE FUNCTION products_material_type_in_use() RETURNS trigger AS $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM {carpet_table} WHERE material_id = NEW.id) THEN
+        RAISE EXCEPTION 'El material está en uso por tapetes y debe tener el tipo RAW.'
+            USING ERRCODE = 'check_violation';
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS inventoryitem_material_type ON {item_table};
+CREATE TRIGGER inventoryitem_material_type
+    AFTER UPDATE OF type ON {item_table}
+    FOR EACH ROW
+    WHEN (OLD.type IS DISTINCT FROM NEW.type AND NEW.type <> 'RAW')
+    EXECUTE FUNCTION products_material_type_in_use();
+'''
+
+
+def install_material_triggers(using='default', **kwargs):
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute(MATERIAL_TRIGGERS_SQL.format(
+            carpet_table=Carpet._meta.db_table,
+            item_table=InventoryItem._meta.db_table,
+        ))
@@ -1,6 +1,8 @@
+import graphene
 from graphene import relay
-from django_filters import FilterSet
+from django_filters import FilterSet, OrderingFilter
 from graphene_django import DjangoObjectType
+from graphene_django.filter import GlobalIDFilter
 from .models import (
     CarType,
     CarMake,
@@ -9,6 +11,7 @@ from .models import (
     CustomOption,
     CustomOptionDetail,
     Carpet,
+    CatalogEntry,
 )
 
 
@@ -68,17 +71,40 @@ class CustomOptionDetailFilter(FilterSet):
 
 
 class CarpetFilter(FilterSet):
+    order_by = OrderingFilter(fields=("price", "effective_price"))
+
     class Meta:
         model = Carpet
         fields = {
             "image_link": ("exact", "icontains"),
             "price": ("exact", "icontains"),
+            "effective_price": ("exact", "gte", "lte"),
             "category": ("exact",),
             "car_model": ("exact",),
             "material": ("exact",),
         }
 
 
+class CatalogEntryFilter(FilterSet):
+    make = GlobalIDFilter(field_name="make_id")
+    car_model = GlobalIDFilter(field_name="car_model_id")
+    car_type = GlobalIDFilter(field_name="car_type_id")
+    category = GlobalIDFilter(field_name="category_id")
+    material = GlobalIDFilter(field_name="material_id")
+    order_by = OrderingFilter(
+        fields=("effective_price", "price", "year", "updated_at"))
+
+    class Meta:
+        model = CatalogEntry
+        fields = {
+            "year": ("exact", "gte", "lte"),
+            "effective_price": ("exact", "gte", "lte"),
+            "stock_status": ("exact",),
+            "make_name": ("icontains",),
+            "car_model_name": ("icontains",),
+        }
+
+
 class CarTypeType(DjangoObjectType):
     class Meta:
         model = CarType
@@ -131,6 +157,94 @@ class CarpetType(DjangoObjectType):
     class Meta:
         model = Carpet
         interfaces = (relay.Node,)
-        fields = ("id", "image_link", "price", "category", "car_model",
-                  "inventory_item", "material", "custom_options")
+        fields = ("id", "image_link", "price", "effective_price", "category",
+                  "car_model", "inventory_item", "material", "custom_options")
         filterset_class = CarpetFilter
+
+
+class CatalogEntryType(DjangoObjectType):
+    class Meta:
+        model = CatalogEntry
+        interfaces = (relay.Node,)
+        fields = ("carpet", "image_link", "price", "effective_price",
+                  "category_id", "category_name", "discount", "car_model_id",
+                  "car_model_name", "year", "make_id", "make_name",
+                  "car_type_id", "car_type_name", "material_id",
+                  "material_name", "stock", "stock_status",
+                  "custom_option_ids", "updated_at")
+        filterset_class = CatalogEntryFilter
+
+
+class FitmentCarpetType(graphene.ObjectType):
+    carpet = graphene.Field(CarpetType)
+    effective_price = graphene.Int(
+        description='Carpet price with the category discount applied')
+
+
+class FitmentModelType(graphene.ObjectType):
+    car_model = graphene.Field(CarModelType)
+    carpets = graphene.List(FitmentCarpetType)
+
+
+class QuoteConfigurationInput(graphene.InputObjectType):
+    carpet_id = graphene.ID(required=True)
+    quantity = graphene.Int(default_value=1)
+    option_detail_ids = graphene.List(graphene.NonNull(graphene.ID))
+
+
+class QuoteLineType(graphene.ObjectType):
+    carpet_id = graphene.ID()
+    quantity = graphene.Int()
+    unit_price = graphene.Int(
+        description='Carpet price with the category discount applied')
+    options_price = graphene.Int(
+        description='Price of the selected option details, charged once per line')
+    total_price = graphene.Int()
+    error = graphene.String()
+
+
+class QuoteType(graphene.ObjectType):
+    lines = graphene.List(QuoteLineType)
+    total_price = graphene.Int(
+        description='Sum of the lines that could be priced')
+
+
+class CarpetInput(graphene.InputObjectType):
+    image_link = graphene.String(required=True)
+    price = graphene.Int(required=True)
+    category_id = graphene.ID(required=True)
+    car_model_id = graphene.ID(required=True)
+    material_id = graphene.ID(required=True)
+    custom_options_ids = graphene.List(graphene.ID)
+    # InventoryItem arguments
+    item_name = graphene.String(required=True)
+    item_description = graphene.String()
+    item_stock = graphene.Int(required=True)
+    item_type = graphene.String(default_value='MAT')
+
+
+class BulkRowErrorType(graphene.ObjectType):
+    index = graphene.Int(description='Position of the row in the input list')
+    message = graphene.String()
+
+
+class FacetValueType(graphene.ObjectType):
+    id = graphene.ID(description='Global ID usable as a carpets filter value')
+    name = graphene.String()
+    count = graphene.Int()
+
+
+class PriceBucketType(graphene.ObjectType):
+    min_price = graphene.Int()
+    max_price = graphene.Int()
+    count = graphene.Int()
+
+
+class CarpetFacetsType(graphene.ObjectType):
+    total_count = graphene.Int()
+    makes = graphene.List(FacetValueType)
+    car_types = graphene.List(FacetValueType)
+    categories = graphene.List(FacetValueType)
+    materials = graphene.List(FacetValueType)
+    price_buckets = graphene.List(
+        PriceBucketType, description='Counts by effective price range')
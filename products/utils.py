@@ -0,0 +1,2 @@
+def compute_effective_price(price, discount):
+    return price * (100 - discount) // 100
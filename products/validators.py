@@ -1,12 +1,35 @@
 from django.core.exceptions import ValidationError
 from inventories.models import InventoryItem
 
+MATERIAL_NOT_FOUND = 'El material asociado no existe.'
+MATERIAL_NOT_RAW = 'El material asociado debe tener el tipo RAW.'
+
+
+def get_material_errors(material_ids):
+    material_ids = set(material_ids)
+    material_types = dict(InventoryItem.objects.filter(
+        pk__in=material_ids).values_list('id', 'type'))
+
+    errors = {}
+    for material_id in material_ids:
+        if material_id not in material_types:
+            errors[material_id] = MATERIAL_NOT_FOUND
+        elif material_types[material_id] != 'RAW':
+            errors[material_id] = MATERIAL_NOT_RAW
+    return errors
+
+
+def validate_materials_are_raw(material_ids):
+    errors = get_material_errors(material_ids)
+    if errors:
+        raise ValidationError(sorted(set(errors.values())))
+
 
 def validate_material_is_raw(value):
-    try:
-        inventory_item = InventoryItem.objects.get(id=value.id)
-        if inventory_item.type != 'RAW':
-            raise ValidationError(
-                'El material asociado debe tener el tipo RAW.')
-    except InventoryItem.DoesNotExist:
-        raise ValidationError('El material asociado no existe.')
+    # Field validation passes the material id; callers holding the loaded
+    # instance skip the query.
+    if isinstance(value, InventoryItem):
+        if value.type != 'RAW':
+            raise ValidationError(MATERIAL_NOT_RAW)
+        return
+    validate_materials_are_raw([value])
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class SalesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sales'
+
+    def ready(self):
+        from core.cache import reference_cache
+
+        for model_name in ('PayMethod', 'DeliveryMethod'):
+            reference_cache.register(self.get_model(model_name))
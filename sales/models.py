@@ -1,5 +1,7 @@
 from django.db import models
+from django.db.models import F, OuterRef
 from django.contrib.auth import get_user_model
+from core.utils import sum_subquery
 from products.models import (
     Carpet,
     CustomOptionDetail,
@@ -23,6 +25,29 @@ class DeliveryMethod(models.Model):
         return self.name
 
 
+class SaleQuerySet(models.QuerySet):
+    def with_total_price(self):
+        OptionDetail = SaleDetailOption.custom_option_detail.through
+        carpets_price = sum_subquery(
+            SaleDetail.objects.filter(sale=OuterRef('pk')),
+            'sale', F('quantity') * F('carpet__price'))
+        options_price = sum_subquery(
+            OptionDetail.objects.filter(
+                saledetailoption__sale_detail__sale=OuterRef('pk')),
+            'saledetailoption__sale_detail__sale', 'customoptiondetail__price')
+        return self.annotate(computed_total_price=carpets_price + options_price + F('delivery_method__price'))
+
+
+class SaleDetailQuerySet(models.QuerySet):
+    def with_partial_price(self):
+        OptionDetail = SaleDetailOption.custom_option_detail.through
+        options_price = sum_subquery(
+            OptionDetail.objects.filter(
+                saledetailoption__sale_detail=OuterRef('pk')),
+            'saledetailoption__sale_detail', 'customoptiondetail__price')
+        return self.annotate(computed_partial_price=F('quantity') * F('carpet__price') + options_price)
+
+
 class Sale(models.Model):
     user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
     pay_method = models.ForeignKey(PayMethod, on_delete=models.PROTECT)
@@ -30,13 +55,18 @@ class Sale(models.Model):
         DeliveryMethod, on_delete=models.PROTECT)
     date = models.DateTimeField(auto_now_add=True)
 
+    objects = SaleQuerySet.as_manager()
+
     def __str__(self):
         return f'{self.user} - {self.date}'
 
     @ property
     def total_price(self):
+        computed = getattr(self, 'computed_total_price', None)
+        if computed is not None:
+            return computed
         carpet_price = sum(
-            detail.partial_price for detail in self.saledetail_set.all())
+            detail.partial_price for detail in self.items.all())
         delivery_price = self.delivery_method.price
         return carpet_price + delivery_price
 
@@ -46,12 +76,20 @@ class SaleDetail(models.Model):
         Sale, on_delete=models.CASCADE, related_name='items')
     carpet = models.ForeignKey(Carpet, on_delete=models.PROTECT)
     quantity = models.PositiveIntegerField()
+    # Set on lines whose quantity was reserved from stock. Lines written
+    # before reservations existed never took stock, so they never give it back.
+    stock_reserved = models.BooleanField(default=False, editable=False)
+
+    objects = SaleDetailQuerySet.as_manager()
 
     @ property
     def partial_price(self):
+        computed = getattr(self, 'computed_partial_price', None)
+        if computed is not None:
+            return computed
         carpet_price = self.quantity * self.carpet.price
         option_price = sum(
-            option.total_price for option in self.saledetailoption_set.all())
+            option.total_price for option in self.options.all())
         return carpet_price + option_price
 
 
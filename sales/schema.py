@@ -1,9 +1,13 @@
 import graphene
 from graphql import GraphQLError
 from graphene_django.filter import DjangoFilterConnectionField
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
 from django.core.exceptions import ValidationError
 from graphql_jwt.decorators import login_required, permission_required
+from core.cache import get_reference
+from core.utils import is_field_selected, needs_computed_field
+from inventories.utils import InsufficientStockError, reserve_stock, release_stock
 from products.models import Carpet, CustomOptionDetail
 from .models import (
     PayMethod,
@@ -18,9 +22,21 @@ from .types import (
     SaleType,
     SaleDetailType,
     SaleDetailOptionType,
+    SaleItemInput,
 )
 
 
+def _reserve_or_raise(items):
+    failed_items = reserve_stock(items)
+    if failed_items:
+        raise InsufficientStockError(failed_items)
+
+
+def _stock_error(error):
+    item_ids = ", ".join(str(item['item_id']) for item in error.failed_items)
+    return GraphQLError(f"Not enough stock for inventory items: {item_ids}.")
+
+
 class CreatePayMethodMutation(graphene.Mutation):
     class Arguments:
         name = graphene.String(required=True)
@@ -164,19 +180,46 @@ class CreateSaleMutation(graphene.Mutation):
         user_id = graphene.ID(required=True)
         pay_method_id = graphene.ID(required=True)
         delivery_method_id = graphene.ID(required=True)
+        items = graphene.List(graphene.NonNull(SaleItemInput))
 
     sale = graphene.Field(SaleType)
 
     @login_required
     @permission_required("sales.add_sale")
-    def mutate(self, info, user_id, pay_method_id, delivery_method_id):
+    def mutate(self, info, user_id, pay_method_id, delivery_method_id, items=None):
         try:
-            sale = Sale.objects.create(
-                user_id=user_id,
-                pay_method_id=pay_method_id,
-                delivery_method_id=delivery_method_id,
-            )
+            with transaction.atomic():
+                sale = Sale.objects.create(
+                    user_id=user_id,
+                    pay_method=get_reference(PayMethod, pay_method_id),
+                    delivery_method=get_reference(
+                        DeliveryMethod, delivery_method_id),
+                )
+                if items:
+                    carpets = Carpet.objects.only('id', 'inventory_item_id').in_bulk(
+                        {item.carpet_id for item in items})
+                    carpets = {str(pk): carpet for pk, carpet in carpets.items()}
+                    if any(str(item.carpet_id) not in carpets for item in items):
+                        raise Carpet.DoesNotExist
+                    # The whole sale is reserved in one call: every item or none.
+                    _reserve_or_raise(
+                        (carpets[str(item.carpet_id)].inventory_item_id, item.quantity) for item in items)
+                    SaleDetail.objects.bulk_create([
+                        SaleDetail(sale=sale, carpet=carpets[str(item.carpet_id)],
+                                   quantity=item.quantity, stock_reserved=True)
+                        for item in items
+                    ])
             return CreateSaleMutation(sale=sale)
+        except PayMethod.DoesNotExist:
+            raise GraphQLError("PayMethod not found.")
+        except DeliveryMethod.DoesNotExist:
+            raise GraphQLError("DeliveryMethod not found.")
+        except Carpet.DoesNotExist:
+            raise GraphQLError("Carpet not found.")
+        except InsufficientStockError as e:
+            raise _stock_error(e)
+        except ValueError as e:
+            raise GraphQLError(str(e))
         except ValidationError as e:
             raise GraphQLError(e)
         except Exception as e:
@@ -193,8 +236,13 @@ class DeleteSaleMutation(graphene.Mutation):
     @permission_required("sales.delete_sale")
     def mutate(self, info, id):
         try:
-            sale = Sale.objects.get(id=id)
-            sale.delete()
+            with transaction.atomic():
+                sale = Sale.objects.get(id=id)
+                reserved = sale.items.filter(stock_reserved=True).values(
+                    'carpet__inventory_item_id').annotate(quantity=Sum('quantity'))
+                release_stock((row['carpet__inventory_item_id'], row['quantity'])
+                              for row in reserved)
+                sale.delete()
             return DeleteSaleMutation(sale=sale)
         except Sale.DoesNotExist:
             raise GraphQLError("Sale not found.")
@@ -224,13 +272,18 @@ class UpdateSaleMutation(graphene.Mutation):
             if user_id:
                 sale.user_id = user_id
             if pay_method_id:
-                sale.pay_method_id = pay_method_id
+                sale.pay_method = get_reference(PayMethod, pay_method_id)
             if delivery_method_id:
-                sale.delivery_method_id = delivery_method_id
+                sale.delivery_method = get_reference(
+                    DeliveryMethod, delivery_method_id)
             sale.save()
             return UpdateSaleMutation(sale=sale)
         except Sale.DoesNotExist:
             raise GraphQLError("Sale not found.")
+        except PayMethod.DoesNotExist:
+            raise GraphQLError("PayMethod not found.")
+        except DeliveryMethod.DoesNotExist:
+            raise GraphQLError("DeliveryMethod not found.")
         except ValidationError as e:
             raise GraphQLError(e)
         except Exception as e:
@@ -249,15 +302,21 @@ class CreateSaleDetailMutation(graphene.Mutation):
     @permission_required("sales.add_saledetail")
     def mutate(self, info, sale_id, carpet_id, quantity):
         try:
-            sale = Sale.objects.get(id=sale_id)
-            carpet = Carpet.objects.get(id=carpet_id)
-            sale_detail = SaleDetail.objects.create(
-                sale=sale, carpet=carpet, quantity=quantity)
+            with transaction.atomic():
+                sale = Sale.objects.get(id=sale_id)
+                carpet = Carpet.objects.get(id=carpet_id)
+                _reserve_or_raise([(carpet.inventory_item_id, quantity)])
+                sale_detail = SaleDetail.objects.create(
+                    sale=sale, carpet=carpet, quantity=quantity, stock_reserved=True)
             return CreateSaleDetailMutation(sale_detail=sale_detail)
         except Sale.DoesNotExist:
             raise GraphQLError("Sale not found.")
         except Carpet.DoesNotExist:
             raise GraphQLError("Carpet not found.")
+        except InsufficientStockError as e:
+            raise _stock_error(e)
+        except ValueError as e:
+            raise GraphQLError(str(e))
         except ValidationError as e:
             raise GraphQLError(e)
         except Exception as e:
@@ -274,8 +333,13 @@ class DeleteSaleDetailMutation(graphene.Mutation):
     @permission_required("sales.delete_saledetail")
     def mutate(self, info, id):
         try:
-            sale_detail = SaleDetail.objects.get(id=id)
-            sale_detail.delete()
+            with transaction.atomic():
+                sale_detail = SaleDetail.objects.select_for_update(of=('self',)).select_related(
+                    'carpet').get(id=id)
+                if sale_detail.stock_reserved:
+                    release_stock(
+                        [(sale_detail.carpet.inventory_item_id, sale_detail.quantity)])
+                sale_detail.delete()
             return DeleteSaleDetailMutation(sale_detail=sale_detail)
         except SaleDetail.DoesNotExist:
             raise GraphQLError("SaleDetail not found.")
@@ -298,12 +362,27 @@ class UpdateSaleDetailMutation(graphene.Mutation):
             raise GraphQLError("You must provide a quantity to update.")
 
         try:
-            sale_detail = SaleDetail.objects.get(id=id)
-            sale_detail.quantity = quantity
-            sale_detail.save()
+            with transaction.atomic():
+                sale_detail = SaleDetail.objects.select_for_update(of=('self',)).select_related(
+                    'carpet').get(id=id)
+                # Only the difference is reserved or released, and only on
+                # lines that took their quantity from stock.
+                difference = quantity - sale_detail.quantity if sale_detail.stock_reserved else 0
+                if difference > 0:
+                    _reserve_or_raise(
+                        [(sale_detail.carpet.inventory_item_id, difference)])
+                elif difference < 0:
+                    release_stock(
+                        [(sale_detail.carpet.inventory_item_id, -difference)])
+                sale_detail.quantity = quantity
+                sale_detail.save()
             return UpdateSaleDetailMutation(sale_detail=sale_detail)
         except SaleDetail.DoesNotExist:
             raise GraphQLError("SaleDetail not found.")
+        except InsufficientStockError as e:
+            raise _stock_error(e)
+        except ValueError as e:
+            raise GraphQLError(str(e))
         except ValidationError as e:
             raise GraphQLError(e)
         except Exception as e:
@@ -413,7 +492,7 @@ class Query(graphene.ObjectType):
     @login_required
     @permission_required("sales.view_paymethod")
     def resolve_pay_method(self, info, id):
-        return PayMethod.objects.get(id=id)
+        return get_reference(PayMethod, id)
 
     @login_required
     @permission_required("sales.view_deliverymethod")
@@ -423,27 +502,39 @@ class Query(graphene.ObjectType):
     @login_required
     @permission_required("sales.view_deliverymethod")
     def resolve_delivery_method(self, info, id):
-        return DeliveryMethod.objects.get(id=id)
+        return get_reference(DeliveryMethod, id)
 
     @login_required
     @permission_required("sales.view_sale")
     def resolve_sales(self, info, **kwargs):
-        return Sale.objects.all()
+        queryset = Sale.objects.all()
+        if needs_computed_field(info, kwargs, 'totalPrice', 'total_price'):
+            queryset = queryset.with_total_price()
+        return queryset
 
     @login_required
     @permission_required("sales.view_sale")
     def resolve_sale(self, info, id):
-        return Sale.objects.get(id=id)
+        queryset = Sale.objects.all()
+        if is_field_selected(info, 'totalPrice'):
+            queryset = queryset.with_total_price()
+        return queryset.get(id=id)
 
     @login_required
     @permission_required("sales.view_saledetail")
     def resolve_sale_details(self, info, **kwargs):
-        return SaleDetail.objects.all()
+        queryset = SaleDetail.objects.all()
+        if needs_computed_field(info, kwargs, 'partialPrice', 'partial_price'):
+            queryset = queryset.with_partial_price()
+        return queryset
 
     @login_required
     @permission_required("sales.view_saledetail")
     def resolve_sale_detail(self, info, id):
-        return SaleDetail.objects.get(id=id)
+        queryset = SaleDetail.objects.all()
+        if is_field_selected(info, 'partialPrice'):
+            queryset = queryset.with_partial_price()
+        return queryset.get(id=id)
 
     @login_required
     @permission_required("sales.view_saledetailoption")
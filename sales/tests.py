@@ -1,3 +1,124 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+from graphene.test import Client
+from core.schema import schema
+from core.utils import decode_relay_id
+from products.models import CustomOption, CustomOptionDetail
+from products.testing import create_carpet
+from .models import (
+    PayMethod,
+    DeliveryMethod,
+    Sale,
+    SaleDetail,
+    SaleDetailOption,
+)
+from .types import SaleFilter, SaleDetailFilter
 
-# Create your tests here.
+
+class SaleTotalPriceTests(TestCase):
+    def setUp(self):
+        self.first = create_carpet('Tapete A', price=1000)
+        self.second = create_carpet('Tapete B', price=400)
+        option = CustomOption.objects.create(name='Logo')
+        details = [
+            CustomOptionDetail.objects.create(
+                custom_option=option, name=name,
+                image_url='https://example.com/option.png', price=price)
+            for name, price in (('Logo A', 50), ('Logo B', 10))
+        ]
+
+        user = self.user = get_user_model().objects.create_user(
+            'cliente@example.com', 'Ana', 'Rojas', '3001112233', 'secret')
+        pay_method = PayMethod.objects.create(name='Efectivo')
+        delivery_method = DeliveryMethod.objects.create(name='Domicilio', price=300)
+        self.sale = Sale.objects.create(
+            user=user, pay_method=pay_method, delivery_method=delivery_method)
+        detail = SaleDetail.objects.create(sale=self.sale, carpet=self.first, quantity=2)
+        SaleDetailOption.objects.create(sale_detail=detail).custom_option_detail.add(*details)
+        SaleDetail.objects.create(sale=self.sale, carpet=self.second, quantity=1)
+        self.empty_sale = Sale.objects.create(
+            user=user, pay_method=pay_method, delivery_method=delivery_method)
+
+    def test_sql_totals_match_the_python_properties(self):
+        annotated = Sale.objects.with_total_price().in_bulk()
+
+        # 2 x 1000 + 50 + 10 in options + 1 x 400 + 300 delivery.
+        self.assertEqual(annotated[self.sale.pk].computed_total_price, 2760)
+        self.assertEqual(Sale.objects.get(pk=self.sale.pk).total_price, 2760)
+        self.assertEqual(annotated[self.empty_sale.pk].total_price, 300)
+        self.assertEqual(Sale.objects.get(pk=self.empty_sale.pk).total_price, 300)
+
+        for detail in SaleDetail.objects.with_partial_price():
+            self.assertEqual(detail.computed_partial_price,
+                             SaleDetail.objects.get(pk=detail.pk).partial_price)
+
+    def test_filters_and_ordering_use_the_annotation(self):
+        filterset = SaleFilter(
+            {'total_price__gte': 1000, 'order_by': '-total_price'},
+            queryset=Sale.objects.with_total_price())
+        self.assertEqual(list(filterset.qs), [self.sale])
+
+        filterset = SaleDetailFilter(
+            {'partial_price__lte': 500}, queryset=SaleDetail.objects.with_partial_price())
+        self.assertEqual([detail.carpet for detail in filterset.qs], [self.second])
+
+    def test_graphql_ordering_by_an_unselected_total(self):
+        self.user.is_superuser = True
+        self.user.save()
+        request = RequestFactory().get('/')
+        request.user = self.user
+
+        response = Client(schema).execute(
+            '{ sales(orderBy: "-totalPrice") { edges { node { id } } } }',
+            context_value=request)
+
+        self.assertIsNone(response.get('errors'))
+        self.assertEqual(
+            [int(decode_relay_id(edge['node']['id'])[1])
+             for edge in response['data']['sales']['edges']],
+            [self.sale.pk, self.empty_sale.pk])
+
+
+class SaleStockReleaseTests(TestCase):
+    def setUp(self):
+        self.carpet = create_carpet(stock=5)
+        self.user = get_user_model().objects.create_superuser(
+            'admin@example.com', 'Ana', 'Rojas', '3001112233', 'secret')
+        self.sale = Sale.objects.create(
+            user=self.user, pay_method=PayMethod.objects.create(name='Efectivo'),
+            delivery_method=DeliveryMethod.objects.create(name='Domicilio', price=300))
+
+    def execute(self, mutation, **variables):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        response = Client(schema).execute(mutation, variables=variables, context_value=request)
+        self.assertIsNone(response.get('errors'))
+        return response['data']
+
+    def assertStock(self, stock):
+        self.carpet.inventory_item.refresh_from_db()
+        self.assertEqual(self.carpet.inventory_item.stock, stock)
+
+    def test_reserved_lines_give_their_stock_back(self):
+        self.execute('mutation Create($sale: ID!, $carpet: ID!) { createSaleDetail('
+                     'saleId: $sale, carpetId: $carpet, quantity: 3) { saleDetail { id } } }',
+                     sale=str(self.sale.pk), carpet=str(self.carpet.pk))
+        self.assertStock(2)
+        detail = SaleDetail.objects.get()
+
+        self.execute('mutation Update($id: ID!) { updateSaleDetail(id: $id, quantity: 1) '
+                     '{ saleDetail { id } } }', id=str(detail.pk))
+        self.assertStock(4)
+        self.execute('mutation Delete($id: ID!) { deleteSaleDetail(id: $id) '
+                     '{ saleDetail { quantity } } }', id=str(detail.pk))
+        self.assertStock(5)
+
+    def test_lines_from_before_reservations_leave_stock_alone(self):
+        legacy = SaleDetail.objects.create(sale=self.sale, carpet=self.carpet, quantity=2)
+
+        self.execute('mutation Update($id: ID!) { updateSaleDetail(id: $id, quantity: 1) '
+                     '{ saleDetail { id } } }', id=str(legacy.pk))
+        self.assertStock(5)
+        self.execute('mutation Delete($id: ID!) { deleteSale(id: $id) { sale { date } } }',
+                     id=str(self.sale.pk))
+        self.assertStock(5)
@@ -1,6 +1,6 @@
 import graphene
 from graphene import relay
-from django_filters import FilterSet
+from django_filters import FilterSet, NumberFilter, OrderingFilter
 from graphene_django import DjangoObjectType
 from users.types import NormalUserType
 from .models import (
@@ -30,6 +30,10 @@ class DeliveryMethodFilter(FilterSet):
 
 
 class SaleFilter(FilterSet):
+    total_price__gte = NumberFilter(field_name="computed_total_price", lookup_expr="gte")
+    total_price__lte = NumberFilter(field_name="computed_total_price", lookup_expr="lte")
+    order_by = OrderingFilter(fields=(("computed_total_price", "total_price"), "date"))
+
     class Meta:
         model = Sale
         fields = {
@@ -41,6 +45,10 @@ class SaleFilter(FilterSet):
 
 
 class SaleDetailFilter(FilterSet):
+    partial_price__gte = NumberFilter(field_name="computed_partial_price", lookup_expr="gte")
+    partial_price__lte = NumberFilter(field_name="computed_partial_price", lookup_expr="lte")
+    order_by = OrderingFilter(fields=(("computed_partial_price", "partial_price"), "quantity"))
+
     class Meta:
         model = SaleDetail
         fields = {
@@ -108,3 +116,8 @@ class SaleDetailOptionType(DjangoObjectType):
         interfaces = (relay.Node,)
         fields = ("id", "sale_detail", "custom_option_detail")
         filterset_class = SaleDetailOptionFilter
+
+
+class SaleItemInput(graphene.InputObjectType):
+    carpet_id = graphene.ID(required=True)
+    quantity = graphene.Int(required=True)
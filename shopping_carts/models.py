@@ -1,19 +1,49 @@
 from django.db import models
+from django.db.models import F, OuterRef
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
+from core.utils import sum_subquery
 from products.models import (
     Carpet,
     CustomOptionDetail,
 )
 
 
+class ShoppingCartQuerySet(models.QuerySet):
+    def with_total_price(self):
+        OptionDetail = ShoppingCartItemOption.custom_option_detail.through
+        carpets_price = sum_subquery(
+            ShoppingCartItem.objects.filter(shopping_cart=OuterRef('pk')),
+            'shopping_cart', F('quantity') * F('carpet__price'))
+        options_price = sum_subquery(
+            OptionDetail.objects.filter(
+                shoppingcartitemoption__shopping_cart_item__shopping_cart=OuterRef('pk')),
+            'shoppingcartitemoption__shopping_cart_item__shopping_cart', 'customoptiondetail__price')
+        return self.annotate(computed_total_price=carpets_price + options_price)
+
+
+class ShoppingCartItemQuerySet(models.QuerySet):
+    def with_partial_price(self):
+        OptionDetail = ShoppingCartItemOption.custom_option_detail.through
+        options_price = sum_subquery(
+            OptionDetail.objects.filter(
+                shoppingcartitemoption__shopping_cart_item=OuterRef('pk')),
+            'shoppingcartitemoption__shopping_cart_item', 'customoptiondetail__price')
+        return self.annotate(computed_partial_price=F('quantity') * F('carpet__price') + options_price)
+
+
 class ShoppingCart(models.Model):
     user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ShoppingCartQuerySet.as_manager()
+
     @property
     def total_price(self):
+        computed = getattr(self, 'computed_total_price', None)
+        if computed is not None:
+            return computed
         return sum(detail.partial_price for detail in self.shoppingcartitem_set.all())
 
 
@@ -27,8 +57,13 @@ class ShoppingCartItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ShoppingCartItemQuerySet.as_manager()
+
     @property
     def partial_price(self):
+        computed = getattr(self, 'computed_partial_price', None)
+        if computed is not None:
+            return computed
         carpet_price = self.quantity * self.carpet.price
         option_price = sum(
             option.total_price for option in self.shoppingcartitemoption_set.all())
@@ -4,6 +4,7 @@ from graphene_django.filter import DjangoFilterConnectionField
 from django.db import IntegrityError, transaction
 from django.core.exceptions import ValidationError
 from graphql_jwt.decorators import login_required, permission_required
+from core.utils import is_field_selected, needs_computed_field
 from products.models import Carpet, CustomOptionDetail
 from .models import (
     ShoppingCart,
@@ -237,22 +238,34 @@ class Query(graphene.ObjectType):
     @login_required
     @permission_required("shopping_cart.view_shoppingcart")
     def resolve_shopping_carts(self, info, **kwargs):
-        return ShoppingCart.objects.all()
+        queryset = ShoppingCart.objects.all()
+        if needs_computed_field(info, kwargs, 'totalPrice', 'total_price'):
+            queryset = queryset.with_total_price()
+        return queryset
 
     @login_required
     @permission_required("shopping_cart.view_shoppingcart")
     def resolve_shopping_cart(self, info, id):
-        return ShoppingCart.objects.get(id=id)
+        queryset = ShoppingCart.objects.all()
+        if is_field_selected(info, 'totalPrice'):
+            queryset = queryset.with_total_price()
+        return queryset.get(id=id)
 
     @login_required
     @permission_required("shopping_cart.view_shoppingcartitem")
     def resolve_shopping_cart_items(self, info, **kwargs):
-        return ShoppingCartItem.objects.all()
+        queryset = ShoppingCartItem.objects.all()
+        if needs_computed_field(info, kwargs, 'partialPrice', 'partial_price'):
+            queryset = queryset.with_partial_price()
+        return queryset
 
     @login_required
     @permission_required("shopping_cart.view_shoppingcartitem")
     def resolve_shopping_cart_item(self, info, id):
-        return ShoppingCartItem.objects.get(id=id)
+        queryset = ShoppingCartItem.objects.all()
+        if is_field_selected(info, 'partialPrice'):
+            queryset = queryset.with_partial_price()
+        return queryset.get(id=id)
 
     @login_required
     @permission_required("shopping_cart.view_shoppingcartitemoption")
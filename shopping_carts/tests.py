@@ -1,3 +1,59 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+from graphene.test import Client
+from core.schema import schema
+from core.utils import decode_relay_id
+from products.models import CustomOption, CustomOptionDetail
+from products.testing import create_carpet
+from .models import (
+    ShoppingCart,
+    ShoppingCartItem,
+    ShoppingCartItemOption,
+)
+from .types import ShoppingCartFilter
 
-# Create your tests here.
+
+class ShoppingCartTotalPriceTests(TestCase):
+    def setUp(self):
+        carpet = create_carpet()
+        detail = CustomOptionDetail.objects.create(
+            custom_option=CustomOption.objects.create(name='Logo'), name='Logo A',
+            image_url='https://example.com/option.png', price=50)
+
+        user = self.user = get_user_model().objects.create_user(
+            'cliente@example.com', 'Ana', 'Rojas', '3001112233', 'secret')
+        self.cart = ShoppingCart.objects.create(user=user)
+        item = ShoppingCartItem.objects.create(
+            shopping_cart=self.cart, carpet=carpet, quantity=3)
+        ShoppingCartItemOption.objects.create(
+            shopping_cart_item=item).custom_option_detail.add(detail)
+        self.empty_cart = ShoppingCart.objects.create(user=user)
+
+    def test_sql_totals_match_the_python_properties(self):
+        annotated = ShoppingCart.objects.with_total_price().in_bulk()
+
+        self.assertEqual(annotated[self.cart.pk].computed_total_price, 3050)
+        self.assertEqual(ShoppingCart.objects.get(pk=self.cart.pk).total_price, 3050)
+        self.assertEqual(annotated[self.empty_cart.pk].total_price, 0)
+        self.assertEqual(ShoppingCartItem.objects.with_partial_price().get().partial_price, 3050)
+
+    def test_filters_use_the_annotation(self):
+        filterset = ShoppingCartFilter(
+            {'total_price__gte': 1}, queryset=ShoppingCart.objects.with_total_price())
+        self.assertEqual(list(filterset.qs), [self.cart])
+
+    def test_graphql_ordering_by_an_unselected_total(self):
+        self.user.is_superuser = True
+        self.user.save()
+        request = RequestFactory().get('/')
+        request.user = self.user
+
+        response = Client(schema).execute(
+            '{ shoppingCarts(orderBy: "-totalPrice") { edges { node { id } } } }',
+            context_value=request)
+
+        self.assertIsNone(response.get('errors'))
+        self.assertEqual(
+            [int(decode_relay_id(edge['node']['id'])[1])
+             for edge in response['data']['shoppingCarts']['edges']],
+            [self.cart.pk, self.empty_cart.pk])
@@ -1,6 +1,6 @@
 import graphene
 from graphene import relay
-from django_filters import FilterSet
+from django_filters import FilterSet, NumberFilter, OrderingFilter
 from graphene_django import DjangoObjectType
 from users.types import NormalUserType
 from .models import (
@@ -11,6 +11,10 @@ from .models import (
 
 
 class ShoppingCartFilter(FilterSet):
+    total_price__gte = NumberFilter(field_name="computed_total_price", lookup_expr="gte")
+    total_price__lte = NumberFilter(field_name="computed_total_price", lookup_expr="lte")
+    order_by = OrderingFilter(fields=(("computed_total_price", "total_price"), "created_at", "updated_at"))
+
     class Meta:
         model = ShoppingCart
         fields = {
@@ -20,6 +24,10 @@ class ShoppingCartFilter(FilterSet):
 
 
 class ShoppingCartItemFilter(FilterSet):
+    partial_price__gte = NumberFilter(field_name="computed_partial_price", lookup_expr="gte")
+    partial_price__lte = NumberFilter(field_name="computed_partial_price", lookup_expr="lte")
+    order_by = OrderingFilter(fields=(("computed_partial_price", "partial_price"), "quantity"))
+
     class Meta:
         model = ShoppingCartItem
         fields = {
@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class SupplyChainsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'supply_chains'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .history import seed_price_history
+
+        post_migrate.connect(seed_price_history, sender=self,
+                             dispatch_uid='supply_chains_price_history_seed')
@@ -0,0 +1,60 @@
+from datetime import datetime, time, timedelta
+from django.db.models import Avg, Count, F, Max, Min
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from .models import MaterialBySupplier, MaterialPriceHistory, Supplier
+
+PRICE_HISTORY_BUCKETS = ('day', 'week', 'month')
+
+
+def record_price_history(offers, valid_from=None):
+    valid_from = valid_from or timezone.now()
+    return MaterialPriceHistory.objects.bulk_create([
+        MaterialPriceHistory(material_by_supplier_id=offer.pk,
+                             price=offer.price, valid_from=valid_from)
+        for offer in offers
+    ])
+
+
+def seed_price_history(using='default', **kwargs):
+    # Offers that predate the history get their current price as the first
+    # row, effective from their last update. Runs after every migrate and
+    # only touches offers without history.
+    offers = MaterialBySupplier.objects.using(using).filter(price_history__isnull=True)
+    return len(MaterialPriceHistory.objects.using(using).bulk_create([
+        MaterialPriceHistory(material_by_supplier_id=offer_id, price=price, valid_from=updated_at)
+        for offer_id, price, updated_at in offers.values_list('id', 'price', 'updated_at').iterator()
+    ]))
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def price_history_buckets(raw_material_id, date_from=None, date_to=None, bucket='day'):
+    if bucket not in PRICE_HISTORY_BUCKETS:
+        raise ValueError(f'Unknown bucket: {bucket}')
+
+    history = MaterialPriceHistory.objects.filter(
+        material_by_supplier__raw_material_id=raw_material_id)
+    # Plain range bounds on valid_from keep the history indexes usable.
+    if date_from:
+        history = history.filter(valid_from__gte=_day_start(date_from))
+    if date_to:
+        history = history.filter(
+            valid_from__lt=_day_start(date_to + timedelta(days=1)))
+
+    rows = list(history.annotate(
+        bucket=Trunc('valid_from', bucket),
+        supplier_id=F('material_by_supplier__supplier_id'),
+    ).values('supplier_id', 'bucket').annotate(
+        min_price=Min('price'),
+        max_price=Max('price'),
+        average_price=Avg('price'),
+        changes=Count('pk'),
+    ).order_by('bucket', 'supplier_id'))
+
+    suppliers = Supplier.objects.in_bulk({row['supplier_id'] for row in rows})
+    for row in rows:
+        row['supplier'] = suppliers[row.pop('supplier_id')]
+    return rows
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from supply_chains.planning import (
+    PLANNING_DEFAULT_CART_DAYS,
+    PLANNING_DEFAULT_LEAD_DAYS,
+    PLANNING_DEFAULT_REPLENISHMENT_DAYS,
+    create_planned_orders,
+    plan_material_requirements,
+)
+
+
+class Command(BaseCommand):
+    help = 'Compute raw material net requirements from cart demand and stock, optionally creating pending orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--replenishment-days', type=int,
+                            default=PLANNING_DEFAULT_REPLENISHMENT_DAYS,
+                            help='Re-buy material for carpets sold in the last days')
+        parser.add_argument('--consumption', type=float, default=1.0,
+                            help='Raw material consumed per carpet')
+        parser.add_argument('--cart-days', type=int, default=PLANNING_DEFAULT_CART_DAYS,
+                            help='Only cart items changed in the last days count as demand')
+        parser.add_argument('--create-orders', action='store_true',
+                            help='Create pending material orders for the net requirements')
+        parser.add_argument('--lead-days', type=int, default=PLANNING_DEFAULT_LEAD_DAYS,
+                            help='Days until the delivery date of created orders')
+
+    def handle(self, *args, **options):
+        try:
+            lines = plan_material_requirements(
+                replenishment_days=options['replenishment_days'],
+                consumption_per_unit=options['consumption'],
+                cart_days=options['cart_days'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for line in lines:
+            if line['net_requirement'] == 0:
+                continue
+            offer = line['offer']
+            source = f"{offer.supplier} at {offer.price}" if offer else 'no supplier offer'
+            self.stdout.write(
+                f"{line['raw_material']}: need {line['net_requirement']} ({source})")
+
+        if options['create_orders']:
+            try:
+                orders = create_planned_orders(
+                    lines, lead_days=options['lead_days'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(
+                f'Created {len(orders)} material orders'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Planned {len(lines)} raw materials'))
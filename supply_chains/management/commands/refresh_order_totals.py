@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from supply_chains.models import MaterialBySupplier, MaterialOrder, OrderDetail
+from supply_chains.signals import invalidate_orders
+
+
+class Command(BaseCommand):
+    help = 'Snapshot missing order line prices and recompute stored material order totals'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            filled = OrderDetail.objects.filter(unit_price__isnull=True).update(
+                unit_price=Subquery(MaterialBySupplier.objects.filter(
+                    pk=OuterRef('material_by_supplier')).values('price')[:1]))
+            self.stdout.write(self.style.SUCCESS(
+                f'Snapshotted unit prices for {filled} order details'))
+
+            orders = MaterialOrder.objects.all()
+            orders.lock()
+            refreshed = orders.refresh_total_prices()
+            transaction.on_commit(invalidate_orders)
+            self.stdout.write(self.style.SUCCESS(
+                f'Refreshed totals for {refreshed} material orders'))
@@ -1,8 +1,12 @@
 from datetime import date
-from django.db import models
+from django.contrib.postgres.indexes import BrinIndex
+from django.db import models, transaction
+from django.db.models import F, OuterRef
 from addresses.models import Address
+from core.utils import sum_subquery
 from inventories.models import InventoryItem
 from django.core.validators import EmailValidator, RegexValidator, MinValueValidator
+from django.utils import timezone
 
 
 class Supplier(models.Model):
@@ -30,10 +34,57 @@ class MaterialBySupplier(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['raw_material', '-updated_at'],
+                         name='material_offer_latest_idx'),
+            models.Index(fields=['raw_material', 'price'],
+                         name='material_offer_price_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so the save hook only records real price changes.
+        instance._loaded_price = instance.__dict__.get('price')
+        return instance
+
     def __str__(self):
         return f'{self.raw_material.name} by {self.supplier.name}'
 
 
+class MaterialPriceHistory(models.Model):
+    material_by_supplier = models.ForeignKey(
+        MaterialBySupplier, on_delete=models.CASCADE, related_name='price_history')
+    price = models.IntegerField(
+        blank=False, null=False, validators=[MinValueValidator(0)])
+    valid_from = models.DateTimeField(default=timezone.now, null=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['material_by_supplier', 'valid_from'],
+                         name='material_price_history_idx'),
+            # Rows are appended in time order, so a BRIN index stays tiny
+            # while pruning date ranges over years of history.
+            BrinIndex(fields=['valid_from'],
+                      name='material_price_valid_from_brin'),
+        ]
+
+    def __str__(self):
+        return f'{self.material_by_supplier} {self.price} @ {self.valid_from}'
+
+
+class MaterialOrderQuerySet(models.QuerySet):
+    def lock(self):
+        return list(self.select_for_update().values_list('pk', flat=True))
+
+    def refresh_total_prices(self):
+        # One UPDATE recomputing the stored totals from the line snapshots.
+        return self.update(total_price=sum_subquery(
+            OrderDetail.objects.filter(material_order=OuterRef('pk')),
+            'material_order', F('quantity') * F('unit_price')))
+
+
 class MaterialOrder(models.Model):
     STATUS_CHOICES = [
         ('PEN', 'Pendiente'),
@@ -45,12 +96,38 @@ class MaterialOrder(models.Model):
         max_length=3, choices=STATUS_CHOICES, default='PEN', blank=False, null=False)
     delivery_date = models.DateField(
         validators=[MinValueValidator(date.today())], blank=False, null=False)
+    received_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Set by save() on status transitions; scorecards read delivered_at.
+    status_changed_at = models.DateTimeField(default=timezone.now, editable=False)
+    delivered_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Maintained by OrderDetail.save()/delete() and the bulk order services.
+    total_price = models.IntegerField(default=0, null=False, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    @ property
-    def total_price(self):
-        return sum(detail.partial_price for detail in self.orderdetail_set.all())
+    objects = MaterialOrderQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.status == 'DEL' and self.delivered_at is None:
+            self.delivered_at = self.status_changed_at
+        elif not self._state.adding and \
+                self.status != getattr(self, '_loaded_status', self.status):
+            self.status_changed_at = timezone.now()
+            changed = ['status_changed_at']
+            if self.status == 'DEL' and self.delivered_at is None:
+                self.delivered_at = self.status_changed_at
+                changed.append('delivered_at')
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *changed}
+        super().save(*args, **kwargs)
+        self._loaded_status = self.status
 
     def __str__(self):
         return f'Order {self.pk}'
@@ -63,12 +140,50 @@ class OrderDetail(models.Model):
         MaterialBySupplier, on_delete=models.PROTECT, blank=False, null=False)
     quantity = models.IntegerField(blank=False, null=False, validators=[
         MinValueValidator(1)])
+    # Supplier price when the line was written; later repricing leaves it
+    # alone. Null only on lines older than the snapshot, see the
+    # refresh_order_totals command.
+    unit_price = models.IntegerField(
+        null=True, editable=False, validators=[MinValueValidator(0)])
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_offer_id = instance.__dict__.get('material_by_supplier_id')
+        return instance
+
     @ property
     def partial_price(self):
-        return self.quantity * self.material_by_supplier.price
+        if self.unit_price is None:
+            return self.quantity * self.material_by_supplier.price
+        return self.quantity * self.unit_price
+
+    def save(self, *args, **kwargs):
+        offer_changed = not self._state.adding and \
+            self.material_by_supplier_id != getattr(self, '_loaded_offer_id', None)
+        if self.unit_price is None or offer_changed:
+            self.unit_price = self.material_by_supplier.price
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'unit_price'}
+        order = MaterialOrder.objects.filter(pk=self.material_order_id)
+        with transaction.atomic():
+            # The order row is locked before the line is written, so the
+            # total below is summed after concurrent line changes commit.
+            order.lock()
+            super().save(*args, **kwargs)
+            order.refresh_total_prices()
+        self._loaded_offer_id = self.material_by_supplier_id
+
+    def delete(self, *args, **kwargs):
+        order = MaterialOrder.objects.filter(pk=self.material_order_id)
+        with transaction.atomic():
+            order.lock()
+            result = super().delete(*args, **kwargs)
+            order.refresh_total_prices()
+        return result
 
     def __str__(self):
         return f'{self.material_by_supplier.raw_material.name} x {self.quantity}'
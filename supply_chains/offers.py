@@ -0,0 +1,31 @@
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
+from .models import MaterialBySupplier
+
+BEST_OFFERS_MAX_LIMIT = 20
+
+
+def ranked_offers(queryset=None):
+    queryset = MaterialBySupplier.objects.all() if queryset is None else queryset
+    return queryset.annotate(offer_rank=Window(
+        RowNumber(),
+        partition_by=F('raw_material_id'),
+        order_by=[F('price').asc(), F('pk').asc()],
+    ))
+
+
+def best_supplier_offers(raw_material_ids, limit=1):
+    # One query: offers are ranked per material over the (raw_material, price)
+    # index and filtered on the window result.
+    return ranked_offers(
+        MaterialBySupplier.objects.filter(raw_material__in=raw_material_ids)
+        .select_related('supplier', 'raw_material'),
+    ).filter(offer_rank__lte=limit).order_by('raw_material_id', 'offer_rank')
+
+
+def prefetch_cheapest_offer():
+    return Prefetch(
+        'materialbysupplier_set',
+        queryset=ranked_offers().filter(offer_rank=1).select_related('supplier'),
+        to_attr='cheapest_offers',
+    )
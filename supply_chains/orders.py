@@ -0,0 +1,46 @@
+from collections import defaultdict
+from django.db import transaction
+from django.utils import timezone
+from .models import MaterialBySupplier, MaterialOrder, OrderDetail
+from .signals import invalidate_orders
+
+ORDER_MAX_LINES = 500
+
+
+def create_material_order_with_details(delivery_date, lines):
+    if not lines:
+        raise ValueError("An order needs at least one line.")
+    if len(lines) > ORDER_MAX_LINES:
+        raise ValueError(f"An order accepts at most {ORDER_MAX_LINES} lines.")
+    if delivery_date < timezone.localdate():
+        raise ValueError("The delivery date cannot be in the past.")
+
+    quantities = defaultdict(int)
+    for line in lines:
+        if line['quantity'] < 1:
+            raise ValueError("Quantities must be positive integers.")
+        try:
+            quantities[int(line['material_by_supplier_id'])] += line['quantity']
+        except (TypeError, ValueError):
+            raise MaterialBySupplier.DoesNotExist
+
+    # Every offer is validated with a single id__in query.
+    offers = MaterialBySupplier.objects.in_bulk(list(quantities))
+    if len(offers) != len(quantities):
+        raise MaterialBySupplier.DoesNotExist
+
+    with transaction.atomic():
+        # bulk_create skips OrderDetail.save(), so the line prices and the
+        # order total are written here.
+        material_order = MaterialOrder.objects.create(
+            status='PEN', delivery_date=delivery_date,
+            total_price=sum(offers[offer_id].price * quantity
+                            for offer_id, quantity in quantities.items()))
+        OrderDetail.objects.bulk_create([
+            OrderDetail(material_order=material_order,
+                        material_by_supplier=offers[offer_id], quantity=quantity,
+                        unit_price=offers[offer_id].price)
+            for offer_id, quantity in quantities.items()
+        ])
+        transaction.on_commit(invalidate_orders)
+    return material_order
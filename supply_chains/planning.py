@@ -0,0 +1,116 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from inventories.models import InventoryItem
+from products.models import Carpet
+from sales.models import SaleDetail
+from shopping_carts.models import ShoppingCartItem
+from .models import MaterialOrder, OrderDetail
+from .offers import best_supplier_offers
+from .signals import invalidate_orders
+
+PLANNING_DEFAULT_REPLENISHMENT_DAYS = 0
+# Cart items untouched for longer than this are treated as abandoned.
+PLANNING_DEFAULT_CART_DAYS = 14
+PLANNING_DEFAULT_LEAD_DAYS = 7
+
+
+def _sum_by(queryset, key):
+    return dict(queryset.order_by().values_list(key).annotate(total=Sum('quantity')))
+
+
+def plan_material_requirements(replenishment_days=PLANNING_DEFAULT_REPLENISHMENT_DAYS, consumption_per_unit=1.0,
+                               cart_days=PLANNING_DEFAULT_CART_DAYS):
+    if replenishment_days < 0:
+        raise ValueError("Replenishment days must be a positive integer")
+    if cart_days < 1:
+        raise ValueError("Cart days must be at least 1")
+    if consumption_per_unit <= 0:
+        raise ValueError("Consumption per unit must be greater than zero")
+
+    # Every input is one grouped query over the whole catalog; the plan itself
+    # is plain dictionary arithmetic on those aggregates.
+    # Cart items added or changed in the last cart_days are the open demand
+    # and are netted against carpet stock; older ones count as abandoned.
+    # Sales were already taken from that stock when they were reserved, so
+    # the optional replenishment re-buys what sold in the last days as is.
+    open_demand = _sum_by(ShoppingCartItem.objects.filter(
+        updated_at__gte=timezone.now() - timedelta(days=cart_days)), 'carpet_id')
+    sold = {}
+    if replenishment_days:
+        since = timezone.now() - timedelta(days=replenishment_days)
+        sold = _sum_by(SaleDetail.objects.filter(sale__date__gte=since), 'carpet_id')
+
+    carpets = Carpet.objects.filter(pk__in={*open_demand, *sold}).values_list(
+        'id', 'inventory_item__stock', 'material_id')
+    gross = defaultdict(int)
+    replenishment = defaultdict(int)
+    for carpet_id, carpet_stock, material_id in carpets:
+        to_produce = max(0, open_demand.get(carpet_id, 0) - carpet_stock)
+        if to_produce:
+            gross[material_id] += math.ceil(to_produce * consumption_per_unit)
+        if sold.get(carpet_id):
+            restock = math.ceil(sold[carpet_id] * consumption_per_unit)
+            replenishment[material_id] += restock
+            gross[material_id] += restock
+
+    materials = InventoryItem.objects.in_bulk(list(gross))
+    on_order = _sum_by(
+        OrderDetail.objects.filter(
+            material_order__status='PEN', material_by_supplier__raw_material__in=gross),
+        'material_by_supplier__raw_material')
+    offers = {offer.raw_material_id: offer
+              for offer in best_supplier_offers(list(gross), limit=1)}
+
+    lines = []
+    for material_id in sorted(gross):
+        stock = materials[material_id].stock
+        scheduled = on_order.get(material_id, 0)
+        net = max(0, gross[material_id] - stock - scheduled)
+        offer = offers.get(material_id)
+        lines.append({
+            'raw_material': materials[material_id],
+            'gross_requirement': gross[material_id],
+            'replenishment': replenishment[material_id],
+            'stock': stock,
+            'on_order': scheduled,
+            'net_requirement': net,
+            'offer': offer,
+            'total_price': net * offer.price if offer else None,
+        })
+    return lines
+
+
+def create_planned_orders(lines, lead_days=PLANNING_DEFAULT_LEAD_DAYS):
+    if lead_days < 0:
+        raise ValueError("Lead days must be a positive integer")
+
+    # One pending order per supplier with the cheapest offer for each material.
+    by_supplier = defaultdict(list)
+    for line in lines:
+        if line['net_requirement'] > 0 and line['offer'] is not None:
+            by_supplier[line['offer'].supplier_id].append(line)
+    if not by_supplier:
+        return []
+
+    delivery_date = timezone.localdate() + timedelta(days=lead_days)
+    with transaction.atomic():
+        orders = MaterialOrder.objects.bulk_create([
+            MaterialOrder(status='PEN', delivery_date=delivery_date,
+                          total_price=sum(line['total_price'] for line in supplier_lines))
+            for supplier_lines in by_supplier.values()
+        ])
+        OrderDetail.objects.bulk_create([
+            OrderDetail(material_order=order,
+                        material_by_supplier=line['offer'],
+                        quantity=line['net_requirement'],
+                        unit_price=line['offer'].price)
+            for order, supplier_lines in zip(orders, by_supplier.values())
+            for line in supplier_lines
+        ])
+        # bulk_create sends no post_save, so cached scorecards are reset here.
+        transaction.on_commit(invalidate_orders)
+    return orders
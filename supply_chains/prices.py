@@ -0,0 +1,46 @@
+from django.db import transaction
+from django.utils import timezone
+from core.cache import bump_version
+from .history import record_price_history
+from .models import MaterialBySupplier
+from .signals import PRICE_VERSION_KEY
+
+PRICE_UPDATE_MAX_ROWS = 1000
+
+
+# Applies a supplier price list: one locked read, one bulk UPDATE and one
+# bulk INSERT into the price history for the offers whose price changed.
+def update_offer_prices(prices):
+    new_prices = {}
+    for item in prices:
+        try:
+            offer_id = int(item['material_by_supplier_id'])
+        except (TypeError, ValueError):
+            raise MaterialBySupplier.DoesNotExist
+        if item['price'] < 0:
+            raise ValueError("Prices must be positive integers.")
+        if offer_id in new_prices:
+            raise ValueError(f"Offer {offer_id} is priced more than once.")
+        new_prices[offer_id] = item['price']
+    if len(new_prices) > PRICE_UPDATE_MAX_ROWS:
+        raise ValueError(f"At most {PRICE_UPDATE_MAX_ROWS} prices can be updated at once.")
+
+    with transaction.atomic():
+        offers = MaterialBySupplier.objects.select_for_update().in_bulk(list(new_prices))
+        if len(offers) != len(new_prices):
+            raise MaterialBySupplier.DoesNotExist
+
+        now = timezone.now()
+        changed = [offer for offer_id, offer in offers.items()
+                   if offer.price != new_prices[offer_id]]
+        for offer in changed:
+            offer.price = new_prices[offer.pk]
+            offer.updated_at = now
+            offer._loaded_price = offer.price
+        # bulk_update sends no post_save, so history and the cached
+        # valuations are handled here.
+        MaterialBySupplier.objects.bulk_update(changed, ['price', 'updated_at'])
+        record_price_history(changed, valid_from=now)
+        if changed:
+            transaction.on_commit(lambda: bump_version(PRICE_VERSION_KEY))
+    return [offers[offer_id] for offer_id in new_prices]
@@ -0,0 +1,53 @@
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from inventories.utils import bulk_adjust_stock
+from .models import MaterialOrder
+
+
+class OrderAlreadyReceived(Exception):
+    pass
+
+
+def receive_material_order(order_id, received_quantities=None):
+    with transaction.atomic():
+        # The order row lock serializes retries; received_at makes the second
+        # one a no-op instead of adding the stock twice. Orders delivered
+        # before received_at existed have it unset, so DEL counts as received.
+        material_order = MaterialOrder.objects.select_for_update().get(pk=order_id)
+        if material_order.received_at is not None or material_order.status == 'DEL':
+            raise OrderAlreadyReceived(material_order)
+        if material_order.status == 'CAN':
+            raise ValueError("Cannot receive a canceled order.")
+
+        ordered = dict(material_order.orderdetail_set.order_by().values_list(
+            'material_by_supplier__raw_material').annotate(total=Sum('quantity')))
+        if not ordered:
+            raise ValueError("The order has no details to receive.")
+
+        received = dict(ordered)
+        for item in received_quantities or []:
+            try:
+                material_id = int(item['raw_material_id'])
+            except (TypeError, ValueError):
+                material_id = None
+            if material_id not in ordered:
+                raise ValueError(
+                    f"Material {item['raw_material_id']} is not part of this order.")
+            if item['quantity'] < 0:
+                raise ValueError("Received quantities must be positive integers.")
+            received[material_id] = item['quantity']
+
+        results = bulk_adjust_stock(
+            [{'id': material_id, 'delta': quantity}
+             for material_id, quantity in received.items() if quantity],
+            kind='PUR')
+        errors = [result for result in results if result['error']]
+        if errors:
+            raise ValueError(
+                f"Material {errors[0]['id']}: {errors[0]['error']}")
+
+        material_order.status = 'DEL'
+        material_order.received_at = timezone.now()
+        material_order.save(update_fields=['status', 'received_at', 'updated_at'])
+    return material_order, received
@@ -21,8 +21,32 @@ from .types import (
     SupplierType,
     MaterialBySupplierType,
     MaterialOrderType,
-    OrderDetailType
+    OrderDetailType,
+    ValuationMethod,
+    InventoryValuationType,
+    MaterialRequirementType,
+    ReceivedQuantityInput,
+    ReceivedMaterialType,
+    OrderLineInput,
+    MaterialPriceInput,
+    PriceHistoryBucket,
+    SupplierPriceHistoryType,
+    SupplierScorecardType,
 )
+from .planning import (
+    PLANNING_DEFAULT_CART_DAYS,
+    PLANNING_DEFAULT_LEAD_DAYS,
+    PLANNING_DEFAULT_REPLENISHMENT_DAYS,
+    create_planned_orders,
+    plan_material_requirements,
+)
+from .orders import create_material_order_with_details
+from .receiving import OrderAlreadyReceived, receive_material_order
+from .offers import BEST_OFFERS_MAX_LIMIT, best_supplier_offers
+from .prices import update_offer_prices
+from .history import price_history_buckets
+from .scorecards import get_supplier_scorecards
+from .valuation import get_inventory_valuation
 
 
 class CreateSupplierMutation(graphene.Mutation):
@@ -232,6 +256,25 @@ class UpdateMaterialBySupplierMutation(graphene.Mutation):
             raise GraphQLError(f'Unknown error: {str(e)}')
 
 
+class UpdateMaterialPricesMutation(graphene.Mutation):
+    class Arguments:
+        prices = graphene.List(graphene.NonNull(MaterialPriceInput), required=True)
+
+    materials_by_supplier = graphene.List(MaterialBySupplierType)
+
+    @login_required
+    @permission_required('supply_chains.change_materialbysupplier')
+    def mutate(self, info, prices):
+        try:
+            return UpdateMaterialPricesMutation(materials_by_supplier=update_offer_prices(prices))
+        except MaterialBySupplier.DoesNotExist:
+            raise GraphQLError('Material by supplier not found.')
+        except ValueError as e:
+            raise GraphQLError(str(e))
+        except Exception as e:
+            raise GraphQLError(f'Unknown error: {str(e)}')
+
+
 class CreateMaterialOrderMutation(graphene.Mutation):
     class Arguments:
         status = graphene.String(
@@ -255,6 +298,28 @@ class CreateMaterialOrderMutation(graphene.Mutation):
             raise GraphQLError(f'Unknown error: {str(e)}')
 
 
+class CreateMaterialOrderWithDetailsMutation(graphene.Mutation):
+    class Arguments:
+        delivery_date = graphene.Date(required=True)
+        lines = graphene.List(graphene.NonNull(OrderLineInput), required=True)
+
+    material_order = graphene.Field(MaterialOrderType)
+
+    @login_required
+    @permission_required('supply_chains.add_materialorder')
+    def mutate(self, info, delivery_date, lines):
+        try:
+            material_order = create_material_order_with_details(
+                delivery_date, lines)
+            return CreateMaterialOrderWithDetailsMutation(material_order=material_order)
+        except MaterialBySupplier.DoesNotExist:
+            raise GraphQLError('Material by supplier not found.')
+        except ValueError as e:
+            raise GraphQLError(str(e))
+        except Exception as e:
+            raise GraphQLError(f'Unknown error: {str(e)}')
+
+
 class DeleteMaterialOrderMutation(graphene.Mutation):
     class Arguments:
         id = graphene.ID(required=True)
@@ -277,7 +342,8 @@ class DeleteMaterialOrderMutation(graphene.Mutation):
 class UpdateMaterialOrderMutation(graphene.Mutation):
     class Arguments:
         id = graphene.ID(required=True)
-        status = graphene.String(description='Order status(PEN, DEL, CAN)')
+        status = graphene.String(
+            description='Order status(PEN, CAN); deliveries go through receiveMaterialOrder')
         delivery_date = graphene.Date()
 
     material_order = graphene.Field(MaterialOrderType)
@@ -287,16 +353,24 @@ class UpdateMaterialOrderMutation(graphene.Mutation):
     def mutate(self, info, id, status=None, delivery_date=None):
         if not status and not delivery_date:
             raise GraphQLError("No data to update.")
+        if status == 'DEL':
+            raise GraphQLError(
+                "Use receiveMaterialOrder to mark an order as delivered.")
 
         try:
             material_order = MaterialOrder.objects.get(pk=id)
 
+            # Explicit fields keep this save from writing back a stale
+            # total_price, which is maintained by the order lines.
+            update_fields = ['updated_at']
             if status:
                 material_order.status = status
+                update_fields.append('status')
             if delivery_date:
                 material_order.delivery_date = delivery_date
+                update_fields.append('delivery_date')
 
-            material_order.save()
+            material_order.save(update_fields=update_fields)
             return UpdateMaterialOrderMutation(material_order=material_order)
         except MaterialOrder.DoesNotExist:
             raise GraphQLError('Material order not found.')
@@ -306,6 +380,38 @@ class UpdateMaterialOrderMutation(graphene.Mutation):
             raise GraphQLError(f'Unknown error: {str(e)}')
 
 
+class ReceiveMaterialOrderMutation(graphene.Mutation):
+    class Arguments:
+        id = graphene.ID(required=True)
+        received_quantities = graphene.List(
+            graphene.NonNull(ReceivedQuantityInput), description='Quantities that differ from the ordered ones')
+
+    material_order = graphene.Field(MaterialOrderType)
+    received = graphene.List(ReceivedMaterialType)
+    already_received = graphene.Boolean()
+
+    @login_required
+    @permission_required('supply_chains.change_materialorder')
+    def mutate(self, info, id, received_quantities=None):
+        try:
+            material_order, received = receive_material_order(
+                id, received_quantities)
+            return ReceiveMaterialOrderMutation(
+                material_order=material_order,
+                received=[{'raw_material_id': material_id, 'quantity': quantity}
+                          for material_id, quantity in received.items()],
+                already_received=False,
+            )
+        except OrderAlreadyReceived as e:
+            return ReceiveMaterialOrderMutation(material_order=e.args[0], received=[], already_received=True)
+        except MaterialOrder.DoesNotExist:
+            raise GraphQLError('Material order not found.')
+        except ValueError as e:
+            raise GraphQLError(str(e))
+        except Exception as e:
+            raise GraphQLError(f'Unknown error: {str(e)}')
+
+
 class CreateOrderDetailMutation(graphene.Mutation):
     class Arguments:
         material_order_id = graphene.ID(required=True)
@@ -417,6 +523,39 @@ class UpdateOrderDetailMutation(graphene.Mutation):
             raise GraphQLError(f'Unknown error: {str(e)}')
 
 
+class PlanMaterialRequirementsMutation(graphene.Mutation):
+    class Arguments:
+        replenishment_days = graphene.Int(
+            default_value=PLANNING_DEFAULT_REPLENISHMENT_DAYS,
+            description='Re-buy material for carpets sold in the last days, 0 to skip')
+        consumption_per_unit = graphene.Float(
+            default_value=1.0, description='Raw material consumed per carpet')
+        cart_days = graphene.Int(
+            default_value=PLANNING_DEFAULT_CART_DAYS,
+            description='Only cart items changed in the last days count as demand')
+        create_orders = graphene.Boolean(
+            default_value=False, description='Create pending orders for the net requirements')
+        lead_days = graphene.Int(default_value=PLANNING_DEFAULT_LEAD_DAYS)
+
+    requirements = graphene.List(MaterialRequirementType)
+    material_orders = graphene.List(MaterialOrderType)
+
+    @login_required
+    @permission_required('supply_chains.add_materialorder')
+    def mutate(self, info, replenishment_days=PLANNING_DEFAULT_REPLENISHMENT_DAYS, consumption_per_unit=1.0, cart_days=PLANNING_DEFAULT_CART_DAYS, create_orders=False, lead_days=PLANNING_DEFAULT_LEAD_DAYS):
+        try:
+            requirements = plan_material_requirements(
+                replenishment_days=replenishment_days, consumption_per_unit=consumption_per_unit,
+                cart_days=cart_days)
+            material_orders = create_planned_orders(
+                requirements, lead_days=lead_days) if create_orders else []
+            return PlanMaterialRequirementsMutation(requirements=requirements, material_orders=material_orders)
+        except ValueError as e:
+            raise GraphQLError(str(e))
+        except Exception as e:
+            raise GraphQLError(f'Unknown error: {str(e)}')
+
+
 class Query(graphene.ObjectType):
     supplier = graphene.Field(SupplierType, id=graphene.ID())
     suppliers = DjangoFilterConnectionField(SupplierType)
@@ -431,6 +570,26 @@ class Query(graphene.ObjectType):
     order_detail = graphene.Field(OrderDetailType, id=graphene.ID())
     order_details = DjangoFilterConnectionField(OrderDetailType)
 
+    best_supplier_offers = graphene.List(
+        MaterialBySupplierType,
+        raw_material_ids=graphene.List(graphene.NonNull(graphene.ID), required=True),
+        limit=graphene.Int(default_value=1, description='Offers returned per material'))
+
+    inventory_valuation = graphene.Field(
+        InventoryValuationType, method=ValuationMethod(default_value='cheapest'))
+
+    supplier_price_history = graphene.List(
+        SupplierPriceHistoryType,
+        raw_material=graphene.ID(required=True),
+        date_from=graphene.Date(name='from'),
+        date_to=graphene.Date(name='to'),
+        bucket=PriceHistoryBucket(default_value='day'))
+
+    supplier_scorecards = graphene.List(
+        SupplierScorecardType,
+        date_from=graphene.Date(name='from', required=True),
+        date_to=graphene.Date(name='to', required=True))
+
     @login_required
     @permission_required('supply_chains.view_supplier')
     def resolve_supplier(self, info, id):
@@ -471,6 +630,35 @@ class Query(graphene.ObjectType):
     def resolve_order_details(self, info, **kwargs):
         return OrderDetail.objects.all()
 
+    @login_required
+    @permission_required('supply_chains.view_materialbysupplier')
+    def resolve_best_supplier_offers(self, info, raw_material_ids, limit=1):
+        if limit < 1 or limit > BEST_OFFERS_MAX_LIMIT:
+            raise GraphQLError(
+                f"Limit must be between 1 and {BEST_OFFERS_MAX_LIMIT}")
+        return best_supplier_offers(raw_material_ids, limit=limit)
+
+    @login_required
+    @permission_required('supply_chains.view_materialbysupplier')
+    def resolve_inventory_valuation(self, info, method='cheapest'):
+        return get_inventory_valuation(getattr(method, 'value', method))
+
+    @login_required
+    @permission_required('supply_chains.view_materialbysupplier')
+    def resolve_supplier_price_history(self, info, raw_material, date_from=None,
+                                       date_to=None, bucket='day'):
+        if date_from and date_to and date_from > date_to:
+            raise GraphQLError("'from' must not be after 'to'.")
+        return price_history_buckets(
+            raw_material, date_from, date_to, getattr(bucket, 'value', bucket))
+
+    @login_required
+    @permission_required('supply_chains.view_materialorder')
+    def resolve_supplier_scorecards(self, info, date_from, date_to):
+        if date_from > date_to:
+            raise GraphQLError("'from' must not be after 'to'.")
+        return get_supplier_scorecards(date_from, date_to)
+
 
 class Mutation(graphene.ObjectType):
     create_supplier = CreateSupplierMutation.Field()
@@ -480,10 +668,14 @@ class Mutation(graphene.ObjectType):
     create_material_by_supplier = CreateMaterialBySupplierMutation.Field()
     delete_material_by_supplier = DeleteMaterialBySupplierMutation.Field()
     update_material_by_supplier = UpdateMaterialBySupplierMutation.Field()
+    update_material_prices = UpdateMaterialPricesMutation.Field()
 
     create_material_order = CreateMaterialOrderMutation.Field()
+    create_material_order_with_details = CreateMaterialOrderWithDetailsMutation.Field()
     delete_material_order = DeleteMaterialOrderMutation.Field()
     update_material_order = UpdateMaterialOrderMutation.Field()
+    receive_material_order = ReceiveMaterialOrderMutation.Field()
+    plan_material_requirements = PlanMaterialRequirementsMutation.Field()
 
     create_order_detail = CreateOrderDetailMutation.Field()
     delete_order_detail = DeleteOrderDetailMutation.Field()
@@ -0,0 +1,68 @@
+from datetime import datetime, time, timedelta
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+from core.cache import get_version
+from .models import MaterialBySupplier, MaterialOrder, OrderDetail, Supplier
+from .signals import ORDERS_VERSION_KEY
+
+SCORECARDS_CACHE_TIMEOUT = 60 * 60
+
+
+def _scorecards_sql():
+    # Lines are first folded into one row per (supplier, order), so an order
+    # with several lines from the same supplier counts once in the rates.
+    return f'''
+        WITH supplier_orders AS (
+            SELECT offer.supplier_id, material_order.id,
+                   material_order.delivery_date, material_order.created_at,
+                   material_order.delivered_at,
+                   SUM(detail.quantity * detail.unit_price) AS spend
+            FROM {OrderDetail._meta.db_table} detail
+            JOIN {MaterialOrder._meta.db_table} material_order
+                ON material_order.id = detail.material_order_id
+            JOIN {MaterialBySupplier._meta.db_table} offer
+                ON offer.id = detail.material_by_supplier_id
+            WHERE material_order.created_at >= %s
+              AND material_order.created_at < %s
+              AND material_order.status <> 'CAN'
+            GROUP BY offer.supplier_id, material_order.id
+        )
+        SELECT supplier_id, COUNT(*), SUM(spend), COUNT(delivered_at),
+               COUNT(*) FILTER (WHERE delivered_at::date <= delivery_date),
+               AVG(EXTRACT(EPOCH FROM delivered_at - created_at)) / 86400
+        FROM supplier_orders
+        GROUP BY supplier_id
+        ORDER BY SUM(spend) DESC, supplier_id
+    '''
+
+
+def compute_supplier_scorecards(date_from, date_to):
+    start = timezone.make_aware(datetime.combine(date_from, time.min))
+    end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+    with connection.cursor() as cursor:
+        cursor.execute(_scorecards_sql(), [start, end])
+        rows = cursor.fetchall()
+
+    return [{
+        'supplier_id': supplier_id,
+        'order_count': order_count,
+        'spend': int(spend or 0),
+        'delivered_count': delivered_count,
+        'on_time_rate': on_time / delivered_count if delivered_count else None,
+        'average_lead_time_days': float(lead_time) if lead_time is not None else None,
+    } for supplier_id, order_count, spend, delivered_count, on_time, lead_time in rows]
+
+
+def get_supplier_scorecards(date_from, date_to):
+    cache_key = (f'{ORDERS_VERSION_KEY}:{get_version(ORDERS_VERSION_KEY)}:'
+                 f'scorecards:{date_from.isoformat()}:{date_to.isoformat()}')
+    scorecards = cache.get(cache_key)
+    if scorecards is None:
+        scorecards = compute_supplier_scorecards(date_from, date_to)
+        cache.set(cache_key, scorecards, SCORECARDS_CACHE_TIMEOUT)
+
+    suppliers = Supplier.objects.in_bulk(
+        [scorecard['supplier_id'] for scorecard in scorecards])
+    return [{**scorecard, 'supplier': suppliers.get(scorecard['supplier_id'])}
+            for scorecard in scorecards]
@@ -0,0 +1,34 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from core.cache import bump_version
+from .history import record_price_history
+from .models import MaterialBySupplier, MaterialOrder, OrderDetail
+
+PRICE_VERSION_KEY = 'supply_chains:prices'
+ORDERS_VERSION_KEY = 'supply_chains:orders'
+
+
+@receiver(post_save, sender=MaterialBySupplier)
+@receiver(post_delete, sender=MaterialBySupplier)
+def bump_price_version(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version(PRICE_VERSION_KEY))
+
+
+@receiver(post_save, sender=MaterialBySupplier)
+def record_price_change(sender, instance, created, **kwargs):
+    if created or instance.price != getattr(instance, '_loaded_price', None):
+        record_price_history([instance])
+        instance._loaded_price = instance.price
+
+
+@receiver(post_save, sender=MaterialOrder)
+@receiver(post_delete, sender=MaterialOrder)
+@receiver(post_save, sender=OrderDetail)
+@receiver(post_delete, sender=OrderDetail)
+def bump_orders_version(sender, **kwargs):
+    transaction.on_commit(invalidate_orders)
+
+
+def invalidate_orders():
+    bump_version(ORDERS_VERSION_KEY)
@@ -1,3 +1,461 @@
-from django.test import TestCase
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.management import call_command
+from io import StringIO
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+from graphene.test import Client
+from addresses.models import Locality, Neighborhood, Address
+from core.cache import clear_local_versions, get_version
+from core.schema import schema
+from inventories.models import InventoryItem
+from products.testing import create_carpet
+from sales.models import PayMethod, DeliveryMethod, Sale, SaleDetail
+from shopping_carts.models import ShoppingCart, ShoppingCartItem
+from .history import price_history_buckets, record_price_history, seed_price_history
+from .models import Supplier, MaterialBySupplier, MaterialOrder, OrderDetail, MaterialPriceHistory
+from .orders import create_material_order_with_details
+from .offers import best_supplier_offers, prefetch_cheapest_offer
+from .planning import create_planned_orders, plan_material_requirements
+from .prices import update_offer_prices
+from .receiving import OrderAlreadyReceived, receive_material_order
+from .scorecards import get_supplier_scorecards
+from .signals import ORDERS_VERSION_KEY
+from .valuation import compute_inventory_valuation, get_inventory_valuation
 
-# Create your tests here.
+
+class SupplyChainTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_versions()
+        locality = Locality.objects.create(name='Suba')
+        neighborhood = Neighborhood.objects.create(
+            name='Tibabuyes', locality=locality)
+        address = Address.objects.create(
+            details='Calle 1 # 2-3', neighborhood=neighborhood)
+        self.supplier_a = Supplier.objects.create(
+            name='Cueros SA', email='a@example.com', phone='3001234567', address=address)
+        self.supplier_b = Supplier.objects.create(
+            name='Textiles SA', email='b@example.com', phone='3007654321', address=address)
+        self.leather = InventoryItem.objects.create(name='Cuero', stock=10, type='RAW')
+        self.thread = InventoryItem.objects.create(name='Hilo', stock=4, type='RAW')
+        self.unpriced = InventoryItem.objects.create(name='Caucho', stock=7, type='RAW')
+        self.leather_a = MaterialBySupplier.objects.create(
+            raw_material=self.leather, supplier=self.supplier_a, price=10)
+        self.leather_b = MaterialBySupplier.objects.create(
+            raw_material=self.leather, supplier=self.supplier_b, price=14)
+        self.thread_a = MaterialBySupplier.objects.create(
+            raw_material=self.thread, supplier=self.supplier_a, price=3)
+
+    def create_user(self, email='cliente@example.com', permissions=()):
+        user = get_user_model().objects.create_user(
+            email, 'Ana', 'Rojas', '3001112233', 'secret')
+        user.user_permissions.add(*Permission.objects.filter(codename__in=permissions))
+        return get_user_model().objects.get(pk=user.pk)
+
+    def execute(self, query, user, variables=None):
+        request = RequestFactory().get('/')
+        request.user = user
+        return Client(schema).execute(query, variables=variables, context_value=request)
+
+
+
+class InventoryValuationTests(SupplyChainTestCase):
+    def test_methods_price_raw_stock_differently(self):
+        values = {method: compute_inventory_valuation(method)['total_value']
+                  for method in ('cheapest', 'average', 'latest')}
+
+        self.assertEqual(values, {'cheapest': 112, 'average': 132, 'latest': 152})
+
+    def test_unpriced_materials_are_counted(self):
+        valuation = compute_inventory_valuation('cheapest')
+
+        self.assertEqual(valuation['total_stock'], 21)
+        self.assertEqual(valuation['material_count'], 3)
+        self.assertEqual(valuation['unpriced_count'], 1)
+
+    def test_cached_valuation_follows_price_changes(self):
+        self.assertEqual(get_inventory_valuation('cheapest')['total_value'], 112)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.thread_a.price = 5
+            self.thread_a.save()
+
+        self.assertEqual(get_inventory_valuation('cheapest')['total_value'], 120)
+        with self.assertRaises(ValueError):
+            get_inventory_valuation('fifo')
+
+
+class CheapestOfferTests(SupplyChainTestCase):
+    def test_best_offers_are_ranked_per_material(self):
+        offers = best_supplier_offers([self.leather.pk, self.thread.pk], limit=2)
+
+        self.assertEqual([(offer, offer.offer_rank) for offer in offers], [
+            (self.leather_a, 1), (self.leather_b, 2), (self.thread_a, 1)])
+        self.assertEqual(list(best_supplier_offers([self.leather.pk])),
+                         [self.leather_a])
+
+    def test_prefetch_loads_the_cheapest_offer_per_item(self):
+        with self.assertNumQueries(2):
+            items = {item.pk: item.cheapest_offers for item in
+                     InventoryItem.objects.prefetch_related(prefetch_cheapest_offer())}
+
+        self.assertEqual(items[self.leather.pk], [self.leather_a])
+        self.assertEqual(items[self.thread.pk], [self.thread_a])
+        self.assertEqual(items[self.unpriced.pk], [])
+
+    def test_cheapest_offer_requires_supplier_permission(self):
+        user = self.create_user(permissions=['view_inventoryitem'])
+
+        response = self.execute(
+            '{ inventoryItems(type: "RAW") { edges { node { name cheapestOffer { price } } } } }',
+            user)
+
+        self.assertIsNotNone(response.get('errors'))
+        nodes = [edge['node'] for edge in response['data']['inventoryItems']['edges']]
+        self.assertTrue(nodes)
+        self.assertTrue(all(node['cheapestOffer'] is None for node in nodes))
+
+
+class MaterialPlanningTests(SupplyChainTestCase):
+    def setUp(self):
+        super().setUp()
+        self.carpet = create_carpet('Tapete Cuero', stock=2, material=self.leather)
+        self.sold_out = create_carpet('Tapete Hilo', stock=0, material=self.thread)
+        user = self.create_user()
+        cart = ShoppingCart.objects.create(user=user)
+        ShoppingCartItem.objects.create(shopping_cart=cart, carpet=self.carpet, quantity=5)
+        abandoned = ShoppingCartItem.objects.create(
+            shopping_cart=ShoppingCart.objects.create(user=user), carpet=self.carpet, quantity=40)
+        ShoppingCartItem.objects.filter(pk=abandoned.pk).update(
+            updated_at=timezone.now() - timedelta(days=60))
+        sale = Sale.objects.create(
+            user=user, pay_method=PayMethod.objects.create(name='Efectivo'),
+            delivery_method=DeliveryMethod.objects.create(name='Tienda'))
+        SaleDetail.objects.create(sale=sale, carpet=self.carpet, quantity=10)
+        SaleDetail.objects.create(sale=sale, carpet=self.sold_out, quantity=3)
+        pending = MaterialOrder.objects.create(delivery_date=date.today())
+        OrderDetail.objects.create(
+            material_order=pending, material_by_supplier=self.leather_b, quantity=1)
+
+    def test_cart_demand_is_netted_against_stock_and_orders(self):
+        line, = plan_material_requirements(consumption_per_unit=4)
+
+        # 5 in recent carts - 2 carpets in stock = 3 carpets, 12 units of
+        # leather, minus 10 in stock and 1 already on order. The abandoned
+        # cart and sold carpets are not demand: the stock of a sale was taken
+        # when it was recorded.
+        self.assertEqual(line['raw_material'], self.leather)
+        self.assertEqual((line['gross_requirement'], line['replenishment']), (12, 0))
+        self.assertEqual((line['stock'], line['on_order'], line['net_requirement']), (10, 1, 1))
+        self.assertEqual((line['offer'], line['total_price']), (self.leather_a, 10))
+
+    def test_older_carts_count_with_a_wider_window(self):
+        line, = plan_material_requirements(cart_days=90)
+
+        self.assertEqual(line['gross_requirement'], 45 - 2)
+        with self.assertRaises(ValueError):
+            plan_material_requirements(cart_days=0)
+
+    def test_replenishment_rebuys_recent_sales_without_netting_stock(self):
+        lines = {line['raw_material']: line
+                 for line in plan_material_requirements(replenishment_days=30)}
+
+        # Leather: 3 carpets for carts plus the 10 sold, minus 10 in stock and
+        # 1 on order. Thread: the 3 sold carpets are covered by its stock of 4.
+        self.assertEqual(lines[self.leather]['replenishment'], 10)
+        self.assertEqual(lines[self.leather]['gross_requirement'], 13)
+        self.assertEqual(lines[self.leather]['net_requirement'], 2)
+        self.assertEqual(lines[self.thread]['gross_requirement'], 3)
+        self.assertEqual(lines[self.thread]['net_requirement'], 0)
+
+    def test_planned_orders_group_lines_by_supplier(self):
+        lines = plan_material_requirements(replenishment_days=30, consumption_per_unit=2)
+
+        order, = create_planned_orders(lines, lead_days=3)
+
+        # Leather: 6 + 20 - 10 - 1 = 15; thread: 6 - 4 = 2, both from supplier A.
+        self.assertEqual(order.status, 'PEN')
+        self.assertEqual(order.total_price, 15 * 10 + 2 * 3)
+        self.assertEqual(sorted(order.orderdetail_set.values_list(
+            'material_by_supplier', 'quantity', 'unit_price')),
+            sorted([(self.leather_a.pk, 15, 10), (self.thread_a.pk, 2, 3)]))
+
+
+class ReceiveMaterialOrderTests(SupplyChainTestCase):
+    def setUp(self):
+        super().setUp()
+        self.order = MaterialOrder.objects.create(delivery_date=date.today())
+        OrderDetail.objects.create(
+            material_order=self.order, material_by_supplier=self.leather_a, quantity=5)
+        OrderDetail.objects.create(
+            material_order=self.order, material_by_supplier=self.thread_a, quantity=2)
+
+    def test_receiving_twice_adds_the_stock_once(self):
+        _, received = receive_material_order(
+            self.order.pk, [{'raw_material_id': str(self.thread.pk), 'quantity': 1}])
+
+        self.assertEqual(received, {self.leather.pk: 5, self.thread.pk: 1})
+        with self.assertRaises(OrderAlreadyReceived):
+            receive_material_order(self.order.pk)
+        self.leather.refresh_from_db()
+        self.thread.refresh_from_db()
+        self.assertEqual((self.leather.stock, self.thread.stock), (15, 5))
+        self.assertEqual(self.thread.movements.get(kind='PUR').quantity, 1)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'DEL')
+        self.assertIsNotNone(self.order.received_at)
+        self.assertEqual(self.order.delivered_at, self.order.status_changed_at)
+
+    def test_orders_delivered_before_receiving_are_not_received_again(self):
+        MaterialOrder.objects.filter(pk=self.order.pk).update(status='DEL', received_at=None)
+
+        with self.assertRaises(OrderAlreadyReceived):
+            receive_material_order(self.order.pk)
+        self.leather.refresh_from_db()
+        self.assertEqual(self.leather.stock, 10)
+
+    def test_quantities_must_belong_to_the_order(self):
+        with self.assertRaisesMessage(ValueError, 'is not part of this order'):
+            receive_material_order(
+                self.order.pk, [{'raw_material_id': str(self.unpriced.pk), 'quantity': 1}])
+        self.order.refresh_from_db()
+        self.assertIsNone(self.order.received_at)
+
+    def test_canceled_orders_cannot_be_received(self):
+        self.order.status = 'CAN'
+        self.order.save(update_fields=['status'])
+
+        with self.assertRaisesMessage(ValueError, 'canceled'):
+            receive_material_order(self.order.pk)
+
+    def test_update_mutation_cannot_mark_orders_delivered(self):
+        user = self.create_user(permissions=['change_materialorder'])
+
+        response = self.execute(
+            'mutation Update($id: ID!) { updateMaterialOrder(id: $id, status: "DEL") '
+            '{ materialOrder { status } } }', user, {'id': str(self.order.pk)})
+
+        self.assertIn('receiveMaterialOrder', response['errors'][0]['message'])
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'PEN')
+
+
+class CreateMaterialOrderWithDetailsTests(SupplyChainTestCase):
+    def test_lines_for_the_same_offer_are_merged(self):
+        order = create_material_order_with_details(date.today(), [
+            {'material_by_supplier_id': str(self.leather_a.pk), 'quantity': 2},
+            {'material_by_supplier_id': str(self.thread_a.pk), 'quantity': 4},
+            {'material_by_supplier_id': str(self.leather_a.pk), 'quantity': 3},
+        ])
+
+        order.refresh_from_db()
+        self.assertEqual(order.total_price, 5 * 10 + 4 * 3)
+        self.assertEqual(sorted(order.orderdetail_set.values_list(
+            'material_by_supplier', 'quantity', 'unit_price')),
+            sorted([(self.leather_a.pk, 5, 10), (self.thread_a.pk, 4, 3)]))
+
+    def test_invalid_orders_write_nothing(self):
+        line = {'material_by_supplier_id': str(self.leather_a.pk), 'quantity': 1}
+        with self.assertRaises(ValueError):
+            create_material_order_with_details(date.today(), [])
+        with self.assertRaises(ValueError):
+            create_material_order_with_details(date.today() - timedelta(days=1), [line])
+        with self.assertRaises(ValueError):
+            create_material_order_with_details(date.today(), [{**line, 'quantity': 0}])
+        with self.assertRaises(MaterialBySupplier.DoesNotExist):
+            create_material_order_with_details(date.today(), [
+                line, {'material_by_supplier_id': str(self.thread_a.pk + 100), 'quantity': 1}])
+        self.assertFalse(MaterialOrder.objects.exists())
+
+
+class SupplierPriceHistoryTests(SupplyChainTestCase):
+    def record(self, offer, price, day):
+        offer.price = price
+        record_price_history([offer], datetime(2025, *day, 12, tzinfo=dt_timezone.utc))
+
+    def test_only_price_changes_are_recorded(self):
+        self.assertEqual(self.leather_a.price_history.count(), 1)
+        offer = MaterialBySupplier.objects.get(pk=self.leather_a.pk)
+        offer.save()
+        offer.price = 12
+        offer.save()
+
+        self.assertEqual(list(offer.price_history.order_by('pk').values_list(
+            'price', flat=True)), [10, 12])
+
+    def test_history_is_bucketed_per_supplier(self):
+        MaterialPriceHistory.objects.all().delete()
+        self.record(self.leather_a, 10, (1, 5))
+        self.record(self.leather_b, 14, (1, 10))
+        self.record(self.leather_a, 12, (1, 20))
+        self.record(self.leather_a, 11, (2, 3))
+        self.record(self.thread_a, 3, (1, 7))
+
+        buckets = price_history_buckets(self.leather.pk, bucket='month')
+
+        self.assertEqual([(row['bucket'].month, row['supplier'], row['min_price'],
+                           row['max_price'], row['average_price'], row['changes'])
+                          for row in buckets], [
+            (1, self.supplier_a, 10, 12, 11, 2),
+            (1, self.supplier_b, 14, 14, 14, 1),
+            (2, self.supplier_a, 11, 11, 11, 1),
+        ])
+
+        buckets = price_history_buckets(
+            self.leather.pk, date(2025, 1, 15), date(2025, 1, 31), bucket='day')
+        self.assertEqual([(row['bucket'].day, row['min_price']) for row in buckets],
+                         [(20, 12)])
+        with self.assertRaises(ValueError):
+            price_history_buckets(self.leather.pk, bucket='year')
+
+    def test_seed_covers_offers_without_history(self):
+        MaterialPriceHistory.objects.filter(material_by_supplier=self.leather_a).delete()
+
+        self.assertEqual(seed_price_history(), 1)
+        self.assertEqual(seed_price_history(), 0)
+        self.assertEqual(list(self.leather_a.price_history.values_list('price', flat=True)), [10])
+
+    def test_bulk_price_update_records_changed_prices(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            offers = update_offer_prices([
+                {'material_by_supplier_id': str(self.leather_a.pk), 'price': 13},
+                {'material_by_supplier_id': str(self.leather_b.pk), 'price': self.leather_b.price},
+            ])
+
+        self.assertEqual([offer.price for offer in offers], [13, self.leather_b.price])
+        self.leather_a.refresh_from_db()
+        self.assertEqual(self.leather_a.price, 13)
+        self.assertEqual(list(self.leather_a.price_history.order_by('pk').values_list(
+            'price', flat=True)), [10, 13])
+        self.assertEqual(self.leather_b.price_history.count(), 1)
+
+        with self.assertRaises(ValueError):
+            update_offer_prices([{'material_by_supplier_id': self.leather_a.pk, 'price': 1},
+                                 {'material_by_supplier_id': self.leather_a.pk, 'price': 2}])
+        with self.assertRaises(MaterialBySupplier.DoesNotExist):
+            update_offer_prices([{'material_by_supplier_id': 0, 'price': 1}])
+
+
+class OrderLinePriceTests(SupplyChainTestCase):
+    def setUp(self):
+        super().setUp()
+        self.order = MaterialOrder.objects.create(delivery_date=date.today())
+        self.line = OrderDetail.objects.create(
+            material_order=self.order, material_by_supplier=self.leather_a, quantity=3)
+
+    def assertOrderTotal(self, total):
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_price, total)
+
+    def test_lines_keep_the_price_they_were_written_with(self):
+        self.leather_a.price = 99
+        self.leather_a.save()
+        line = OrderDetail.objects.get(pk=self.line.pk)
+        line.quantity = 4
+        line.save()
+
+        self.assertEqual((line.unit_price, line.partial_price), (10, 40))
+        self.assertOrderTotal(40)
+
+        line.material_by_supplier = self.leather_b
+        line.save()
+        self.assertEqual(line.unit_price, 14)
+        self.assertOrderTotal(56)
+
+    def test_total_follows_added_and_deleted_lines(self):
+        extra = OrderDetail.objects.create(
+            material_order=self.order, material_by_supplier=self.thread_a, quantity=2)
+        self.assertOrderTotal(36)
+
+        extra.delete()
+        self.assertOrderTotal(30)
+
+    def test_order_updates_do_not_write_back_a_stale_total(self):
+        user = self.create_user(permissions=['change_materialorder'])
+        # The mutation works on a copy loaded before another line was added.
+        stale = MaterialOrder.objects.get(pk=self.order.pk)
+        OrderDetail.objects.create(
+            material_order=self.order, material_by_supplier=self.thread_a, quantity=2)
+
+        with mock.patch.object(MaterialOrder.objects, 'get', return_value=stale):
+            response = self.execute(
+                'mutation Update($id: ID!) { updateMaterialOrder(id: $id, status: "CAN") '
+                '{ materialOrder { status } } }', user, {'id': str(self.order.pk)})
+
+        self.assertIsNone(response.get('errors'))
+        self.assertOrderTotal(36)
+
+    def test_refresh_order_totals_backfills_old_lines(self):
+        OrderDetail.objects.update(unit_price=None)
+        MaterialOrder.objects.update(total_price=0)
+
+        call_command('refresh_order_totals', stdout=StringIO())
+
+        self.assertEqual(OrderDetail.objects.get().unit_price, 10)
+        self.assertOrderTotal(30)
+
+
+class OrderStatusTimestampTests(SupplyChainTestCase):
+    def test_orders_created_delivered_get_a_delivery_time(self):
+        order = MaterialOrder.objects.create(status='DEL', delivery_date=date.today())
+
+        order.refresh_from_db()
+        self.assertIsNotNone(order.delivered_at)
+        self.assertEqual(order.delivered_at, order.status_changed_at)
+
+    def test_status_transitions_stamp_the_order(self):
+        order = MaterialOrder.objects.create(delivery_date=date.today())
+        created = order.status_changed_at
+        self.assertIsNone(order.delivered_at)
+
+        order = MaterialOrder.objects.get(pk=order.pk)
+        order.status = 'DEL'
+        order.save(update_fields=['status'])
+
+        order.refresh_from_db()
+        self.assertGreater(order.status_changed_at, created)
+        self.assertEqual(order.delivered_at, order.status_changed_at)
+
+    def test_bulk_created_orders_invalidate_cached_scorecards(self):
+        version = get_version(ORDERS_VERSION_KEY)
+        lines = [{'net_requirement': 2, 'offer': self.leather_a, 'total_price': 20}]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_planned_orders(lines)
+
+        self.assertGreater(get_version(ORDERS_VERSION_KEY), version)
+
+
+class SupplierScorecardTests(SupplyChainTestCase):
+    def create_order(self, lines, created, delivery_day, delivered=None, status='PEN',
+                     created_month=3):
+        order = MaterialOrder.objects.create(
+            status=status, delivery_date=date(2026, 3, delivery_day))
+        for offer, quantity in lines:
+            OrderDetail.objects.create(
+                material_order=order, material_by_supplier=offer, quantity=quantity)
+        MaterialOrder.objects.filter(pk=order.pk).update(
+            created_at=datetime(2026, created_month, created, 10, tzinfo=dt_timezone.utc),
+            delivered_at=delivered and datetime(2026, 3, delivered, 10, tzinfo=dt_timezone.utc))
+        return order
+
+    def test_scorecards_aggregate_spend_and_delivery(self):
+        # Supplier A: one order on time after 2 days, one late after 4 days.
+        self.create_order([(self.leather_a, 3), (self.thread_a, 2)], 2, 7, 4, 'DEL')
+        self.create_order([(self.leather_a, 1)], 3, 4, 7, 'DEL')
+        # Supplier B: one pending order; canceled and out-of-range ones are ignored.
+        self.create_order([(self.leather_b, 2)], 5, 9)
+        self.create_order([(self.leather_b, 5)], 5, 9, status='CAN')
+        self.create_order([(self.leather_b, 5)], 5, 9, created_month=2)
+
+        scorecards = get_supplier_scorecards(date(2026, 3, 1), date(2026, 3, 31))
+
+        self.assertEqual([(scorecard['supplier'], scorecard['order_count'],
+                           scorecard['spend'], scorecard['delivered_count'],
+                           scorecard['on_time_rate'], scorecard['average_lead_time_days'])
+                          for scorecard in scorecards],
+                         [(self.supplier_a, 2, 46, 2, 0.5, 3.0),
+                          (self.supplier_b, 1, 28, 0, None, None)])
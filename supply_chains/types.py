@@ -1,7 +1,8 @@
 import graphene
 from graphene import relay
-from django_filters import FilterSet
+from django_filters import FilterSet, OrderingFilter
 from graphene_django import DjangoObjectType
+from inventories.types import InventoryItemType
 from .models import (
     Supplier,
     MaterialBySupplier,
@@ -36,11 +37,14 @@ class MaterialBySupplierFilter(FilterSet):
 
 
 class MaterialOrderFilter(FilterSet):
+    order_by = OrderingFilter(fields=('total_price', 'delivery_date'))
+
     class Meta:
         model = MaterialOrder
         fields = {
             'status': ['exact'],
             'delivery_date': ['exact', 'year__gt', 'year__lt'],
+            'total_price': ['gte', 'lte'],
             'created_at': ['exact', 'year__gt', 'year__lt'],
             'updated_at': ['exact', 'year__gt', 'year__lt'],
         }
@@ -75,6 +79,9 @@ class SupplierType(DjangoObjectType):
 
 
 class MaterialBySupplierType(DjangoObjectType):
+    offer_rank = graphene.Int(
+        description='Position of the offer by price for its material, set by bestSupplierOffers')
+
     class Meta:
         model = MaterialBySupplier
         interfaces = (relay.Node,)
@@ -88,6 +95,9 @@ class MaterialBySupplierType(DjangoObjectType):
         )
         filterset_class = MaterialBySupplierFilter
 
+    def resolve_offer_rank(self, info):
+        return getattr(self, 'offer_rank', None)
+
 
 class MaterialOrderType(DjangoObjectType):
     total_price = graphene.String(description='Total price of the order')
@@ -99,6 +109,9 @@ class MaterialOrderType(DjangoObjectType):
             'id',
             'status',
             'delivery_date',
+            'received_at',
+            'status_changed_at',
+            'delivered_at',
             'total_price',
             'created_at',
             'updated_at'
@@ -121,6 +134,7 @@ class OrderDetailType(DjangoObjectType):
             'material_order',
             'material_by_supplier',
             'quantity',
+            'unit_price',
             'partial_price',
             'created_at',
             'updated_at'
@@ -129,3 +143,77 @@ class OrderDetailType(DjangoObjectType):
 
     def resolve_partial_price(self, info):
         return self.partial_price
+
+
+class ValuationMethod(graphene.Enum):
+    CHEAPEST = 'cheapest'
+    AVERAGE = 'average'
+    LATEST = 'latest'
+
+
+class InventoryValuationType(graphene.ObjectType):
+    method = graphene.String()
+    total_value = graphene.Int(description='Value of the RAW stock at the chosen supplier price')
+    total_stock = graphene.Int()
+    material_count = graphene.Int()
+    unpriced_count = graphene.Int(description='RAW items without any supplier offer')
+
+
+class PriceHistoryBucket(graphene.Enum):
+    DAY = 'day'
+    WEEK = 'week'
+    MONTH = 'month'
+
+
+class SupplierPriceHistoryType(graphene.ObjectType):
+    supplier = graphene.Field(SupplierType)
+    bucket = graphene.DateTime(description='Start of the day, week or month')
+    min_price = graphene.Int()
+    max_price = graphene.Int()
+    average_price = graphene.Float()
+    changes = graphene.Int(description='Price changes recorded in the bucket')
+
+
+class SupplierScorecardType(graphene.ObjectType):
+    supplier = graphene.Field(SupplierType)
+    order_count = graphene.Int(description='Orders with at least one line from the supplier')
+    spend = graphene.Int()
+    delivered_count = graphene.Int()
+    on_time_rate = graphene.Float(
+        description='Share of delivered orders received by their delivery date')
+    average_lead_time_days = graphene.Float(
+        description='Average days from order creation to delivery')
+
+
+class MaterialRequirementType(graphene.ObjectType):
+    raw_material = graphene.Field(InventoryItemType)
+    gross_requirement = graphene.Int(
+        description='Material for cart demand missing from stock plus replenishment')
+    replenishment = graphene.Int(
+        description='Material to re-buy for carpets sold in the replenishment window')
+    stock = graphene.Int()
+    on_order = graphene.Int(description='Quantity in pending material orders')
+    net_requirement = graphene.Int()
+    offer = graphene.Field(MaterialBySupplierType,
+                           description='Cheapest supplier offer, null if none exists')
+    total_price = graphene.Int()
+
+
+class ReceivedQuantityInput(graphene.InputObjectType):
+    raw_material_id = graphene.ID(required=True)
+    quantity = graphene.Int(required=True)
+
+
+class ReceivedMaterialType(graphene.ObjectType):
+    raw_material_id = graphene.ID()
+    quantity = graphene.Int()
+
+
+class MaterialPriceInput(graphene.InputObjectType):
+    material_by_supplier_id = graphene.ID(required=True)
+    price = graphene.Int(required=True)
+
+
+class OrderLineInput(graphene.InputObjectType):
+    material_by_supplier_id = graphene.ID(required=True)
+    quantity = graphene.Int(required=True)
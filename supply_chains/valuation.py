@@ -0,0 +1,59 @@
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, FloatField, Min, OuterRef, Subquery, Sum
+from core.cache import get_version
+from inventories.models import InventoryItem
+from inventories.signals import STOCK_VERSION_KEY
+from .models import MaterialBySupplier
+from .signals import PRICE_VERSION_KEY
+
+VALUATION_CACHE_TIMEOUT = 60 * 60
+VALUATION_METHODS = ('cheapest', 'average', 'latest')
+
+
+def _unit_price(method):
+    offers = MaterialBySupplier.objects.filter(
+        raw_material=OuterRef('pk')).order_by()
+    if method == 'latest':
+        return Subquery(offers.order_by('-updated_at', '-pk').values('price')[:1],
+                        output_field=FloatField())
+
+    aggregate = Min('price') if method == 'cheapest' else Avg('price')
+    return Subquery(
+        offers.values('raw_material').annotate(
+            unit_price=aggregate).values('unit_price'),
+        output_field=FloatField())
+
+
+def compute_inventory_valuation(method):
+    # A single aggregate statement: each RAW item is priced by a correlated
+    # subquery on MaterialBySupplier's raw_material indexes.
+    totals = InventoryItem.objects.filter(type='RAW').annotate(
+        unit_price=_unit_price(method),
+    ).aggregate(
+        total_value=Sum(F('stock') * F('unit_price'), output_field=FloatField()),
+        total_stock=Sum('stock'),
+        material_count=Count('pk'),
+        priced_count=Count('unit_price'),
+    )
+    return {
+        'method': method,
+        'total_value': round(totals['total_value'] or 0),
+        'total_stock': totals['total_stock'] or 0,
+        'material_count': totals['material_count'],
+        'unpriced_count': totals['material_count'] - totals['priced_count'],
+    }
+
+
+def get_inventory_valuation(method):
+    if method not in VALUATION_METHODS:
+        raise ValueError(f'Unknown valuation method: {method}')
+
+    # Stock and price versions are bumped on every change, so a cached
+    # valuation is reused exactly until one of its inputs changes.
+    cache_key = 'valuation:{}:{}:{}'.format(
+        method, get_version(STOCK_VERSION_KEY), get_version(PRICE_VERSION_KEY))
+    valuation = cache.get(cache_key)
+    if valuation is None:
+        valuation = compute_inventory_valuation(method)
+        cache.set(cache_key, valuation, VALUATION_CACHE_TIMEOUT)
+    return valuation